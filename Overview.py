@@ -14,8 +14,10 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # Import custom modules
-from utils.data_extractor import DataExtractor
-from utils.data_processor import DataProcessor
+from utils.data_extractor import DataExtractor, DEFAULT_WORKERS
+from utils.workbook_reader import DEFAULT_CHUNK_SIZE
+from utils.dataset_service import get_processor, invalidate
+from utils.chart_rendering import points_caption
 
 # Try to import cloud data loader for Streamlit deployment
 try:
@@ -35,7 +37,7 @@ import plotly.express as px
 import plotly.graph_objects as go
 from components.filters import (
     create_date_filter, create_multiselect_filters,
-    apply_filters_to_data, create_filter_summary
+    create_filter_summary
 )
 
 # Page configuration
@@ -77,7 +79,6 @@ st.markdown("""
 # Initialize session state
 if 'data_loaded' not in st.session_state:
     st.session_state.data_loaded = False
-    st.session_state.processor = None
     st.session_state.last_update = None
 
 def load_data():
@@ -132,10 +133,8 @@ def load_data():
                     st.error("Please go to 'Fix Data' page in the sidebar to manually fix data loading")
                     st.stop()
             
-            # For local deployment, check if extraction is needed
-            elif not os.path.exists(extracted_file):
-                st.info("First time setup: Extracting data from Excel files...")
-                
+            # For local deployment, refresh the extracted data from the Excel files
+            else:
                 # Get parent directory
                 parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
                 
@@ -143,19 +142,21 @@ def load_data():
                 file1_path = os.path.join(parent_dir, "2-JPG shipping tracking - July 2025.xlsx")
                 file2_path = os.path.join(parent_dir, "3-DSR-PG- 2025 July.xlsx")
                 
-                # Check if files exist
-                if not os.path.exists(file1_path) or not os.path.exists(file2_path):
+                if os.path.exists(file1_path) and os.path.exists(file2_path):
+                    if not os.path.exists(extracted_file):
+                        st.info("First time setup: Extracting data from Excel files...")
+                    
+                    # Incremental: unchanged workbooks are skipped, new shipping rows appended
+                    extractor = DataExtractor(file1_path=file1_path, file2_path=file2_path,
+                                              chunk_size=DEFAULT_CHUNK_SIZE, workers=DEFAULT_WORKERS)
+                    extractor.update_extracted_data(output_dir=os.path.join(os.path.dirname(__file__), 'data', 'extracted'))
+                elif not os.path.exists(extracted_file):
                     st.error("Excel files not found in parent directory.")
                     st.stop()
-                
-                extractor = DataExtractor(file1_path=file1_path, file2_path=file2_path)
-                extractor.save_extracted_data(output_dir=os.path.join(os.path.dirname(__file__), 'data', 'extracted'))
             
-            # Load processed data
-            processor = DataProcessor()
-            processor.load_processed_data(data_dir=os.path.join(os.path.dirname(__file__), 'data', 'extracted'))
+            # Load (or reuse) the dataset shared by all pages and sessions
+            get_processor(os.path.join(os.path.dirname(__file__), 'data', 'extracted'))
             
-            st.session_state.processor = processor
             st.session_state.data_loaded = True
             st.session_state.last_update = datetime.now()
             
@@ -207,6 +208,7 @@ def main():
                     shutil.rmtree(extracted_dir)
             except:
                 pass
+            invalidate()
             st.rerun()
         
         if st.session_state.last_update:
@@ -217,7 +219,7 @@ def main():
         if not load_data():
             st.stop()
     
-    processor = st.session_state.processor
+    processor = get_processor(os.path.join(os.path.dirname(__file__), 'data', 'extracted'))
     
     # Filters section
     st.markdown("### 🔍 Filters")
@@ -228,18 +230,14 @@ def main():
         # Other filters
         filters = create_multiselect_filters(processor.shipping_data)
         
-        # Apply filters
-        filtered_data = apply_filters_to_data(processor.shipping_data, filters, date_range)
+        # Apply filters (rows and aggregates are restricted together)
+        filtered_processor = processor.subset(filters, date_range)
+        filtered_data = filtered_processor.shipping_data
         
         # Filter summary
         create_filter_summary(filters, date_range)
     
     # Calculate KPIs on filtered data
-    # Create a temporary processor for filtered data
-    filtered_processor = DataProcessor()
-    filtered_processor.shipping_data = filtered_data
-    filtered_processor.sales_data = processor.sales_data
-    
     # Check if we have data before calculating KPIs
     if len(filtered_data) == 0:
         st.warning("No data matches the selected filters. Please adjust your filters.")
@@ -304,6 +302,8 @@ def show_executive_summary(processor, kpis):
     if not daily_data.empty:
         fig = create_daily_trend_chart(daily_data)
         st.plotly_chart(fig, use_container_width=True)
+        if points_caption(fig):
+            st.caption(points_caption(fig))
     
     # Category performance
     category_data = processor.get_category_analysis()
@@ -348,7 +348,7 @@ def show_shipping_performance(processor, data):
         if 'Actual_Ship_Date' in data.columns:
             data_copy = data.copy()
             data_copy['Day_of_Week'] = pd.to_datetime(data_copy['Actual_Ship_Date']).dt.day_name()
-            dow_analysis = data_copy.groupby(['Day_of_Week', 'Delivery_Status']).size().unstack(fill_value=0)
+            dow_analysis = data_copy.groupby(['Day_of_Week', 'Delivery_Status'], observed=True).size().unstack(fill_value=0)
             if not dow_analysis.empty:
                 st.bar_chart(dow_analysis)
         
@@ -356,7 +356,7 @@ def show_shipping_performance(processor, data):
         if 'Actual_Ship_Date' in data.columns:
             data_copy = data.copy()
             data_copy['Month_Year'] = pd.to_datetime(data_copy['Actual_Ship_Date']).dt.to_period('M')
-            monthly_trend = data_copy.groupby(['Month_Year', 'Delivery_Status']).size().unstack(fill_value=0)
+            monthly_trend = data_copy.groupby(['Month_Year', 'Delivery_Status'], observed=True).size().unstack(fill_value=0)
             if not monthly_trend.empty:
                 st.line_chart(monthly_trend)
     
@@ -373,7 +373,8 @@ def show_shipping_performance(processor, data):
                 columns='Source',
                 values='Quantity',
                 aggfunc='sum',
-                fill_value=0
+                fill_value=0,
+                observed=True
             )
             
             st.dataframe(pivot.style.format("{:,.0f}"))
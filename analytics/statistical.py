@@ -4,16 +4,20 @@ Statistical Analysis Module for P&G Supply Chain Analytics
 
 import pandas as pd
 import numpy as np
-from scipy import stats
-try:
-    from statsmodels.stats.multicomp import pairwise_tukeyhsd
-    from statsmodels.tsa.seasonal import seasonal_decompose
-    STATSMODELS_AVAILABLE = True
-except ImportError:
-    STATSMODELS_AVAILABLE = False
+from utils.lazy_imports import require, module_available, lazy_import, lazy_from
+# SciPy and statsmodels load when a test or decomposition is first run
+require('scipy')
+stats = lazy_import('scipy.stats')
+pairwise_tukeyhsd = lazy_from('statsmodels.stats.multicomp', 'pairwise_tukeyhsd')
+seasonal_decompose = lazy_from('statsmodels.tsa.seasonal', 'seasonal_decompose')
+STATSMODELS_AVAILABLE = module_available('statsmodels')
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+from utils.status_rates import status_rate
+from utils.chart_rendering import (
+    MAX_POINTS, scatter_trace, quantile_bin_ranks, record_points, box_statistics, silverman_bandwidth
+)
 
 class StatisticalAnalyzer:
     def __init__(self, data):
@@ -125,6 +129,12 @@ class StatisticalAnalyzer:
         """Test independence between two categorical variables"""
         # Create contingency table
         contingency_table = pd.crosstab(self.data[var1], self.data[var2])
+        # Drop categories absent from the (filtered) data; empty rows or
+        # columns would make the expected frequencies zero
+        contingency_table = contingency_table.loc[
+            contingency_table.sum(axis=1) > 0,
+            contingency_table.sum(axis=0) > 0
+        ]
         
         # Perform chi-square test
         chi2, p_value, dof, expected = stats.chi2_contingency(contingency_table)
@@ -152,10 +162,7 @@ class StatisticalAnalyzer:
     def time_series_decomposition(self, date_column='Actual_Ship_Date', value_column='Late_Rate'):
         """Perform time series decomposition"""
         # Prepare time series data
-        ts_data = self.data.groupby(pd.Grouper(key=date_column, freq='D')).agg({
-            'Delivery_Status': lambda x: (x == 'Late').sum() / len(x) * 100 if len(x) > 0 else 0
-        })
-        ts_data.columns = [value_column]
+        ts_data = status_rate(self.data, pd.Grouper(key=date_column, freq='D')).to_frame(value_column)
         ts_data = ts_data.fillna(0)
         
         # Ensure we have enough data
@@ -200,9 +207,21 @@ class StatisticalAnalyzer:
         
         return decomposition, fig
     
-    def distribution_analysis(self, column):
-        """Analyze distribution of a numeric column"""
+    def distribution_analysis(self, column, render_mode='auto'):
+        """Analyze distribution of a numeric column
+        
+        In 'auto' render mode a column longer than MAX_POINTS is summarized
+        on the server: the histogram is sent as its bars, the box as its
+        quartiles and fences (plus its outliers), and the violin and the
+        Q-Q plot as MAX_POINTS quantile bins, the Q-Q plot drawn with WebGL
+        and its normal line cut to its two ends.
+        """
         data = self.data[column].dropna()
+        sorted_values = np.sort(data.to_numpy(dtype=np.float64))
+        summarize = render_mode == 'auto' and len(data) > MAX_POINTS
+        ranks = quantile_bin_ranks(len(data), MAX_POINTS if summarize else len(data))
+        # Points every trace would send at full detail, added up as they are built
+        points_total = 0
         
         # Create subplots
         fig = make_subplots(
@@ -213,41 +232,70 @@ class StatisticalAnalyzer:
         )
         
         # Histogram
-        fig.add_trace(
-            go.Histogram(x=data, name='Histogram', nbinsx=30),
-            row=1, col=1
-        )
+        if summarize:
+            counts, edges = np.histogram(sorted_values, bins=30)
+            histogram = go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges),
+                               name='Histogram', marker_line_width=0)
+        else:
+            histogram = go.Histogram(x=data, name='Histogram', nbinsx=30)
+        fig.add_trace(histogram, row=1, col=1)
+        points_total += len(data)
         
         # Box plot
-        fig.add_trace(
-            go.Box(y=data, name='Box Plot'),
-            row=1, col=2
-        )
+        if summarize:
+            box_stats, outliers = box_statistics(sorted_values)
+            box_color = px.colors.qualitative.Plotly[1]
+            fig.add_trace(
+                go.Box(x=['Box Plot'], name='Box Plot', marker_color=box_color, **box_stats),
+                row=1, col=2
+            )
+            outliers = outliers[quantile_bin_ranks(len(outliers), MAX_POINTS)]
+            fig.add_trace(
+                scatter_trace(len(outliers), render_mode)(
+                    x=np.full(len(outliers), 'Box Plot'), y=outliers, mode='markers',
+                    name='Box Plot', marker_color=box_color, showlegend=False
+                ),
+                row=1, col=2
+            )
+        else:
+            fig.add_trace(
+                go.Box(y=data, name='Box Plot'),
+                row=1, col=2
+            )
+        points_total += len(data)
         
         # Q-Q plot
-        theoretical_quantiles = stats.norm.ppf(np.linspace(0.01, 0.99, len(data)))
-        sample_quantiles = np.sort(data)
+        theoretical_quantiles = stats.norm.ppf(np.linspace(0.01, 0.99, len(data))[ranks])
+        sample_quantiles = sorted_values[ranks]
         
         fig.add_trace(
-            go.Scatter(x=theoretical_quantiles, y=sample_quantiles,
+            scatter_trace(len(ranks), render_mode)(x=theoretical_quantiles, y=sample_quantiles,
                       mode='markers', name='Q-Q Plot'),
             row=2, col=1
         )
+        points_total += len(data)
         
-        # Add diagonal line for Q-Q plot
+        # Add diagonal line for Q-Q plot (a straight line: its ends are enough)
+        line_quantiles = theoretical_quantiles[[0, -1]] if len(ranks) < len(data) else theoretical_quantiles
         fig.add_trace(
-            go.Scatter(x=theoretical_quantiles, y=theoretical_quantiles,
+            go.Scatter(x=line_quantiles, y=line_quantiles,
                       mode='lines', name='Normal Line', line=dict(dash='dash')),
             row=2, col=1
         )
+        points_total += len(data)
         
-        # Violin plot
-        fig.add_trace(
-            go.Violin(y=data, name='Violin Plot'),
-            row=2, col=2
-        )
+        # Violin plot: the quantile bins keep the density's shape; the
+        # bandwidth is taken from all values so it is not widened
+        if summarize:
+            violin = go.Violin(y=sorted_values[ranks], name='Violin Plot',
+                               bandwidth=silverman_bandwidth(sorted_values) or None)
+        else:
+            violin = go.Violin(y=data, name='Violin Plot')
+        fig.add_trace(violin, row=2, col=2)
+        points_total += len(data)
         
         fig.update_layout(height=800, title_text=f"Distribution Analysis: {column}")
+        record_points(fig, points_total)
         
         # Normality tests
         shapiro_stat, shapiro_p = stats.shapiro(data[:5000])  # Shapiro-Wilk test
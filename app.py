@@ -21,8 +21,10 @@ logger = logging.getLogger(__name__)
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # Import custom modules
-from utils.data_extractor import DataExtractor
-from utils.data_processor import DataProcessor
+from utils.data_extractor import DataExtractor, DEFAULT_WORKERS
+from utils.workbook_reader import DEFAULT_CHUNK_SIZE
+from utils.dataset_service import get_processor, invalidate
+from utils.chart_rendering import points_caption
 from components.kpi_cards import display_kpi_row, display_secondary_kpis, create_alert_box
 from components.charts import (
     create_delivery_status_pie, create_daily_trend_chart,
@@ -34,7 +36,7 @@ import plotly.express as px
 import plotly.graph_objects as go
 from components.filters import (
     create_date_filter, create_multiselect_filters,
-    apply_filters_to_data, create_filter_summary
+    create_filter_summary
 )
 
 # Configuration
@@ -84,7 +86,6 @@ st.markdown("""
 # Initialize session state
 if 'data_loaded' not in st.session_state:
     st.session_state.data_loaded = False
-    st.session_state.processor = None
     st.session_state.last_update = None
 
 @st.cache_data(ttl=Config.CACHE_TTL)
@@ -100,18 +101,19 @@ def load_data():
             extracted_dir = os.path.join(os.path.dirname(__file__), 'data', 'extracted')
             extracted_file = os.path.join(extracted_dir, 'shipping_main_data.csv')
             
-            if not os.path.exists(extracted_file):
-                st.info("First time setup: Extracting data from Excel files...")
-                logger.info("Extracting data from Excel files")
-                
-                # Get parent directory (ExcelProblem)
-                parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            # Get parent directory (ExcelProblem)
+            parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            excel_file1 = os.path.join(parent_dir, "2-JPG shipping tracking - July 2025.xlsx")
+            excel_file2 = os.path.join(parent_dir, "3-DSR-PG- 2025 July.xlsx")
+            excel_files_exist = os.path.exists(excel_file1) and os.path.exists(excel_file2)
+            
+            if not os.path.exists(extracted_file) or excel_files_exist:
+                if not os.path.exists(extracted_file):
+                    st.info("First time setup: Extracting data from Excel files...")
+                    logger.info("Extracting data from Excel files")
                 
                 # Validate Excel files exist
-                excel_file1 = os.path.join(parent_dir, "2-JPG shipping tracking - July 2025.xlsx")
-                excel_file2 = os.path.join(parent_dir, "3-DSR-PG- 2025 July.xlsx")
-                
-                if not os.path.exists(excel_file1) or not os.path.exists(excel_file2):
+                if not excel_files_exist:
                     st.error("Excel files not found in parent directory")
                     st.error("Please ensure these files exist:")
                     st.error(f"- {excel_file1}")
@@ -121,19 +123,20 @@ def load_data():
                 # Extract data
                 extractor = DataExtractor(
                     file1_path=excel_file1,
-                    file2_path=excel_file2
+                    file2_path=excel_file2,
+                    chunk_size=DEFAULT_CHUNK_SIZE,
+                    workers=DEFAULT_WORKERS
                 )
                 
                 # Create directory if it doesn't exist
                 os.makedirs(extracted_dir, exist_ok=True)
-                extractor.save_extracted_data(output_dir=extracted_dir)
+                # Incremental: unchanged workbooks are skipped, new shipping rows appended
+                extractor.update_extracted_data(output_dir=extracted_dir)
                 logger.info("Data extraction completed")
             
-            # Load processed data
-            processor = DataProcessor()
-            processor.load_processed_data(data_dir=extracted_dir)
+            # Load (or reuse) the dataset shared by all pages and sessions
+            get_processor(extracted_dir)
             
-            st.session_state.processor = processor
             st.session_state.data_loaded = True
             st.session_state.last_update = datetime.now()
             
@@ -201,6 +204,7 @@ def main():
             if st.button("🔄 Refresh Data"):
                 st.session_state.data_loaded = False
                 st.cache_data.clear()  # Clear cache on refresh
+                invalidate()
                 st.rerun()
             
             if st.session_state.last_update:
@@ -211,7 +215,7 @@ def main():
             if not load_data():
                 st.stop()
         
-        processor = st.session_state.processor
+        processor = get_processor(os.path.join(os.path.dirname(__file__), 'data', 'extracted'))
         
         # Validate processor has data
         if processor is None or processor.shipping_data is None:
@@ -227,18 +231,14 @@ def main():
             # Other filters
             filters = create_multiselect_filters(processor.shipping_data)
             
-            # Apply filters
-            filtered_data = apply_filters_to_data(processor.shipping_data, filters, date_range)
+            # Apply filters (rows and aggregates are restricted together)
+            filtered_processor = processor.subset(filters, date_range)
+            filtered_data = filtered_processor.shipping_data
             
             # Filter summary
             create_filter_summary(filters, date_range)
         
         # Calculate KPIs on filtered data
-        # Create a temporary processor for filtered data
-        filtered_processor = DataProcessor()
-        filtered_processor.shipping_data = filtered_data.copy()  # Use copy to avoid mutations
-        filtered_processor.sales_data = processor.sales_data
-        
         # Check if we have data before calculating KPIs
         if len(filtered_data) == 0:
             st.warning("No data matches the selected filters. Please adjust your filters.")
@@ -310,6 +310,8 @@ def show_executive_summary(processor, kpis):
     if not daily_data.empty:
         fig = create_daily_trend_chart(daily_data)
         st.plotly_chart(fig, use_container_width=True)
+        if points_caption(fig):
+            st.caption(points_caption(fig))
     
     # Category performance
     category_data = processor.get_category_analysis()
@@ -383,7 +385,7 @@ def show_shipping_performance(processor, data):
                 
                 if not data_copy.empty:
                     data_copy['Day_of_Week'] = data_copy['Actual_Ship_Date'].dt.day_name()
-                    dow_analysis = data_copy.groupby(['Day_of_Week', 'Delivery_Status']).size().unstack(fill_value=0)
+                    dow_analysis = data_copy.groupby(['Day_of_Week', 'Delivery_Status'], observed=True).size().unstack(fill_value=0)
                     if not dow_analysis.empty:
                         st.bar_chart(dow_analysis)
                     else:
@@ -404,7 +406,7 @@ def show_shipping_performance(processor, data):
                 if not data_copy.empty:
                     # Fixed: Handle timezone-aware dates
                     data_copy['Month_Year'] = data_copy['Actual_Ship_Date'].dt.to_period('M').astype(str)
-                    monthly_trend = data_copy.groupby(['Month_Year', 'Delivery_Status']).size().unstack(fill_value=0)
+                    monthly_trend = data_copy.groupby(['Month_Year', 'Delivery_Status'], observed=True).size().unstack(fill_value=0)
                     if not monthly_trend.empty:
                         st.line_chart(monthly_trend)
                     else:
@@ -428,7 +430,8 @@ def show_shipping_performance(processor, data):
                     columns='Source',
                     values='Quantity',
                     aggfunc='sum',
-                    fill_value=0
+                    fill_value=0,
+                    observed=True
                 )
                 
                 # Fixed: Wrap style operation in try-except
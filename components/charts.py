@@ -7,10 +7,14 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
 import numpy as np
+from utils.status_rates import status_rate, status_rate_table
+from utils.chart_rendering import MAX_POINTS, scatter_trace, lttb_indices, record_points
 
 def create_delivery_status_pie(data):
     """Create pie chart for delivery status distribution"""
     status_counts = data['Delivery_Status'].value_counts()
+    # Categorical columns also count statuses absent from the data
+    status_counts = status_counts[status_counts > 0]
     
     fig = px.pie(
         values=status_counts.values,
@@ -42,16 +46,29 @@ def create_delivery_status_pie(data):
     
     return fig
 
-def create_daily_trend_chart(daily_data):
-    """Create daily trend chart for late deliveries"""
+def create_daily_trend_chart(daily_data, render_mode='auto'):
+    """Create daily trend chart for late deliveries
+    
+    'auto' render mode downsamples series over MAX_POINTS days with LTTB
+    and draws long ones with WebGL; 'full' sends every day as SVG.
+    """
     fig = go.Figure()
+    points_total = 0
+    
+    def series_points(values):
+        # Positions of the days sent for one series
+        if render_mode == 'auto' and len(values) > MAX_POINTS:
+            return lttb_indices(daily_data.index, values.to_numpy(dtype=np.float64, na_value=np.nan), MAX_POINTS)
+        return np.arange(len(values))
     
     # Add traces for each status
     for status in ['Late', 'On Time', 'Advanced', 'Not Due']:
         if status in daily_data.columns:
-            fig.add_trace(go.Scatter(
-                x=daily_data.index,
-                y=daily_data[status],
+            kept = series_points(daily_data[status])
+            points_total += len(daily_data)
+            fig.add_trace(scatter_trace(len(kept), render_mode)(
+                x=daily_data.index[kept],
+                y=daily_data[status].iloc[kept],
                 mode='lines+markers',
                 name=status,
                 line=dict(width=2),
@@ -60,9 +77,11 @@ def create_daily_trend_chart(daily_data):
     
     # Add late rate as secondary y-axis
     if 'Late_Rate' in daily_data.columns:
-        fig.add_trace(go.Scatter(
-            x=daily_data.index,
-            y=daily_data['Late_Rate'],
+        kept = series_points(daily_data['Late_Rate'])
+        points_total += len(daily_data)
+        fig.add_trace(scatter_trace(len(kept), render_mode)(
+            x=daily_data.index[kept],
+            y=daily_data['Late_Rate'].iloc[kept],
             mode='lines',
             name='Late Rate %',
             yaxis='y2',
@@ -83,7 +102,7 @@ def create_daily_trend_chart(daily_data):
         height=400
     )
     
-    return fig
+    return record_points(fig, points_total)
 
 def create_category_performance_bar(category_data):
     """Create bar chart for category performance"""
@@ -112,12 +131,7 @@ def create_category_performance_bar(category_data):
 
 def create_plant_heatmap(data):
     """Create heatmap for plant performance"""
-    pivot = data.pivot_table(
-        index='Category',
-        columns='Source',
-        values='Delivery_Status',
-        aggfunc=lambda x: (x == 'Late').sum() / len(x) * 100 if len(x) > 0 else 0
-    )
+    pivot = status_rate_table(data, index='Category', columns='Source')
     
     fig = px.imshow(
         pivot,
@@ -138,11 +152,9 @@ def create_plant_heatmap(data):
 def create_brand_performance_sunburst(data):
     """Create sunburst chart for brand hierarchy performance"""
     # Aggregate data by category and brand
-    brand_data = data.groupby(['Category', 'Master_Brand', 'Brand']).agg({
-        'Delivery_Status': lambda x: (x == 'Late').sum() / len(x) * 100 if len(x) > 0 else 0
-    }).reset_index()
+    brand_data = status_rate(data, ['Category', 'Master_Brand', 'Brand']).reset_index()
     brand_data.columns = ['Category', 'Master_Brand', 'Brand', 'Late_Rate']
-    brand_data['Count'] = data.groupby(['Category', 'Master_Brand', 'Brand']).size().values
+    brand_data['Count'] = data.groupby(['Category', 'Master_Brand', 'Brand'], observed=True).size().values
     
     fig = px.sunburst(
         brand_data,
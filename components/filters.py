@@ -6,6 +6,7 @@ Fixes the date range issue that was causing 38% instead of 35.5%
 import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
+from utils.filter_index import FilterIndex, filter_frame
 
 def create_date_filter(data, key="date_filter"):
     """Create date range filter - FIXED to handle future dates"""
@@ -35,9 +36,13 @@ def create_date_filter(data, key="date_filter"):
     else:
         # FIXED: Calculate date range based on actual data, not current date
         if 'Actual_Ship_Date' in data.columns:
-            # Get actual min and max dates from data
-            data_min_date = data['Actual_Ship_Date'].min()
-            data_max_date = data['Actual_Ship_Date'].max()
+            # Get actual min and max dates from data (ends of the sorted date index)
+            index = FilterIndex.for_frame(data)
+            if index.supports_dates():
+                data_min_date, data_max_date = index.date_bounds()
+            else:
+                data_min_date = data['Actual_Ship_Date'].min()
+                data_max_date = data['Actual_Ship_Date'].max()
             
             # Convert to date objects if they're timestamps
             if hasattr(data_min_date, 'date'):
@@ -80,13 +85,15 @@ def create_date_filter(data, key="date_filter"):
 def create_multiselect_filters(data):
     """Create multiselect filters for various dimensions"""
     filters = {}
+    # Distinct values come from the frame's filter index, not a rescan
+    index = FilterIndex.for_frame(data)
     
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
         # Plant filter
         if 'SLS_Plant' in data.columns:
-            plants = data['SLS_Plant'].dropna().unique()
+            plants = index.values('SLS_Plant')
             selected_plants = st.multiselect(
                 "Plant",
                 options=sorted(plants),
@@ -98,7 +105,7 @@ def create_multiselect_filters(data):
         
         # Source filter
         if 'Source' in data.columns:
-            sources = data['Source'].dropna().unique()
+            sources = index.values('Source')
             selected_sources = st.multiselect(
                 "Source/Warehouse",
                 options=sorted(sources),
@@ -111,7 +118,7 @@ def create_multiselect_filters(data):
     with col2:
         # Category filter
         if 'Category' in data.columns:
-            categories = data['Category'].dropna().unique()
+            categories = index.values('Category')
             selected_categories = st.multiselect(
                 "Category",
                 options=sorted(categories),
@@ -124,7 +131,7 @@ def create_multiselect_filters(data):
     with col3:
         # Master Brand filter
         if 'Master_Brand' in data.columns:
-            brands = data['Master_Brand'].dropna().unique()
+            brands = index.values('Master_Brand')
             selected_brands = st.multiselect(
                 "Master Brand",
                 options=sorted(brands),
@@ -137,7 +144,7 @@ def create_multiselect_filters(data):
     with col4:
         # Delivery Status filter
         if 'Delivery_Status' in data.columns:
-            statuses = data['Delivery_Status'].dropna().unique()
+            statuses = index.values('Delivery_Status')
             selected_statuses = st.multiselect(
                 "Delivery Status",
                 options=sorted(statuses),
@@ -162,23 +169,8 @@ def create_channel_filter(data):
     return None
 
 def apply_filters_to_data(data, filters, date_range=None):
-    """Apply all filters to the dataframe"""
-    filtered_data = data.copy()
-    
-    # Apply date filter
-    if date_range and 'Actual_Ship_Date' in filtered_data.columns:
-        start_date, end_date = date_range
-        filtered_data = filtered_data[
-            (filtered_data['Actual_Ship_Date'].dt.date >= start_date) & 
-            (filtered_data['Actual_Ship_Date'].dt.date <= end_date)
-        ]
-    
-    # Apply other filters
-    for column, values in filters.items():
-        if column in filtered_data.columns and values:
-            filtered_data = filtered_data[filtered_data[column].isin(values)]
-    
-    return filtered_data
+    """Apply all filters to the dataframe (see utils.filter_index.filter_frame)"""
+    return filter_frame(data, filters, date_range)
 
 def create_filter_summary(filters, date_range=None):
     """Display a summary of applied filters"""
@@ -0,0 +1,103 @@
+"""
+Anomaly Service Module for P&G Supply Chain Analytics
+Isolation forest anomaly detection fit on a bounded sample and scored chunk by chunk
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+from utils.lazy_imports import lazy_from
+from ml_models.batch_scoring import DEFAULT_CHUNK_SIZE, iter_shipment_chunks
+
+logger = logging.getLogger(__name__)
+
+IsolationForest = lazy_from('sklearn.ensemble', 'IsolationForest')
+StandardScaler = lazy_from('sklearn.preprocessing', 'StandardScaler')
+
+SCORE_COLUMNS = ['Anomaly_Score', 'Is_Anomaly']
+
+
+def anomaly_features(data):
+    """Anomaly detection features per shipment; rows with a missing feature are dropped"""
+    features = {}
+
+    # Numeric features
+    for col in ('Quantity', 'Delay_Days'):
+        if col in data.columns:
+            features[col] = data[col]
+
+    # Create derived features
+    if 'Delivery_Status' in data.columns:
+        features['Late_Binary'] = (data['Delivery_Status'] == 'Late').astype(int)
+
+    return pd.DataFrame(features, index=data.index).dropna()
+
+
+class AnomalyDetector:
+    """A fitted scaler and isolation forest; scoring never modifies the scored data"""
+
+    def __init__(self, scaler, forest, features, training_rows):
+        self.scaler = scaler
+        self.forest = forest
+        self.features = features
+        self.training_rows = training_rows
+
+    @classmethod
+    def fit(cls, data, n_estimators=100, contamination=0.05, random_state=42, max_samples=None):
+        """Fit on the shipments, or on a random sample of ``max_samples`` of them
+
+        The sample bounds fitting time and memory on large datasets; the
+        forest's anomaly threshold then comes from the sample's scores.
+        """
+        X = anomaly_features(data)
+        if max_samples is not None and len(X) > max_samples:
+            X = X.sample(n=max_samples, random_state=random_state).sort_index()
+
+        scaler = StandardScaler()
+        X_scaled = scaler.fit_transform(X)
+
+        forest = IsolationForest(
+            contamination=contamination,
+            random_state=random_state,
+            n_estimators=n_estimators
+        )
+        forest.fit(X_scaled)
+        return cls(scaler, forest, list(X.columns), len(X))
+
+    def score(self, data):
+        """Anomaly_Score and Is_Anomaly (1/0) of the shipments that have every feature"""
+        X = anomaly_features(data)
+        if X.empty or not set(self.features) <= set(X.columns):
+            return pd.DataFrame({'Anomaly_Score': pd.Series(dtype=np.float64),
+                                 'Is_Anomaly': pd.Series(dtype=np.int64)})
+
+        scores = self.forest.score_samples(self.scaler.transform(X[self.features]))
+        # IsolationForest.predict's rule, without scoring the rows a second time
+        return pd.DataFrame({
+            'Anomaly_Score': scores,
+            'Is_Anomaly': (scores < self.forest.offset_).astype(np.int64)
+        }, index=X.index)
+
+    def score_chunks(self, chunks):
+        """Scores of each chunk of shipments, yielded in order"""
+        for chunk in chunks:
+            yield self.score(chunk)
+
+    def score_all(self, source, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Scores of a DataFrame, CSV/Parquet file or iterable of chunks, as one frame"""
+        scored = list(self.score_chunks(iter_shipment_chunks(source, chunk_size)))
+        if not scored:
+            return self.score(pd.DataFrame())
+        return pd.concat(scored)
+
+
+def daily_anomaly_index(data, scores, date_column='Actual_Ship_Date'):
+    """Scored shipments, anomalies, anomaly rate (%) and lowest score per ship day"""
+    days = pd.to_datetime(data.loc[scores.index, date_column]).dt.normalize()
+    index = scores.groupby(days.rename('Date')).agg(
+        Scored=('Is_Anomaly', 'size'),
+        Anomalies=('Is_Anomaly', 'sum'),
+        Lowest_Score=('Anomaly_Score', 'min')
+    )
+    index['Anomaly_Rate'] = index['Anomalies'] / index['Scored'] * 100
+    return index
@@ -0,0 +1,99 @@
+"""
+Batch Scoring Module for P&G Supply Chain Analytics
+Late delivery risk scoring of large shipment sets, chunk by chunk
+"""
+
+import os
+import copy
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from ml_models.forest_scoring import LateRiskScorer
+
+try:
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Shipments per scored chunk
+DEFAULT_CHUNK_SIZE = 50000
+
+SCORE_COLUMNS = ['Late_Risk_Score', 'Late_Prediction']
+
+
+def iter_shipment_chunks(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield DataFrames of at most ``chunk_size`` shipments
+
+    ``source`` is a DataFrame, a path to a .csv or .parquet file, or an
+    iterable of DataFrames (yielded as they are). Files are read chunk by
+    chunk, so they never have to fit in memory as a whole.
+    """
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunk_size):
+            yield source.iloc[start:start + chunk_size]
+    elif isinstance(source, (str, os.PathLike)):
+        path = os.fspath(source)
+        if path.endswith('.parquet'):
+            if not PARQUET_AVAILABLE:
+                raise ImportError("pyarrow is required to read Parquet files")
+            for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+                yield batch.to_pandas()
+        else:
+            with pd.read_csv(path, chunksize=chunk_size) as reader:
+                yield from reader
+    else:
+        yield from source
+
+
+def score_late_risk_chunks(models, chunks, n_jobs=1):
+    """Score shipment chunks with the late delivery model, yielding scored copies
+
+    ``models`` is a trained PredictiveModels or an exported LateRiskScorer
+    (which scores without scikit-learn). Each yielded chunk is a copy of
+    the input chunk with the Late_Risk_Score and Late_Prediction columns
+    added; input chunks are not modified. Chunks are yielded in input
+    order. With ``n_jobs`` > 1 that many chunks are scored at once on a
+    thread pool (both forests release the GIL in their array operations),
+    so at most ``n_jobs`` + 1 chunks are held in memory at any time.
+    """
+    if isinstance(models, LateRiskScorer):
+        late_risk_scores = models.late_risk_scores
+    else:
+        if 'late_delivery' not in models.models:
+            raise ValueError("The late delivery model has not been trained")
+        model = models.models['late_delivery']
+        if n_jobs > 1:
+            # Parallelism is across chunks; keep each prediction single-threaded
+            model = copy.copy(model)
+            model.n_jobs = 1
+        late_risk_scores = lambda chunk: models.late_risk_scores(chunk, model=model)
+
+    def score(chunk):
+        risk_scores, predictions = late_risk_scores(chunk)
+        scored = chunk.copy()
+        scored['Late_Risk_Score'] = risk_scores
+        scored['Late_Prediction'] = predictions
+        return scored
+
+    if n_jobs <= 1:
+        for chunk in chunks:
+            yield score(chunk)
+        return
+
+    with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(score, chunk))
+            if len(pending) > n_jobs:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def score_late_risk(models, source, chunk_size=DEFAULT_CHUNK_SIZE, n_jobs=1):
+    """Scored chunks of a DataFrame, CSV/Parquet file or iterable of chunks"""
+    return score_late_risk_chunks(models, iter_shipment_chunks(source, chunk_size), n_jobs=n_jobs)
@@ -0,0 +1,253 @@
+"""
+Exponential Smoothing Module for P&G Supply Chain Analytics
+Batched Holt-Winters demand forecasts (weekly seasonality, empirical intervals) in NumPy
+"""
+
+import itertools
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+SEASON_LENGTH = 7
+
+# Smoothing parameters tried for every series; the best one-step fit wins
+SMOOTHING_GRID = {
+    'alpha': (0.1, 0.3, 0.5, 0.8),   # Level
+    'beta': (0.0, 0.05, 0.2),        # Trend, as a share of alpha
+    'gamma': (0.05, 0.2, 0.4)        # Season, as a share of 1 - alpha
+}
+
+# Trend damping, so long horizons do not extrapolate a short-lived trend
+DAMPING = 0.9
+
+# Fewer past h-step errors than this and the h-step band is extrapolated
+MIN_ERRORS = 5
+
+
+class ExponentialSmoothingModel:
+    """A fitted series: its history, one-step fitted values and final level, trend and seasonal states
+
+    ``fitted`` and ``fitted_weekly`` hold, per history day, the one-step
+    fit and its seasonal part.
+    """
+
+    def __init__(self, history, level, trend, season, params, damping=DAMPING, fitted=None, fitted_weekly=None):
+        self.history = history
+        self.level = level
+        self.trend = trend
+        self.season = season
+        self.params = params
+        self.damping = damping
+        self.fitted = fitted if fitted is not None else np.zeros(len(history))
+        self.fitted_weekly = fitted_weekly if fitted_weekly is not None else np.zeros(len(history))
+
+    def predict(self, df):
+        """Forecast components for the dates in df['ds']
+
+        Days of the history get the one-step fitted values, later days the
+        forecast from the final states. Raises ValueError for a date that
+        is neither (before the history, or not a history day).
+        """
+        dates = pd.to_datetime(df['ds'])
+        last_day = self.history['ds'].max()
+        steps = ((dates - last_day) / pd.Timedelta(days=1)).to_numpy(dtype=np.float64)
+        trend = self.level + _damped_steps(steps, self.damping) * self.trend
+        position = (len(self.history) - 1 + steps).astype(np.int64) % len(self.season)
+        weekly = self.season[position]
+
+        past = steps <= 0
+        if past.any():
+            days = pd.Index(pd.to_datetime(self.history['ds'])).get_indexer(dates[past])
+            if (days < 0).any():
+                raise ValueError("Dates up to the last history day must be days of the history")
+            weekly[past] = self.fitted_weekly[days]
+            trend[past] = self.fitted[days] - self.fitted_weekly[days]
+        return pd.DataFrame({
+            'ds': df['ds'].to_numpy(),
+            'yhat': trend + weekly,
+            'trend': trend,
+            'weekly': weekly,
+            'monthly': np.zeros(len(steps))
+        })
+
+
+def forecast_exponential_smoothing(histories, periods=30, season_length=SEASON_LENGTH, interval_width=0.8):
+    """Fit and forecast many daily ds/y series at once
+
+    Additive Holt-Winters with a damped trend and weekly seasonality.
+    Series covering the same days are fit together: the smoothing
+    recursion runs once over the days, on arrays of (parameter sets x
+    series), and each series keeps the parameters with the lowest
+    one-step error. Intervals are empirical: the quantiles of the model's
+    own past h-step-ahead errors. Returns one (model, forecast) pair per
+    history, in order; forecasts hold the fitted history and ``periods``
+    future days, like Prophet's.
+    """
+    results = [None] * len(histories)
+    batches = {}
+    for i, history in enumerate(histories):
+        days = (len(history), history['ds'].iloc[0] if len(history) else None)
+        batches.setdefault(days, []).append(i)
+
+    for indices in batches.values():
+        Y = np.vstack([histories[i]['y'].to_numpy(dtype=np.float64) for i in indices])
+        for i, result in zip(indices, _forecast_batch(Y, histories, indices, periods,
+                                                      season_length, interval_width)):
+            results[i] = result
+    return results
+
+
+def _forecast_batch(Y, histories, indices, periods, season_length, interval_width):
+    n_series, n_days = Y.shape
+    if n_days == 0:
+        return [_empty_forecast(histories[i], periods) for i in indices]
+
+    # Too short for seasonality: season of length 1, always 0
+    m = season_length if n_days >= 2 * season_length else 1
+    grid = np.array(list(itertools.product(*SMOOTHING_GRID.values())))
+    if m == 1:
+        grid = grid[grid[:, 2] == grid[0, 2]]
+
+    # Pass 1: one-step errors of every parameter set, pick the best per series
+    alpha, beta, gamma = _smoothing(grid[:, 0, None], grid[:, 1, None], grid[:, 2, None], m)
+    sse = _smooth(Y, m, alpha, beta, gamma)[0]
+    best = np.argmin(sse, axis=0)
+    alpha, beta, gamma = _smoothing(grid[best, 0], grid[best, 1], grid[best, 2], m)
+
+    # Pass 2: the chosen parameters, keeping the states of every day
+    _, fitted, states, fitted_weekly = _smooth(Y, m, alpha, beta, gamma, keep_states=True)
+    level, trend, season = states
+    residuals = Y - fitted
+
+    horizon = np.arange(1, periods + 1, dtype=np.float64)
+    position = (n_days - 1 + horizon).astype(np.int64) % m
+    future = level[:, -1, None] + _damped_steps(horizon, DAMPING) * trend[:, -1, None] + season[:, -1][:, position]
+
+    tail = (1 - interval_width) / 2
+    fit_lower, fit_upper = _error_quantiles(residuals[:, m:], tail)
+    lower, upper = _horizon_quantiles(Y, states, m, periods, tail, fit_lower, fit_upper)
+
+    results = []
+    for row, i in enumerate(indices):
+        history = histories[i]
+        future_dates = pd.date_range(start=history['ds'].max() + pd.Timedelta(days=1), periods=periods, freq='D')
+        yhat = np.concatenate([fitted[row], future[row]])
+        forecast = pd.DataFrame({
+            'ds': np.concatenate([history['ds'].to_numpy(), future_dates.to_numpy()]),
+            'yhat': np.maximum(yhat, 0),
+            'yhat_lower': np.maximum(np.concatenate([fitted[row] + fit_lower[row], future[row] + lower[row]]), 0),
+            'yhat_upper': np.maximum(np.concatenate([fitted[row] + fit_upper[row], future[row] + upper[row]]), 0)
+        })
+        params = {'alpha': float(alpha[row]), 'beta': float(beta[row]), 'gamma': float(gamma[row])}
+        model = ExponentialSmoothingModel(
+            history, level[row, -1], trend[row, -1], season[row, -1].copy(), params,
+            fitted=fitted[row], fitted_weekly=fitted_weekly[row]
+        )
+        results.append((model, forecast))
+    return results
+
+
+def _smoothing(alpha, beta, gamma, m):
+    # Error-correction form: trend and season gains scale with the level gain
+    gamma = gamma * (1 - alpha) if m > 1 else np.zeros_like(gamma)
+    return alpha, alpha * beta, gamma
+
+
+def _smooth(Y, m, alpha, beta, gamma, keep_states=False):
+    """Run the recursion over the days for all parameter sets and series
+
+    ``alpha``/``beta``/``gamma`` broadcast against (series,): shape (P, 1)
+    smooths every series with P parameter sets, shape (series,) one each.
+    Returns the summed squared one-step errors and, with ``keep_states``,
+    the one-step fitted values, the (level, trend, season) after each day
+    and the seasonal part of each fitted value.
+    """
+    n_series, n_days = Y.shape
+    start = Y[:, :m].mean(axis=1)
+    shape = np.broadcast_shapes(np.shape(alpha), (n_series,))
+    level = np.broadcast_to(start, shape).copy()
+    if n_days >= 2 * m:
+        slope = (Y[:, m:2 * m].mean(axis=1) - start) / m
+    else:
+        slope = np.zeros(n_series)
+    trend = np.broadcast_to(slope, shape).copy()
+    season = np.broadcast_to(Y[:, :m] - start[:, None], shape + (m,)).copy()
+
+    sse = np.zeros(shape)
+    if keep_states:
+        fitted = np.empty((n_series, n_days))
+        levels = np.empty((n_series, n_days))
+        trends = np.empty((n_series, n_days))
+        seasons = np.empty((n_series, n_days, m))
+        weeklies = np.empty((n_series, n_days))
+
+    for t in range(n_days):
+        s = t % m
+        prediction = level + DAMPING * trend + season[..., s]
+        error = Y[:, t] - prediction
+        if t >= m:
+            # The first season only initialises the states
+            sse += error ** 2
+        if keep_states:
+            fitted[:, t] = prediction
+            weeklies[:, t] = season[..., s]
+        level = prediction - season[..., s] + alpha * error
+        trend = DAMPING * trend + beta * error
+        season[..., s] += gamma * error
+        if keep_states:
+            levels[:, t] = level
+            trends[:, t] = trend
+            seasons[:, t] = season
+
+    if keep_states:
+        return sse, fitted, (levels, trends, seasons), weeklies
+    return sse, None, None, None
+
+
+def _horizon_quantiles(Y, states, m, periods, tail, fit_lower, fit_upper):
+    """Band offsets per series and horizon from the past h-step errors
+
+    Horizons with too few past errors get the band of the longest horizon
+    that had enough, widened by sqrt(h / that horizon); the one-step band
+    of the fitted values when there is none.
+    """
+    level, trend, season = states
+    n_series, n_days = Y.shape
+    lower = np.empty((n_series, periods))
+    upper = np.empty((n_series, periods))
+    last_h, last_lower, last_upper = 1, fit_lower, fit_upper
+    for h in range(1, periods + 1):
+        origins = np.arange(m, n_days - h)
+        if len(origins) >= MIN_ERRORS:
+            position = (origins + h) % m
+            forecast = (level[:, origins] + _damped_steps(h, DAMPING) * trend[:, origins]
+                        + season[:, origins, position])
+            last_lower, last_upper = _error_quantiles(Y[:, origins + h] - forecast, tail)
+            last_h = h
+        widen = np.sqrt(h / last_h)
+        lower[:, h - 1] = last_lower * widen
+        upper[:, h - 1] = last_upper * widen
+    return lower, upper
+
+
+def _error_quantiles(errors, tail):
+    if errors.shape[1] == 0:
+        return np.zeros(len(errors)), np.zeros(len(errors))
+    # Biased errors must not push the band off the forecast
+    lower = np.minimum(np.quantile(errors, tail, axis=1), 0)
+    upper = np.maximum(np.quantile(errors, 1 - tail, axis=1), 0)
+    return lower, upper
+
+
+def _damped_steps(steps, damping):
+    # damping + damping^2 + ... + damping^h, the trend's weight h days ahead
+    return damping * (1 - np.power(damping, steps)) / (1 - damping)
+
+
+def _empty_forecast(history, periods):
+    model = ExponentialSmoothingModel(history, 0.0, 0.0, np.zeros(1), {})
+    future_dates = pd.date_range(start=pd.Timestamp.today().normalize(), periods=periods, freq='D')
+    forecast = pd.DataFrame({'ds': future_dates, 'yhat': 0.0, 'yhat_lower': 0.0, 'yhat_upper': 0.0})
+    return model, forecast
@@ -0,0 +1,252 @@
+"""
+Forest Scoring Module for P&G Supply Chain Analytics
+Late delivery features and a NumPy-only random forest scorer (no scikit-learn)
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Code scored for category values the late delivery model was not trained on
+UNKNOWN_CATEGORY_CODE = 0
+
+# Rows walked through the trees at once by ForestScorer
+BLOCK_ROWS = 4096
+
+
+def late_risk_matrix(data, feature_cols, category_classes):
+    """Contiguous float32 matrix of the late delivery features, same encoding as training
+
+    ``category_classes`` maps each encoded column to its training classes
+    (in code order). Features the data cannot provide are 0, as before.
+    """
+    X = np.zeros((len(data), len(feature_cols)), dtype=np.float32)
+    position = {col: i for i, col in enumerate(feature_cols)}
+
+    # Extract time-based features
+    if 'Actual_Ship_Date' in data.columns:
+        ship_dates = pd.to_datetime(data['Actual_Ship_Date']).dt
+        for col, values in (('Ship_DayOfWeek', ship_dates.dayofweek),
+                            ('Ship_Month', ship_dates.month),
+                            ('Ship_Quarter', ship_dates.quarter)):
+            if col in position:
+                X[:, position[col]] = values.to_numpy(dtype=np.float32, na_value=np.nan)
+
+    # Add quantity if available
+    if 'Quantity' in data.columns and 'Quantity_Log' in position:
+        X[:, position['Quantity_Log']] = np.log1p(data['Quantity'].fillna(0)).to_numpy(dtype=np.float32)
+
+    # Encode categorical variables with the training classes
+    for col, classes in category_classes.items():
+        if col in data.columns and f'{col}_Encoded' in position:
+            X[:, position[f'{col}_Encoded']] = encode_categories(classes, data[col], col)
+
+    return X
+
+
+def encode_categories(classes, values, col=None):
+    """Training codes of a column's values; unknown values get the reserved code
+
+    The reserved code is the first class' code, which is what unknown
+    values have always been scored as. Missing values are encoded as
+    'Unknown' (like in training) when that was a training class.
+    """
+    classes = classes if isinstance(classes, pd.Index) else pd.Index(classes, dtype=object)
+    try:
+        # Look up each distinct value once, then spread the codes over the rows
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            row_codes = values.cat.codes.to_numpy()
+            uniques = pd.Index(values.cat.categories, dtype=object)
+        else:
+            row_codes, uniques = pd.factorize(values)
+            uniques = pd.Index(uniques, dtype=object)
+
+        unique_codes = classes.get_indexer(uniques)
+        unique_codes[unique_codes < 0] = UNKNOWN_CATEGORY_CODE
+        missing_code = classes.get_indexer(['Unknown'])[0]
+        if missing_code < 0:
+            missing_code = UNKNOWN_CATEGORY_CODE
+
+        codes = np.full(len(values), missing_code, dtype=np.int64)
+        present = row_codes >= 0
+        codes[present] = unique_codes[row_codes[present]]
+        return codes
+    except Exception as e:
+        logger.warning(f"Could not encode {col} for scoring: {str(e)}")
+        return UNKNOWN_CATEGORY_CODE  # Default value if encoding fails
+
+
+class ForestScorer:
+    """A trained random forest classifier as flat node arrays
+
+    All trees' nodes are concatenated, numbered so each node's children are
+    adjacent: ``left`` is a node's left child (the right one is next to it)
+    and leaves point at themselves with an infinite threshold, so a walk
+    that reaches a leaf stays there. ``roots`` holds the first node of each
+    tree and ``values`` each node's class probabilities. Thresholds are
+    stored as the largest float32 not above sklearn's float64 threshold,
+    which splits float32 features exactly like sklearn does. Prediction
+    walks every (shipment, tree) pair down one level per step with
+    vectorized gathers: max depth x shipments x trees array operations.
+    """
+
+    def __init__(self, feature, threshold, left, missing_left, values, roots, classes, max_depth):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.missing_left = missing_left
+        self.values = values
+        self.roots = roots
+        self.classes = classes
+        self.max_depth = max_depth
+
+    @classmethod
+    def from_forest(cls, forest):
+        """Flatten a fitted sklearn RandomForestClassifier (single output)"""
+        parts = {key: [] for key in ('feature', 'threshold', 'left', 'missing_left', 'values')}
+        roots = []
+        offset = 0
+        max_depth = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            roots.append(offset)
+            max_depth = max(max_depth, tree.max_depth)
+
+            # Breadth-first numbering puts siblings next to each other
+            order = [0]
+            for node in order:
+                if tree.children_left[node] >= 0:
+                    order.extend((tree.children_left[node], tree.children_right[node]))
+            order = np.asarray(order)
+            position = np.empty(tree.node_count, dtype=np.int64)
+            position[order] = np.arange(len(order)) + offset
+
+            split = tree.children_left[order] >= 0
+            parts['left'].append(np.where(split, position[tree.children_left[order]], position[order]))
+            parts['feature'].append(np.where(split, tree.feature[order], 0))
+            threshold = tree.threshold[order]
+            threshold32 = threshold.astype(np.float32)
+            rounded_up = threshold32 > threshold
+            threshold32[rounded_up] = np.nextafter(threshold32[rounded_up], np.float32(-np.inf))
+            parts['threshold'].append(np.where(split, threshold32, np.float32(np.inf)))
+            missing_left = getattr(tree, 'missing_go_to_left', None)
+            parts['missing_left'].append(
+                np.ones(len(order), dtype=bool) if missing_left is None
+                else (missing_left[order] != 0) | ~split
+            )
+            # Class probabilities per node, normalized like DecisionTreeClassifier.predict_proba
+            values = tree.value[order, 0, :forest.n_classes_].astype(np.float64)
+            totals = values.sum(axis=1, keepdims=True)
+            totals[totals == 0.0] = 1.0
+            parts['values'].append(values / totals)
+            offset += len(order)
+
+        return cls(
+            feature=np.concatenate(parts['feature']).astype(np.int32),
+            threshold=np.concatenate(parts['threshold']).astype(np.float32),
+            left=np.concatenate(parts['left']).astype(np.int32),
+            missing_left=np.concatenate(parts['missing_left']),
+            values=np.concatenate(parts['values']),
+            roots=np.asarray(roots, dtype=np.int32),
+            classes=np.asarray(forest.classes_),
+            max_depth=int(max_depth)
+        )
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, key).nbytes for key in (
+            'feature', 'threshold', 'left', 'missing_left', 'values', 'roots', 'classes'
+        ))
+
+    def apply(self, X):
+        """Leaf node of every tree for every row: (rows, trees) array"""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        flat = X.ravel()
+        row_offsets = (np.arange(len(X), dtype=np.int64) * X.shape[1])[:, None]
+        nodes = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+        has_missing = np.isnan(flat).any()
+        for _ in range(self.max_depth):
+            x = flat[row_offsets + self.feature[nodes]]
+            go_right = x > self.threshold[nodes]
+            if has_missing:
+                go_right |= np.isnan(x) & ~self.missing_left[nodes]
+            nodes = self.left[nodes] + go_right
+        return nodes
+
+    def predict_proba(self, X):
+        """Mean of the trees' class probabilities, like RandomForestClassifier"""
+        X = np.asarray(X, dtype=np.float32)
+        proba = np.zeros((len(X), self.values.shape[1]), dtype=np.float64)
+        # Rows in blocks, bounding the (rows, trees) work arrays
+        for start in range(0, len(X), BLOCK_ROWS):
+            leaves = self.apply(X[start:start + BLOCK_ROWS])
+            block = proba[start:start + BLOCK_ROWS]
+            # Trees added one at a time, in order, as sklearn accumulates them
+            for tree in range(leaves.shape[1]):
+                block += self.values[leaves[:, tree]]
+        proba /= len(self.roots)
+        return proba
+
+    def predict(self, X):
+        return self.classes.take(np.argmax(self.predict_proba(X), axis=1))
+
+
+class LateRiskScorer:
+    """Late delivery risk scoring without scikit-learn
+
+    The exported forest plus everything needed to build its features: the
+    feature order and each encoded column's training classes. Saved as a
+    single .npz file.
+    """
+
+    def __init__(self, forest, feature_names, category_classes):
+        self.forest = forest
+        self.feature_names = list(feature_names)
+        self.category_classes = {
+            col: pd.Index(classes, dtype=object) for col, classes in category_classes.items()
+        }
+
+    @classmethod
+    def from_forest(cls, forest, category_classes):
+        """Scorer of a fitted RandomForestClassifier and its encoders' classes"""
+        return cls(ForestScorer.from_forest(forest), forest.feature_names_in_, category_classes)
+
+    def late_risk_scores(self, data):
+        """Late risk scores and 0/1 predictions for shipments, data left unchanged"""
+        X = late_risk_matrix(data, self.feature_names, self.category_classes)
+        proba = self.forest.predict_proba(X)
+        risk_scores = proba[:, 1] if proba.shape[1] > 1 else np.zeros(len(X))
+        predictions = self.forest.classes.take(np.argmax(proba, axis=1))
+        return risk_scores, predictions
+
+    def save(self, path):
+        """Write the scorer as one compressed .npz file"""
+        forest = self.forest
+        arrays = {
+            'feature': forest.feature, 'threshold': forest.threshold,
+            'left': forest.left, 'missing_left': forest.missing_left, 'values': forest.values,
+            'roots': forest.roots, 'classes': forest.classes,
+            'max_depth': np.asarray(forest.max_depth),
+            'feature_names': np.asarray(self.feature_names, dtype=str),
+            'category_columns': np.asarray(list(self.category_classes), dtype=str)
+        }
+        for i, classes in enumerate(self.category_classes.values()):
+            arrays[f'category_classes_{i}'] = np.asarray(classes, dtype=str)
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as f:
+            forest = ForestScorer(
+                feature=f['feature'], threshold=f['threshold'],
+                left=f['left'], missing_left=f['missing_left'], values=f['values'],
+                roots=f['roots'], classes=f['classes'],
+                max_depth=int(f['max_depth'])
+            )
+            category_classes = {
+                str(col): f[f'category_classes_{i}'].astype(object)
+                for i, col in enumerate(f['category_columns'])
+            }
+            return cls(forest, f['feature_names'].tolist(), category_classes)
@@ -0,0 +1,196 @@
+"""
+Hierarchical Forecast Module for P&G Supply Chain Analytics
+Per-series demand forecasts by Category, Source and Master_Brand, reconciled to the total
+"""
+
+import os
+import time
+import hashlib
+import logging
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from utils.lazy_imports import lazy_from
+from ml_models.exponential_smoothing import ExponentialSmoothingModel, forecast_exponential_smoothing
+from ml_models.predictive import PredictiveModels, fit_demand_forecast, PROPHET_AVAILABLE
+
+logger = logging.getLogger(__name__)
+
+model_to_json = lazy_from('prophet.serialize', 'model_to_json')
+
+# Levels forecast below the total; the series of each level sum to the total
+HIERARCHY_LEVELS = ['Category', 'Source', 'Master_Brand']
+TOTAL = 'Total'
+
+# Label of shipments without a value for a level
+MISSING_LABEL = 'Unknown'
+
+FORECAST_COLUMNS = ['ds', 'yhat', 'yhat_lower', 'yhat_upper']
+
+
+def hierarchy_series(data, levels=HIERARCHY_LEVELS, date_column='Actual_Ship_Date'):
+    """Daily shipment counts of the total and of every series of each level
+
+    Returns {(level, series): ds/y frame}, the total under (TOTAL, TOTAL).
+    All series share the total's days (days without shipments are 0).
+    """
+    total = data.groupby(pd.Grouper(key=date_column, freq='D')).size()
+    series = {(TOTAL, TOTAL): total}
+    for level in levels:
+        if level not in data.columns:
+            continue
+        counts = data.groupby(
+            [pd.Grouper(key=date_column, freq='D'), level], observed=True, dropna=False
+        ).size().unstack(fill_value=0).reindex(total.index, fill_value=0)
+        for name in counts.columns:
+            key = (level, MISSING_LABEL if pd.isna(name) else str(name))
+            series[key] = series[key] + counts[name] if key in series else counts[name]
+
+    return {
+        key: pd.DataFrame({'ds': values.index, 'y': values.to_numpy()})
+        for key, values in series.items()
+    }
+
+
+def forecast_hierarchy(data, levels=HIERARCHY_LEVELS, params=None, workers=None, registry=None):
+    """Forecast the total and every Category, Source and Master_Brand series
+
+    Every series gets its own model. Exponential smoothing fits all series
+    in one batch of array operations; Prophet (engine 'prophet') fits run
+    on a process pool. With a ModelRegistry the
+    fitted models are cached per series, keyed by a hash of that series'
+    history: a new data version only refits the series whose history
+    changed. The forecasts are then reconciled to the total (see
+    reconcile_forecasts()).
+
+    Returns (forecasts, fits). ``forecasts`` has one row per series and
+    future day: level, series, ds, the reconciled yhat/yhat_lower/yhat_upper
+    and the series' own forecast as yhat_base. ``fits`` has one row per
+    series: its days of history, shipments, whether it came from the cache
+    and the fit time.
+    """
+    params = params or PredictiveModels.HYPERPARAMETERS['demand_forecast']
+    series = hierarchy_series(data, levels)
+
+    fitted = {}
+    jobs = []
+    for key, history in series.items():
+        version = _series_version(history)
+        cached = registry.load(_series_model_name(key), version, params) if registry is not None else None
+        if cached is not None:
+            fitted[key] = dict(cached, cached=True)
+        else:
+            jobs.append((key, history, version))
+
+    logger.info(f"Hierarchical forecast: {len(series)} series, {len(jobs)} to fit, {len(fitted)} cached")
+
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if not jobs:
+        results = []
+    elif params['engine'] != 'prophet' or not PROPHET_AVAILABLE:
+        results = _fit_smoothing_batch(jobs, params)
+    elif workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [(key, version, pool.submit(_fit_series_job, history, params))
+                       for key, history, version in jobs]
+            results = [(key, version, future.result()) for key, version, future in futures]
+    else:
+        results = [(key, version, _fit_series_job(history, params)) for key, history, version in jobs]
+
+    for key, version, artifacts in results:
+        if registry is not None:
+            registry.save(_series_model_name(key), version, params, artifacts)
+        fitted[key] = dict(artifacts, cached=False)
+
+    forecasts = reconcile_forecasts({key: fitted[key]['forecast'] for key in series}, series)
+    fits = pd.DataFrame([
+        {
+            'level': level, 'series': name,
+            'days': len(series[level, name]), 'shipments': int(series[level, name]['y'].sum()),
+            'cached': fitted[level, name]['cached'], 'fit_seconds': fitted[level, name]['fit_seconds']
+        }
+        for level, name in series
+    ])
+    return forecasts, fits
+
+
+def reconcile_forecasts(forecasts, histories):
+    """Scale each level's future forecasts to sum to the total forecast
+
+    Per future day and level, every series' forecast (clipped at 0) is
+    multiplied by total / sum of the level's forecasts, and its bands by
+    the same factor. Days the level forecasts no shipments at all are split
+    by each series' share of the history.
+    """
+    last_day = histories[TOTAL, TOTAL]['ds'].max()
+
+    def future(key):
+        forecast = forecasts[key]
+        forecast = forecast[forecast['ds'] > last_day].set_index('ds')[FORECAST_COLUMNS[1:]]
+        return forecast.clip(lower=0)
+
+    total = future((TOTAL, TOTAL))
+    frames = [_forecast_frame(TOTAL, TOTAL, total, total['yhat'])]
+
+    levels = list(dict.fromkeys(level for level, _ in forecasts if level != TOTAL))
+    for level in levels:
+        keys = [key for key in forecasts if key[0] == level]
+        base = {key: future(key).reindex(total.index, fill_value=0.0) for key in keys}
+        level_sum = sum(base[key]['yhat'] for key in keys)
+        shares = np.array([histories[key]['y'].sum() for key in keys], dtype=np.float64)
+        shares = shares / shares.sum() if shares.sum() > 0 else np.full(len(keys), 1.0 / len(keys))
+        scale = (total['yhat'] / level_sum).where(level_sum > 0)
+        for key, share in zip(keys, shares):
+            reconciled = base[key].mul(scale, axis=0)
+            # Nothing forecast for the whole level: split the total by history
+            unforecast = scale.isna()
+            reconciled.loc[unforecast] = total.loc[unforecast] * share
+            frames.append(_forecast_frame(level, key[1], reconciled, base[key]['yhat']))
+
+    return pd.concat(frames, ignore_index=True)
+
+
+def _forecast_frame(level, name, forecast, base):
+    frame = forecast.reset_index()
+    frame.insert(0, 'series', name)
+    frame.insert(0, 'level', level)
+    frame['yhat_base'] = base.to_numpy()
+    return frame
+
+
+def _series_model_name(key):
+    # Fixed-length names, so no series' registry entries prefix another's
+    digest = hashlib.sha256('\x1f'.join(key).encode()).hexdigest()[:12]
+    return f'demand_series_{digest}'
+
+
+def _series_version(history):
+    digest = hashlib.sha256()
+    digest.update(history['ds'].to_numpy(dtype='datetime64[ns]').view(np.int64).tobytes())
+    digest.update(history['y'].to_numpy(dtype=np.float64).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def _fit_smoothing_batch(jobs, params):
+    started = time.perf_counter()
+    fitted = forecast_exponential_smoothing(
+        [history for _, history, _ in jobs], periods=params['periods'], interval_width=params['interval_width']
+    )
+    # The batch's time, shared out over its series
+    fit_seconds = (time.perf_counter() - started) / len(jobs)
+    return [
+        (key, version, {'model': model, 'forecast': forecast[FORECAST_COLUMNS], 'fit_seconds': fit_seconds})
+        for (key, _, version), (model, forecast) in zip(jobs, fitted)
+    ]
+
+
+# Fits one series with Prophet, in a pool worker or inline with one worker;
+# the model comes back as JSON, so it crosses the process boundary small
+def _fit_series_job(history, params):
+    started = time.perf_counter()
+    model, forecast = fit_demand_forecast(history, params)
+    fit_seconds = time.perf_counter() - started
+    if not isinstance(model, ExponentialSmoothingModel):
+        # Prophet models are stored as JSON, their portable form
+        model = model_to_json(model)
+    return {'model': model, 'forecast': forecast[FORECAST_COLUMNS], 'fit_seconds': fit_seconds}
@@ -0,0 +1,160 @@
+"""
+Late Features Module for P&G Supply Chain Analytics
+Late delivery training features built in one pass into a float32 matrix, cached per data version
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+from utils.dataset_service import LatestVersionCache
+
+logger = logging.getLogger(__name__)
+
+DATE_FEATURES = ['Ship_DayOfWeek', 'Ship_Month', 'Ship_Quarter']
+CATEGORICAL_COLUMNS = ['Category', 'Master_Brand', 'Source', 'SLS_Plant']
+
+# Label encoded for missing category values
+MISSING_LABEL = 'Unknown'
+
+# Features of the latest data version, keyed by its row count
+_cache = LatestVersionCache()
+
+
+class LateDeliveryFeatures:
+    """Feature matrix, target and encoding of the late delivery model's training rows
+
+    ``matrix`` is a read-only, C-contiguous float32 array (one row per
+    shipment in ``index``, one column per name in ``feature_names``);
+    ``target`` is 1 for late shipments. ``category_classes`` maps each
+    encoded column to its classes in code order.
+    """
+
+    def __init__(self, matrix, target, feature_names, index, category_classes):
+        self.matrix = matrix
+        self.target = target
+        self.feature_names = feature_names
+        self.index = index
+        self.category_classes = category_classes
+
+    @property
+    def nbytes(self):
+        return self.matrix.nbytes + self.target.nbytes
+
+
+def late_delivery_features(data):
+    """Build the training features straight from the columns they need
+
+    Nothing is added to or copied from the frame: the ship dates are parsed
+    once, each category column is factorized once, and every feature is
+    written into its column of the matrix as soon as it is computed. Rows
+    without a ship date, or with a quantity below -1 (no log), are left out.
+    """
+    # Rows kept: a ship date, and a quantity log1p() can take
+    ship_dates = pd.DatetimeIndex(pd.to_datetime(data['Actual_Ship_Date']))
+    valid = ~ship_dates.isna()
+    quantity_log = None
+    if 'Quantity' in data.columns:
+        quantity = pd.to_numeric(data['Quantity'], errors='coerce').to_numpy(dtype=np.float64, na_value=0.0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            quantity_log = np.log1p(quantity)
+        valid &= ~np.isnan(quantity_log)
+    keep = None if valid.all() else np.flatnonzero(valid)
+
+    categorical_cols = [col for col in CATEGORICAL_COLUMNS if col in data.columns]
+    feature_names = DATE_FEATURES + [f'{col}_Encoded' for col in categorical_cols]
+    if quantity_log is not None:
+        feature_names.append('Quantity_Log')
+    matrix = np.empty((len(data) if keep is None else len(keep), len(feature_names)), dtype=np.float32)
+
+    def write(j, values):
+        matrix[:, j] = values if keep is None else values[keep]
+
+    # Extract time-based features (one parse, month gives the quarter)
+    write(0, ship_dates.dayofweek.to_numpy())
+    month = ship_dates.month.to_numpy()
+    write(1, month)
+    write(2, (month - 1) // 3 + 1)
+    del ship_dates, month
+
+    # Encode categorical variables over all rows, like LabelEncoder on their strings
+    category_classes = {}
+    for j, col in enumerate(categorical_cols, start=len(DATE_FEATURES)):
+        codes, category_classes[col] = fit_category_codes(data[col])
+        write(j, codes)
+
+    if quantity_log is not None:
+        write(len(feature_names) - 1, quantity_log)
+    matrix.flags.writeable = False
+
+    # Create target variable (1 if Late, 0 otherwise)
+    target = (data['Delivery_Status'] == 'Late').to_numpy(dtype=np.int64)
+    index = data.index
+    if keep is not None:
+        target = target[keep]
+        index = index[keep]
+
+    return LateDeliveryFeatures(matrix, target, feature_names, index, category_classes)
+
+
+def cached_late_delivery_features(data, data_version):
+    """late_delivery_features() of a dataset, built once per data version (see LatestVersionCache)"""
+    def build(previous):
+        features = late_delivery_features(data)
+        if data_version is not None:
+            logger.info(f"Built late delivery features for data version {data_version}: "
+                        f"{features.matrix.shape[0]} rows, {features.nbytes / 1e6:.1f} MB")
+        return features
+    return _cache.get(data_version, len(data), build)
+
+
+def fit_category_codes(values):
+    """Codes and sorted classes of a column's values as strings (missing as 'Unknown')
+
+    Gives LabelEncoder's codes and classes_ while converting only the
+    distinct values to strings.
+    """
+    row_codes, uniques = pd.factorize(values)
+    labels = [str(value) for value in uniques]
+    missing = row_codes < 0
+    if missing.any():
+        row_codes = row_codes.copy()
+        row_codes[missing] = len(labels)
+        labels.append(MISSING_LABEL)
+
+    classes, label_codes = np.unique(np.array(labels, dtype=object), return_inverse=True)
+    return label_codes[row_codes], classes
+
+
+def stratified_sample(strata, n_rows, random_state=42):
+    """Sorted positions of a proportional stratified sample of ``n_rows`` rows
+
+    ``strata`` has one row per candidate row and one column per
+    stratifying variable. Every stratum gets its share of ``n_rows``
+    (largest remainders rounded up) but at least one row, so rare
+    combinations stay represented; the sample can exceed ``n_rows`` by at
+    most the number of strata. Returns (positions, number of strata).
+    """
+    total = len(strata)
+    # One code per combination of the columns' values (missing is a value
+    # of its own, not the -1 sentinel, which would collide with other codes)
+    key = np.zeros(total, dtype=np.int64)
+    for column in np.asarray(strata).T:
+        codes, uniques = pd.factorize(column, use_na_sentinel=False)
+        key = key * len(uniques) + codes
+    inverse, _ = pd.factorize(key)
+    counts = np.bincount(inverse)
+    if total <= n_rows:
+        return np.arange(total), len(counts)
+
+    shares = counts * (n_rows / total)
+    quotas = np.floor(shares).astype(np.int64)
+    quotas[np.argsort(quotas - shares, kind='stable')[:n_rows - quotas.sum()]] += 1
+    quotas = np.clip(quotas, 1, counts)
+
+    # Random order within each stratum, then its first quota rows
+    shuffled = np.random.default_rng(random_state).permutation(total)
+    order = shuffled[np.argsort(inverse[shuffled], kind='stable')]
+    strata_order = inverse[order]
+    starts = np.cumsum(counts) - counts
+    rank = np.arange(total) - starts[strata_order]
+    return np.sort(order[rank < quotas[strata_order]]), len(counts)
@@ -0,0 +1,181 @@
+"""
+Model Registry Module for P&G Supply Chain Analytics
+On-disk store of trained models keyed by data version and hyperparameters
+"""
+
+import os
+import json
+import pickle
+import hashlib
+import logging
+from importlib.metadata import version, PackageNotFoundError
+
+try:
+    import joblib
+    JOBLIB_AVAILABLE = True
+except ImportError:
+    JOBLIB_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# From the package metadata, so the registry never has to import scikit-learn
+try:
+    SKLEARN_VERSION = version('scikit-learn')
+except PackageNotFoundError:
+    SKLEARN_VERSION = None
+
+DEFAULT_REGISTRY_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'models'
+)
+
+
+class ModelRegistry:
+    """Trained model artifacts saved as one file per model and key
+
+    The key is a hash of the model name, the data version, the model's
+    hyperparameters and the scikit-learn version, so an entry is only ever
+    loaded for the exact data and settings it was trained with. Saving a
+    model removes its entries with the same hyperparameters under older
+    keys; entries with other hyperparameters (such as another training
+    mode) are kept. Next to each entry a small
+    JSON file records its data version and hyperparameters, so the model
+    trained on an earlier data version can be found for incremental
+    retraining (see latest()).
+    """
+
+    def __init__(self, registry_dir=DEFAULT_REGISTRY_DIR):
+        self.registry_dir = registry_dir
+
+    @staticmethod
+    def spec(name, data_version, params):
+        """What a registry entry was trained on and with"""
+        return {
+            'name': name,
+            'data_version': data_version,
+            'params': params,
+            'sklearn': SKLEARN_VERSION
+        }
+
+    @classmethod
+    def key(cls, name, data_version, params):
+        """Registry key of a model trained on a data version with these params"""
+        payload = json.dumps(cls.spec(name, data_version, params), sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+    def path(self, name, key):
+        return os.path.join(self.registry_dir, f'{name}-{key}.joblib')
+
+    def latest(self, name, params):
+        """Newest saved entry of a model with these params, on any data version
+
+        Returns (data_version, artifacts), or None when there is no such entry.
+        """
+        if not os.path.isdir(self.registry_dir):
+            return None
+
+        wanted = self._comparable(params)
+        specs = []
+        for filename in os.listdir(self.registry_dir):
+            if not (filename.startswith(f'{name}-') and filename.endswith('.json')):
+                continue
+            spec_path = os.path.join(self.registry_dir, filename)
+            spec = self._read_spec(spec_path)
+            if spec is not None and spec.get('params') == wanted and spec.get('sklearn') == SKLEARN_VERSION:
+                specs.append((os.path.getmtime(spec_path), spec))
+
+        for _, spec in sorted(specs, key=lambda item: item[0], reverse=True):
+            artifacts = self.load(name, spec['data_version'], params)
+            if artifacts is not None:
+                return spec['data_version'], artifacts
+        return None
+
+    def load(self, name, data_version, params):
+        """Saved artifacts of a model, or None when there is no usable entry"""
+        if data_version is None:
+            return None
+
+        path = self.path(name, self.key(name, data_version, params))
+        if not os.path.exists(path):
+            return None
+
+        try:
+            if JOBLIB_AVAILABLE:
+                artifacts = joblib.load(path)
+            else:
+                with open(path, 'rb') as f:
+                    artifacts = pickle.load(f)
+            logger.info(f"Loaded {name} model from registry ({os.path.basename(path)})")
+            return artifacts
+        except Exception as e:
+            logger.warning(f"Could not load {name} model from registry: {str(e)}")
+            return None
+
+    def save(self, name, data_version, params, artifacts):
+        """Save a model's artifacts; returns True when the entry was written
+
+        The file is written under a temporary name and renamed into place,
+        so a concurrent load never sees a partial entry.
+        """
+        if data_version is None:
+            return False
+
+        key = self.key(name, data_version, params)
+        path = self.path(name, key)
+        tmp_path = f'{path}.tmp'
+        try:
+            os.makedirs(self.registry_dir, exist_ok=True)
+            if JOBLIB_AVAILABLE:
+                joblib.dump(artifacts, tmp_path)
+            else:
+                with open(tmp_path, 'wb') as f:
+                    pickle.dump(artifacts, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+            with open(tmp_path, 'w') as f:
+                json.dump(self.spec(name, data_version, params), f, default=str)
+            os.replace(tmp_path, self._spec_path(path))
+        except Exception as e:
+            logger.warning(f"Could not save {name} model to registry: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+
+        self._remove_stale(name, key, params)
+        logger.info(f"Saved {name} model to registry ({os.path.basename(path)})")
+        return True
+
+    @staticmethod
+    def _spec_path(path):
+        return f'{os.path.splitext(path)[0]}.json'
+
+    @staticmethod
+    def _comparable(params):
+        """Params as they read back from a spec file"""
+        return json.loads(json.dumps(params, default=str))
+
+    @staticmethod
+    def _read_spec(spec_path):
+        try:
+            with open(spec_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _remove_stale(self, name, key, params):
+        """Drop the entries of a model saved with the same params under any other key
+
+        Entries without a readable spec are dropped too.
+        """
+        current = os.path.basename(self.path(name, key))
+        wanted = self._comparable(params)
+        for filename in os.listdir(self.registry_dir):
+            if not (filename.startswith(f'{name}-') and filename.endswith('.joblib')) or filename == current:
+                continue
+            path = os.path.join(self.registry_dir, filename)
+            spec = self._read_spec(self._spec_path(path))
+            if spec is not None and spec.get('params') != wanted:
+                continue
+            for stale in (path, self._spec_path(path)):
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
@@ -4,91 +4,310 @@ Machine Learning Models for P&G Supply Chain Analytics
 
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.ensemble import RandomForestClassifier, IsolationForest
-from sklearn.preprocessing import LabelEncoder, StandardScaler
-from sklearn.metrics import classification_report, confusion_matrix, roc_auc_score, roc_curve
-try:
-    from prophet import Prophet
-    PROPHET_AVAILABLE = True
-except ImportError:
-    PROPHET_AVAILABLE = False
+from utils.lazy_imports import require, module_available, lazy_from
+# scikit-learn and Prophet load when a model is first trained or scored
+require('sklearn')
+train_test_split = lazy_from('sklearn.model_selection', 'train_test_split')
+RandomForestClassifier, IsolationForest = lazy_from('sklearn.ensemble', 'RandomForestClassifier', 'IsolationForest')
+LabelEncoder, StandardScaler = lazy_from('sklearn.preprocessing', 'LabelEncoder', 'StandardScaler')
+classification_report, confusion_matrix, roc_auc_score, roc_curve = lazy_from(
+    'sklearn.metrics', 'classification_report', 'confusion_matrix', 'roc_auc_score', 'roc_curve'
+)
+Prophet = lazy_from('prophet', 'Prophet')
+PROPHET_AVAILABLE = module_available('prophet')
 import plotly.graph_objects as go
 import plotly.express as px
 from datetime import datetime, timedelta
+from ml_models.exponential_smoothing import forecast_exponential_smoothing
+from ml_models.anomaly_service import AnomalyDetector, daily_anomaly_index
+from ml_models.forest_scoring import LateRiskScorer, late_risk_matrix, UNKNOWN_CATEGORY_CODE
+from ml_models.late_features import late_delivery_features, cached_late_delivery_features, stratified_sample
+from ml_models.route_matrix import cached_route_matrix
+from utils.chart_rendering import MAX_POINTS, WEBGL_THRESHOLD, record_points
+from utils.dataset_service import shipping_generation
+import logging
 import warnings
 warnings.filterwarnings('ignore')
 
+logger = logging.getLogger(__name__)
+
+
+def fit_demand_forecast(daily_demand, params):
+    """Model and forecast of a ds/y daily series with the configured engine
+    
+    Exponential smoothing unless the engine is 'prophet' and Prophet is
+    installed.
+    """
+    if params['engine'] != 'prophet' or not PROPHET_AVAILABLE:
+        return exponential_smoothing_forecast(daily_demand, params)
+    
+    # Initialize Prophet model
+    try:
+        model = Prophet(
+            daily_seasonality=False,
+            weekly_seasonality=True,
+            yearly_seasonality=True,
+            changepoint_prior_scale=params['changepoint_prior_scale'],
+            interval_width=params['interval_width']
+        )
+    except ImportError as e:
+        # Installed but not importable (e.g. a broken backend)
+        logger.warning(f"Prophet could not be loaded: {str(e)}")
+        return exponential_smoothing_forecast(daily_demand, params)
+    
+    # Add monthly seasonality
+    model.add_seasonality(name='monthly', period=30.5, fourier_order=5)
+    
+    # Fit model
+    model.fit(daily_demand)
+    
+    # Make future predictions
+    future = model.make_future_dataframe(periods=params['periods'])
+    forecast = model.predict(future)
+    return model, forecast
+
+
+def exponential_smoothing_forecast(daily_demand, params):
+    """Holt-Winters model and forecast of one ds/y daily series"""
+    return forecast_exponential_smoothing(
+        [daily_demand], periods=params['periods'], interval_width=params['interval_width']
+    )[0]
+
+
 class PredictiveModels:
-    def __init__(self, data):
+    # Hyperparameters per model; part of the model registry key
+    HYPERPARAMETERS = {
+        'late_delivery': {
+            'n_estimators': 100, 'max_depth': 10, 'random_state': 42, 'test_size': 0.2
+        },
+        'demand_forecast': {
+            'engine': 'exponential_smoothing', 'changepoint_prior_scale': 0.05,
+            'interval_width': 0.8, 'periods': 30
+        },
+        'anomaly_detection': {
+            'n_estimators': 100, 'contamination': 0.05, 'random_state': 42, 'max_samples': 100000
+        }
+    }
+    
+    # Incremental retraining of the late delivery model
+    INCREMENTAL = {
+        'trees_per_update': 20,   # Trees added per warm start
+        'max_estimators': 300,    # Retrain from scratch beyond this many trees
+        'min_new_rows': 100,      # Fewer new shipments keep the model until more arrive
+        'window_days': 90         # History used by the 'window' mode
+    }
+    
+    # Stratified subsample training of the late delivery model ('sample' mode)
+    SUBSAMPLE = {
+        'max_rows': 200000,                 # Row budget (training and test rows)
+        'strata': ['Category', 'Source']    # Sampled per value pair, late and on time apart
+    }
+    
+    # Late delivery training mode when none is given; each mode has its own registry entry
+    DEFAULT_LATE_DELIVERY_MODE = 'full'
+    
+    def __init__(self, data, data_version=None):
         self.data = data
+        self.data_version = data_version
         self.models = {}
         self.encoders = {}
         self.scalers = {}
+        # Training output per model (what the train_* methods returned)
+        self.results = {}
+        # Training mode requested for the late delivery model
+        self.late_delivery_mode = None
+        # Column -> (encoder, Index of its classes) used to encode for scoring
+        self._category_lookups = {}
+        # Anomaly_Score/Is_Anomaly per scored shipment, and their per-day summary
+        self.anomaly_scores = None
+        self.anomaly_index = None
+        
+    def prepare_features_for_late_prediction(self, data=None):
+        """Prepare features for late delivery prediction
+        
+        X is a DataFrame over the contiguous float32 matrix of
+        late_features.late_delivery_features(), not a copy of it. The
+        features of the full data are cached per data version.
+        """
+        if data is None:
+            features = cached_late_delivery_features(self.data, self.data_version)
+        else:
+            features = late_delivery_features(data)
+        
+        for col, classes in features.category_classes.items():
+            le = LabelEncoder()
+            le.classes_ = classes
+            self.encoders[col] = le
         
-    def prepare_features_for_late_prediction(self):
-        """Prepare features for late delivery prediction"""
-        # Create feature dataframe
-        features_df = self.data.copy()
-        
-        # Create target variable (1 if Late, 0 otherwise)
-        features_df['Is_Late'] = (features_df['Delivery_Status'] == 'Late').astype(int)
-        
-        # Extract time-based features
-        features_df['Ship_DayOfWeek'] = pd.to_datetime(features_df['Actual_Ship_Date']).dt.dayofweek
-        features_df['Ship_Month'] = pd.to_datetime(features_df['Actual_Ship_Date']).dt.month
-        features_df['Ship_Quarter'] = pd.to_datetime(features_df['Actual_Ship_Date']).dt.quarter
-        
-        # Encode categorical variables
-        categorical_cols = ['Category', 'Master_Brand', 'Source', 'SLS_Plant']
-        
-        for col in categorical_cols:
-            if col in features_df.columns:
-                le = LabelEncoder()
-                # Ensure all values are strings before encoding
-                features_df[f'{col}_Encoded'] = le.fit_transform(features_df[col].fillna('Unknown').astype(str))
-                self.encoders[col] = le
-        
-        # Select features
-        feature_cols = [
-            'Ship_DayOfWeek', 'Ship_Month', 'Ship_Quarter',
-            'Category_Encoded', 'Master_Brand_Encoded', 
-            'Source_Encoded', 'SLS_Plant_Encoded'
-        ]
-        
-        # Add quantity if available
-        if 'Quantity' in features_df.columns:
-            # Ensure Quantity is numeric
-            features_df['Quantity'] = pd.to_numeric(features_df['Quantity'], errors='coerce').fillna(0)
-            features_df['Quantity_Log'] = np.log1p(features_df['Quantity'])
-            feature_cols.append('Quantity_Log')
-        
-        # Remove rows with missing values
-        valid_features = [col for col in feature_cols if col in features_df.columns]
-        X = features_df[valid_features].dropna()
-        y = features_df.loc[X.index, 'Is_Late']
-        
-        return X, y, valid_features
-    
-    def train_late_delivery_model(self):
-        """Train Random Forest model for late delivery prediction"""
-        X, y, feature_names = self.prepare_features_for_late_prediction()
+        X = pd.DataFrame(features.matrix, index=features.index, columns=features.feature_names, copy=False)
+        y = pd.Series(features.target, index=features.index, name='Is_Late')
+        
+        return X, y, list(features.feature_names)
+    
+    def train_late_delivery_model(self, mode='full', previous=None):
+        """Train Random Forest model for late delivery prediction
+        
+        ``mode`` is 'full' (all history), 'window' (only the last
+        INCREMENTAL['window_days'] days), 'sample' (a stratified sample of
+        all history within the SUBSAMPLE row budget, so training time does
+        not grow with the history) or 'warm_start': add trees for the
+        shipments that arrived since ``previous`` was trained, where
+        ``previous`` is a (data_version, artifacts) pair as returned by
+        ModelRegistry.latest(). Warm start falls back to a full retrain when
+        there is no usable previous model.
+        """
+        params = self.HYPERPARAMETERS['late_delivery']
+        self.late_delivery_mode = mode
+        
+        if mode == 'warm_start':
+            results = self._warm_start_late_delivery_model(previous)
+            if results is not None:
+                return results
+            mode = 'full'
+        
+        data = self.data
+        if mode == 'window':
+            data = self._recent_rows(self.INCREMENTAL['window_days'])
+        X, y, feature_names = self.prepare_features_for_late_prediction(None if mode in ('full', 'sample') else data)
+        sampled_from = len(X)
+        if mode == 'sample':
+            X, y = self.stratified_subsample(X, y)
         
         # Split data
         X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42, stratify=y
+            X, y, test_size=params['test_size'], random_state=params['random_state'], stratify=y
         )
         
         # Train model
         rf_model = RandomForestClassifier(
-            n_estimators=100,
-            max_depth=10,
-            random_state=42,
+            n_estimators=params['n_estimators'],
+            max_depth=params['max_depth'],
+            random_state=params['random_state'],
             n_jobs=-1
         )
         
         rf_model.fit(X_train, y_train)
         
+        lineage = {
+            'mode': mode,
+            'data_versions': [self.data_version],
+            'trained_through': self._last_ship_date(data),
+            # Shipments up to this Transaction_ID of this generation of the
+            # shipping table were available to train on
+            'generation': shipping_generation(self.data_version),
+            'through_id': self._last_transaction_id(self.data),
+            'rows_trained': len(X_train),
+            'trees_added': params['n_estimators']
+        }
+        if mode == 'sample':
+            lineage['sampled_from'] = sampled_from
+        return self._store_late_delivery_model(rf_model, X_test, y_test, feature_names, lineage)
+    
+    def stratified_subsample(self, X, y, max_rows=None):
+        """Rows of a stratified sample of the features within a row budget
+        
+        ``max_rows`` defaults to SUBSAMPLE['max_rows']. Strata are Is_Late x
+        the SUBSAMPLE['strata'] columns, each sampled in proportion to its
+        size, so the sample keeps the late rate and the category and source
+        mix of the full history.
+        """
+        encoded = [f'{col}_Encoded' for col in self.SUBSAMPLE['strata'] if f'{col}_Encoded' in X.columns]
+        strata = np.column_stack([y.to_numpy()] + [X[col].to_numpy() for col in encoded])
+        positions, n_strata = stratified_sample(
+            strata, max_rows or self.SUBSAMPLE['max_rows'], random_state=self.HYPERPARAMETERS['late_delivery']['random_state']
+        )
+        logger.info(f"Late delivery sample: {len(positions)} of {len(X)} shipments from {n_strata} strata")
+        return X.iloc[positions], y.iloc[positions]
+    
+    def _warm_start_late_delivery_model(self, previous):
+        """Add trees to a previously trained model for the newly arrived shipments
+        
+        New shipments are those appended to the shipping table since the
+        previous model: a higher Transaction_ID in the same generation of
+        the table. Returns None when warm start does not apply and the
+        model should be retrained from scratch: no previous model or
+        held-out rows, the table was rewritten (rows may have changed,
+        e.g. a status going from Not Due to Late), too many trees already,
+        or not both outcomes among the new shipments. New shipments are
+        encoded with the previous encoders, so values first seen in them
+        get the unknown code until the next full retrain.
+        
+        The model is evaluated on the whole history: the rows the previous
+        model held out (no tree has seen them), labelled from the current
+        data, plus a holdout of the new shipments.
+        """
+        if previous is None:
+            return None
+        previous_version, artifacts = previous
+        rf_model = artifacts.get('model')
+        previous_results = artifacts['results']
+        lineage = previous_results.get('lineage')
+        if rf_model is None or lineage is None or previous_results.get('test_ids') is None:
+            return None
+        
+        # Previous model as is when it already covers this data version
+        if previous_version == self.data_version:
+            self._restore_artifacts('late_delivery', artifacts)
+            return self.results['late_delivery']
+        
+        generation = shipping_generation(self.data_version)
+        if generation is None or lineage.get('generation') != generation or lineage.get('through_id') is None:
+            return None
+        
+        new_rows = self.data[self.data['Transaction_ID'].to_numpy() > lineage['through_id']]
+        self.encoders.update(artifacts['encoders'])
+        
+        if len(new_rows) < self.INCREMENTAL['min_new_rows']:
+            # Too little new data to learn from: keep the model as trained,
+            # the new shipments wait for the next update
+            logger.info(f"Only {len(new_rows)} new shipments, keeping the late delivery model")
+            self.models['late_delivery'] = rf_model
+            self.results['late_delivery'] = dict(previous_results, lineage=dict(lineage, trees_added=0))
+            return self.results['late_delivery']
+        
+        params = self.HYPERPARAMETERS['late_delivery']
+        trees = self.INCREMENTAL['trees_per_update']
+        if rf_model.n_estimators + trees > self.INCREMENTAL['max_estimators']:
+            return None
+        
+        # New shipments, encoded with the previous model's encoders
+        feature_names = list(rf_model.feature_names_in_)
+        X = pd.DataFrame(
+            self._late_risk_features(new_rows, feature_names), columns=feature_names, index=new_rows.index
+        ).dropna()
+        y = (new_rows.loc[X.index, 'Delivery_Status'] == 'Late').astype(int)
+        if y.nunique() < 2:
+            return None
+        
+        X_train, X_new_test, y_train, y_new_test = train_test_split(
+            X, y, test_size=params['test_size'], random_state=params['random_state'], stratify=y
+        )
+        rf_model.set_params(warm_start=True, n_estimators=rf_model.n_estimators + trees)
+        rf_model.fit(X_train, y_train)
+        rf_model.set_params(warm_start=False)
+        
+        # Held-out rows of the whole history, not just of the new shipments
+        held_out = self.data[self.data['Transaction_ID'].isin(previous_results['test_ids'])]
+        X_held_out = pd.DataFrame(
+            self._late_risk_features(held_out, feature_names), columns=feature_names, index=held_out.index
+        ).dropna()
+        y_held_out = (held_out.loc[X_held_out.index, 'Delivery_Status'] == 'Late').astype(int)
+        X_test = pd.concat([X_held_out, X_new_test])
+        y_test = pd.concat([y_held_out, y_new_test])
+        
+        lineage = dict(lineage, data_versions=lineage['data_versions'] + [self.data_version])
+        lineage.update({
+            'mode': 'warm_start',
+            'trained_through': self._last_ship_date(self.data),
+            'through_id': self._last_transaction_id(self.data),
+            'rows_trained': lineage['rows_trained'] + len(X_train),
+            'trees_added': trees
+        })
+        logger.info(f"Warm-started late delivery model: +{trees} trees on {len(X_train)} new shipments")
+        return self._store_late_delivery_model(rf_model, X_test, y_test, feature_names, lineage)
+    
+    def _store_late_delivery_model(self, rf_model, X_test, y_test, feature_names, lineage):
+        """Evaluate a trained late delivery model on held-out rows and keep it"""
         # Evaluate
         y_pred = rf_model.predict(X_test)
         
@@ -121,13 +340,38 @@ class PredictiveModels:
             'classification_report': classification_report(y_test, y_pred, output_dict=True),
             'confusion_matrix': confusion_matrix(y_test, y_pred),
             'model': rf_model,
-            'X_test': X_test,
+            # Held-out rows by Transaction_ID, to evaluate later updates on
+            'test_ids': self._transaction_ids(X_test.index),
             'y_test': y_test,
-            'y_pred_proba': y_pred_proba_positive  # Store only positive class probabilities
+            'y_pred_proba': y_pred_proba_positive,  # Store only positive class probabilities
+            'lineage': lineage  # Data versions and shipments the model has seen
         }
+        self.results['late_delivery'] = results
         
         return results
     
+    def _recent_rows(self, days):
+        """Shipments of the last ``days`` days of the data"""
+        ship_dates = pd.to_datetime(self.data['Actual_Ship_Date'])
+        return self.data[ship_dates > ship_dates.max() - pd.Timedelta(days=days)]
+    
+    @staticmethod
+    def _last_ship_date(data):
+        last = pd.to_datetime(data['Actual_Ship_Date']).max()
+        return None if pd.isna(last) else last
+    
+    @staticmethod
+    def _last_transaction_id(data):
+        if 'Transaction_ID' not in data.columns or data.empty:
+            return None
+        return int(data['Transaction_ID'].max())
+    
+    def _transaction_ids(self, index):
+        """Transaction_IDs of data rows, or None without the column"""
+        if 'Transaction_ID' not in self.data.columns:
+            return None
+        return self.data.loc[index, 'Transaction_ID'].to_numpy()
+    
     def create_roc_curve(self, y_true, y_pred_proba):
         """Create ROC curve visualization"""
         # y_pred_proba should already be 1D (positive class probabilities)
@@ -165,55 +409,7 @@ class PredictiveModels:
         if 'late_delivery' not in self.models:
             return None
         
-        model = self.models['late_delivery']
-        
-        # Prepare features (same as training)
-        features_df = new_data.copy()
-        
-        # Extract time-based features
-        features_df['Ship_DayOfWeek'] = pd.to_datetime(features_df['Actual_Ship_Date']).dt.dayofweek
-        features_df['Ship_Month'] = pd.to_datetime(features_df['Actual_Ship_Date']).dt.month
-        features_df['Ship_Quarter'] = pd.to_datetime(features_df['Actual_Ship_Date']).dt.quarter
-        
-        # Add quantity if available
-        if 'Quantity' in features_df.columns:
-            features_df['Quantity_Log'] = np.log1p(features_df['Quantity'].fillna(0))
-        
-        # Encode categorical variables using stored encoders
-        for col, encoder in self.encoders.items():
-            if col in features_df.columns:
-                try:
-                    # Handle unknown categories
-                    known_categories = set(encoder.classes_)
-                    features_df[f'{col}_Temp'] = features_df[col].fillna('Unknown')
-                    features_df[f'{col}_Temp'] = features_df[f'{col}_Temp'].apply(
-                        lambda x: x if x in known_categories else encoder.classes_[0]
-                    )
-                    features_df[f'{col}_Encoded'] = encoder.transform(features_df[f'{col}_Temp'])
-                    features_df.drop(f'{col}_Temp', axis=1, inplace=True)
-                except Exception as e:
-                    features_df[f'{col}_Encoded'] = 0  # Default value if encoding fails
-        
-        # Prepare feature matrix
-        feature_cols = model.feature_names_in_
-        # Only use columns that exist in the new data
-        available_cols = [col for col in feature_cols if col in features_df.columns]
-        X_new = features_df[available_cols]
-        
-        # If columns are missing, add them with default values
-        for col in feature_cols:
-            if col not in X_new.columns:
-                if 'Quantity_Log' in col:
-                    X_new[col] = 0  # Default for missing quantity
-                else:
-                    X_new[col] = 0  # Default for other missing features
-        
-        # Reorder columns to match training
-        X_new = X_new[feature_cols]
-        
-        # Predict
-        risk_scores = model.predict_proba(X_new)[:, 1]
-        predictions = model.predict(X_new)
+        risk_scores, predictions = self.late_risk_scores(new_data)
         
         # Add to dataframe
         new_data['Late_Risk_Score'] = risk_scores
@@ -221,93 +417,85 @@ class PredictiveModels:
         
         return new_data
     
-    def train_demand_forecast(self, sales_data=None):
-        """Train Prophet model for demand forecasting"""
-        if not PROPHET_AVAILABLE:
-            # Return simple forecast if Prophet not available
-            return self._simple_forecast(sales_data)
-            
-        if sales_data is None:
-            # Use shipping data as proxy for demand
-            daily_demand = self.data.groupby(
-                pd.Grouper(key='Actual_Ship_Date', freq='D')
-            ).size().reset_index(name='y')
-            daily_demand.columns = ['ds', 'y']
-        else:
-            # Use actual sales data
-            daily_demand = sales_data.groupby(
-                pd.Grouper(key='Date', freq='D')
-            )['Sales'].sum().reset_index()
-            daily_demand.columns = ['ds', 'y']
+    def late_risk_scores(self, data, model=None):
+        """Late risk scores and 0/1 predictions for shipments, data left unchanged
         
-        # Initialize Prophet model
-        model = Prophet(
-            daily_seasonality=False,
-            weekly_seasonality=True,
-            yearly_seasonality=True,
-            changepoint_prior_scale=0.05
-        )
+        ``model`` defaults to the trained late delivery model.
+        """
+        model = model if model is not None else self.models['late_delivery']
         
-        # Add monthly seasonality
-        model.add_seasonality(name='monthly', period=30.5, fourier_order=5)
+        # Feature matrix in the training column order (one float32 array)
+        X_new = self._late_risk_features(data, list(model.feature_names_in_))
         
-        # Fit model
-        model.fit(daily_demand)
+        # Predict (the classes follow from the probabilities, like model.predict)
+        proba = model.predict_proba(X_new)
+        risk_scores = proba[:, 1] if proba.shape[1] > 1 else np.zeros(len(X_new))
+        predictions = model.classes_.take(np.argmax(proba, axis=1))
+        return risk_scores, predictions
+    
+    def _late_risk_features(self, data, feature_cols):
+        """Contiguous float32 matrix of the late delivery features, same encoding as training"""
+        category_classes = {col: self._category_index(col, encoder) for col, encoder in self.encoders.items()}
+        return late_risk_matrix(data, feature_cols, category_classes)
+    
+    def _category_index(self, col, encoder):
+        """Index of an encoder's classes, built once per encoder"""
+        lookup = self._category_lookups.get(col)
+        if lookup is None or lookup[0] is not encoder:
+            lookup = (encoder, pd.Index(encoder.classes_, dtype=object))
+            self._category_lookups[col] = lookup
+        return lookup[1]
+    
+    def export_late_risk_scorer(self):
+        """NumPy-only copy of the trained late delivery model and its encoding
         
-        # Make future predictions
-        future = model.make_future_dataframe(periods=30)
-        forecast = model.predict(future)
+        See ml_models.forest_scoring.LateRiskScorer: it scores like
+        late_risk_scores() without scikit-learn.
+        """
+        if 'late_delivery' not in self.models:
+            return None
+        classes = {col: encoder.classes_ for col, encoder in self.encoders.items()}
+        return LateRiskScorer.from_forest(self.models['late_delivery'], classes)
+    
+    def train_demand_forecast(self, sales_data=None):
+        """Train the demand forecasting model (exponential smoothing or Prophet)"""
+        daily_demand = self._daily_demand(sales_data)
+        model, forecast = fit_demand_forecast(daily_demand, self.HYPERPARAMETERS['demand_forecast'])
         
         # Store model
         self.models['demand_forecast'] = model
+        self.results['demand_forecast'] = (model, forecast)
         
         return model, forecast
     
-    def _simple_forecast(self, sales_data=None):
-        """Simple forecast when Prophet is not available"""
+    def train_hierarchical_forecast(self, levels=None, workers=None, registry=None):
+        """Reconciled per-series forecasts by Category, Source and Master_Brand
+        
+        See ml_models.hierarchical_forecast.forecast_hierarchy.
+        """
+        from ml_models.hierarchical_forecast import HIERARCHY_LEVELS, forecast_hierarchy
+        
+        forecasts, fits = forecast_hierarchy(
+            self.data, levels=levels or HIERARCHY_LEVELS, params=self.HYPERPARAMETERS['demand_forecast'],
+            workers=workers, registry=registry
+        )
+        self.results['hierarchical_forecast'] = (forecasts, fits)
+        return forecasts, fits
+    
+    def _daily_demand(self, sales_data=None):
+        """Daily demand as a ds/y frame: shipments per day, or sales when given"""
         if sales_data is None:
+            # Use shipping data as proxy for demand
             daily_demand = self.data.groupby(
                 pd.Grouper(key='Actual_Ship_Date', freq='D')
             ).size().reset_index(name='y')
-            daily_demand.columns = ['ds', 'y']
         else:
+            # Use actual sales data
             daily_demand = sales_data.groupby(
                 pd.Grouper(key='Date', freq='D')
             )['Sales'].sum().reset_index()
-            daily_demand.columns = ['ds', 'y']
-        
-        # Simple moving average forecast
-        last_30_days = daily_demand['y'].tail(30).mean()
-        future_dates = pd.date_range(
-            start=daily_demand['ds'].max() + timedelta(days=1),
-            periods=30,
-            freq='D'
-        )
-        
-        forecast = pd.DataFrame({
-            'ds': pd.concat([daily_demand['ds'], pd.Series(future_dates)]),
-            'yhat': pd.concat([daily_demand['y'], pd.Series([last_30_days] * 30)]),
-            'yhat_lower': pd.concat([daily_demand['y'] * 0.9, pd.Series([last_30_days * 0.8] * 30)]),
-            'yhat_upper': pd.concat([daily_demand['y'] * 1.1, pd.Series([last_30_days * 1.2] * 30)])
-        })
-        
-        # Create mock model object
-        class SimpleModel:
-            def __init__(self, history):
-                self.history = history
-            
-            def predict(self, df):
-                # Simple prediction for compatibility
-                result = pd.DataFrame({
-                    'ds': df['ds'],
-                    'yhat': [last_30_days] * len(df),
-                    'weekly': [0] * len(df),
-                    'monthly': [0] * len(df)
-                })
-                return result
-        
-        model = SimpleModel(daily_demand)
-        return model, forecast
+        daily_demand.columns = ['ds', 'y']
+        return daily_demand
     
     def create_forecast_plot(self, model, forecast):
         """Create forecast visualization"""
@@ -360,63 +548,148 @@ class PredictiveModels:
         return fig
     
     def train_anomaly_detection(self):
-        """Train Isolation Forest for anomaly detection"""
-        # Prepare features
-        features = []
-        
-        # Numeric features
-        numeric_cols = ['Quantity', 'Delay_Days']
-        for col in numeric_cols:
-            if col in self.data.columns:
-                features.append(col)
-        
-        # Create derived features
-        if 'Delivery_Status' in self.data.columns:
-            self.data['Late_Binary'] = (self.data['Delivery_Status'] == 'Late').astype(int)
-            features.append('Late_Binary')
-        
-        # Select and scale features
-        X = self.data[features].dropna()
-        
-        scaler = StandardScaler()
-        X_scaled = scaler.fit_transform(X)
-        
-        # Train Isolation Forest
-        iso_forest = IsolationForest(
-            contamination=0.05,  # Expect 5% anomalies
-            random_state=42,
-            n_estimators=100
+        """Train Isolation Forest for anomaly detection
+        
+        Fits on at most max_samples shipments, then scores every shipment
+        chunk by chunk. Scores are kept in self.anomaly_scores (indexed like
+        the data, which is not modified) with a per-day summary in
+        self.anomaly_index.
+        """
+        params = self.HYPERPARAMETERS['anomaly_detection']
+        detector = AnomalyDetector.fit(
+            self.data,
+            n_estimators=params['n_estimators'],
+            contamination=params['contamination'],  # Expect 5% anomalies
+            random_state=params['random_state'],
+            max_samples=params['max_samples']
         )
+        scores = detector.score_all(self.data)
         
-        iso_forest.fit(X_scaled)
-        
-        # Predict anomalies
-        anomaly_scores = iso_forest.score_samples(X_scaled)
-        anomaly_labels = iso_forest.predict(X_scaled)
-        
-        # Store results
-        self.data.loc[X.index, 'Anomaly_Score'] = anomaly_scores
-        self.data.loc[X.index, 'Is_Anomaly'] = (anomaly_labels == -1).astype(int)
-        
-        # Store model and scaler
-        self.models['anomaly_detection'] = iso_forest
-        self.scalers['anomaly_scaler'] = scaler
+        # Store model, scaler and scores
+        self.models['anomaly_detection'] = detector
+        self.scalers['anomaly_scaler'] = detector.scaler
+        self.anomaly_scores = scores
+        self.anomaly_index = daily_anomaly_index(self.data, scores)
         
         # Calculate anomaly statistics
         anomaly_stats = {
-            'total_anomalies': (anomaly_labels == -1).sum(),
-            'anomaly_rate': (anomaly_labels == -1).mean() * 100,
-            'features_used': features
+            'total_anomalies': int(scores['Is_Anomaly'].sum()),
+            'anomaly_rate': scores['Is_Anomaly'].mean() * 100 if len(scores) else 0.0,
+            'features_used': detector.features,
+            'training_rows': detector.training_rows
         }
+        self.results['anomaly_detection'] = anomaly_stats
         
         return anomaly_stats
     
-    def create_anomaly_scatter(self):
-        """Create scatter plot of anomalies"""
-        if 'Anomaly_Score' not in self.data.columns:
+    def anomaly_rows(self):
+        """Shipments flagged as anomalies, with their Anomaly_Score (a copy)"""
+        if self.anomaly_scores is None:
+            return None
+        flagged = self.anomaly_scores[self.anomaly_scores['Is_Anomaly'] == 1]
+        return self.data.loc[flagged.index].assign(
+            Anomaly_Score=flagged['Anomaly_Score'], Is_Anomaly=flagged['Is_Anomaly']
+        )
+    
+    def save_models(self, registry):
+        """Save every trained model to the registry under the current data version
+        
+        Returns the names of the models that were saved. Hierarchical
+        forecasts are not saved here: forecast_hierarchy caches them per series.
+        """
+        saved = []
+        for name in self.HYPERPARAMETERS:
+            if name not in self.results:
+                continue
+            try:
+                artifacts = self._model_artifacts(name)
+            except Exception as e:
+                logger.warning(f"Could not collect {name} model artifacts: {str(e)}")
+                continue
+            if registry.save(name, self.data_version, self.registry_params(name, self.late_delivery_mode), artifacts):
+                saved.append(name)
+        return saved
+    
+    def load_models(self, registry, names=None, late_delivery_mode=None):
+        """Restore the models the registry has for the current data version
+        
+        Returns the names of the models that were restored; the others still
+        need to be trained. ``names`` limits which models are looked up, and
+        the late delivery model is only restored when it was trained in
+        ``late_delivery_mode`` (default DEFAULT_LATE_DELIVERY_MODE).
+        """
+        loaded = []
+        for name in self.HYPERPARAMETERS:
+            if names is not None and name not in names:
+                continue
+            artifacts = registry.load(name, self.data_version, self.registry_params(name, late_delivery_mode))
+            if artifacts is None:
+                continue
+            try:
+                self._restore_artifacts(name, artifacts)
+                loaded.append(name)
+            except Exception as e:
+                logger.warning(f"Could not restore {name} model: {str(e)}")
+        return loaded
+    
+    @classmethod
+    def registry_params(cls, name, late_delivery_mode=None):
+        """Registry params of a model: its hyperparameters, plus the training mode for late delivery"""
+        params = cls.HYPERPARAMETERS[name]
+        if name == 'late_delivery':
+            params = dict(params, mode=late_delivery_mode or cls.DEFAULT_LATE_DELIVERY_MODE)
+        return params
+    
+    def adopt_model(self, other, name):
+        """Take over a model trained by another PredictiveModels on the same data"""
+        self._restore_artifacts(name, other._model_artifacts(name))
+
+    def _model_artifacts(self, name):
+        """Everything needed to use a trained model without retraining"""
+        artifacts = {'model': self.models.get(name), 'results': self.results[name]}
+        if name == 'late_delivery':
+            artifacts['encoders'] = dict(self.encoders)
+            artifacts['mode'] = self.late_delivery_mode
+        elif name == 'anomaly_detection':
+            artifacts['scores'] = self.anomaly_scores
+            artifacts['daily_index'] = self.anomaly_index
+        return artifacts
+    
+    def _restore_artifacts(self, name, artifacts):
+        if name == 'anomaly_detection':
+            # Per-shipment scores must belong to this data's rows
+            scores = artifacts['scores']
+            if not scores.index.isin(self.data.index).all():
+                raise ValueError("anomaly scores do not match the data")
+            self.anomaly_scores = scores
+            self.anomaly_index = artifacts['daily_index']
+            self.scalers['anomaly_scaler'] = artifacts['model'].scaler
+        elif name == 'late_delivery':
+            self.encoders.update(artifacts['encoders'])
+            self.late_delivery_mode = artifacts.get('mode', self.late_delivery_mode)
+        
+        if artifacts['model'] is not None:
+            self.models[name] = artifacts['model']
+        self.results[name] = artifacts['results']
+    
+    def create_anomaly_scatter(self, max_points=MAX_POINTS, render_mode='auto'):
+        """Create scatter plot of anomalies
+        
+        Every anomaly is drawn. In 'auto' render mode, beyond max_points
+        shipments the normal ones are a random sample and large plots use
+        WebGL; 'full' draws every shipment as SVG.
+        """
+        if self.anomaly_scores is None:
             return None
         
-        anomaly_data = self.data[self.data['Anomaly_Score'].notna()].copy()
+        scores = self.anomaly_scores
+        if render_mode == 'auto' and len(scores) > max_points:
+            anomalous = scores['Is_Anomaly'] == 1
+            sampled = scores[~anomalous].sample(n=max(max_points - int(anomalous.sum()), 0), random_state=42)
+            scores = scores[anomalous | scores.index.isin(sampled.index)]
+        anomaly_data = self.data.loc[scores.index].assign(
+            Anomaly_Score=scores['Anomaly_Score'], Is_Anomaly=scores['Is_Anomaly']
+        )
         
         fig = px.scatter(
             anomaly_data,
@@ -426,7 +699,8 @@ class PredictiveModels:
             color_discrete_map={0: 'blue', 1: 'red'},
             labels={'Is_Anomaly': 'Anomaly'},
             title='Anomaly Detection Results',
-            hover_data=['Category', 'Master_Brand', 'Delivery_Status']
+            hover_data=['Category', 'Master_Brand', 'Delivery_Status'],
+            render_mode='webgl' if render_mode == 'auto' and len(anomaly_data) > WEBGL_THRESHOLD else 'svg'
         )
         
         fig.update_traces(
@@ -434,18 +708,19 @@ class PredictiveModels:
             selector=dict(mode='markers')
         )
         
-        return fig
+        return record_points(fig, len(self.anomaly_scores))
+    
+    def route_matrix(self):
+        """Source x SLS_Plant route totals of the data (see route_matrix.RouteMatrix)"""
+        return cached_route_matrix(self.data, self.data_version)
     
     def route_optimization_score(self):
-        """Calculate route optimization potential"""
-        # Group by source and destination (plant)
-        route_performance = self.data.groupby(['Source', 'SLS_Plant']).agg({
-            'Delivery_Status': lambda x: (x == 'Late').mean() * 100,
-            'Delay_Days': 'mean',
-            'Quantity': 'sum'
-        }).round(2)
+        """Calculate route optimization potential
         
-        route_performance.columns = ['Late_Rate', 'Avg_Delay', 'Total_Volume']
+        Derived from the route matrix, in time proportional to the number
+        of routes once the matrix exists.
+        """
+        route_performance = self.route_matrix().route_totals()
         
         # Calculate optimization score (higher score = more potential for improvement)
         max_volume = route_performance['Total_Volume'].max()
@@ -467,12 +742,8 @@ class PredictiveModels:
     
     def create_route_optimization_heatmap(self, route_performance):
         """Create heatmap for route optimization"""
-        # Pivot for heatmap
-        pivot_data = route_performance.reset_index().pivot(
-            index='Source',
-            columns='SLS_Plant',
-            values='Optimization_Score'
-        )
+        # Source x plant layout straight from the route matrix
+        pivot_data = self.route_matrix().grid(route_performance['Optimization_Score'])
         
         # Fill NaN values with 0 (no route exists = no optimization needed)
         pivot_data_filled = pivot_data.fillna(0)
@@ -0,0 +1,196 @@
+"""
+Route Matrix Module for P&G Supply Chain Analytics
+Source x SLS_Plant route totals held in dense NumPy arrays, updated incrementally
+"""
+
+import copy
+import logging
+import numpy as np
+import pandas as pd
+from utils.dataset_service import LatestVersionCache, appended_since
+from utils.status_rates import status_flag
+
+logger = logging.getLogger(__name__)
+
+# Measure -> dtype of its (sources x plants) array
+MEASURES = {
+    'shipments': np.int64,
+    'late': np.int64,
+    'delay_sum': np.float64,
+    'delay_count': np.int64,
+    'volume': np.float64
+}
+
+# Matrix of the latest data version, keyed by its row count
+_cache = LatestVersionCache()
+
+
+class RouteMatrix:
+    """Shipments, late shipments, delay and volume sums per Source x SLS_Plant route
+
+    One dense (sources x plants) array per measure in ``arrays``. update()
+    adds shipments by touching only the cells of the routes they use, and
+    new sources or plants only grow the arrays. Route totals and grids are
+    derived from the arrays, in time proportional to the number of routes.
+    Shipments without a source or plant are counted in ``rows`` but belong
+    to no route, as in a groupby over the two columns.
+    """
+
+    def __init__(self):
+        self.sources = []
+        self.plants = []
+        self._source_codes = {}
+        self._plant_codes = {}
+        self.arrays = {name: np.zeros((0, 0), dtype=dtype) for name, dtype in MEASURES.items()}
+        # Volume stays whole like an integer Quantity column's sum
+        self.integer_volume = True
+        # Shipments added so far, and the last ship date among them
+        self.rows = 0
+        self.through = None
+
+    @classmethod
+    def build(cls, data):
+        """Route matrix of the shipping rows"""
+        return cls().update(data)
+
+    def update(self, data):
+        """Add shipments to the matrix; returns the matrix"""
+        self.rows += len(data)
+        if 'Actual_Ship_Date' in data.columns and len(data):
+            last = pd.to_datetime(data['Actual_Ship_Date']).max()
+            if not pd.isna(last) and (self.through is None or last > self.through):
+                self.through = last
+        if not len(data) or not {'Source', 'SLS_Plant'} <= set(data.columns):
+            return self
+
+        source_codes = _codes(data['Source'], self.sources, self._source_codes)
+        plant_codes = _codes(data['SLS_Plant'], self.plants, self._plant_codes)
+        self._grow()
+
+        on_route = (source_codes >= 0) & (plant_codes >= 0)
+        cell_of_row, cells = pd.factorize(source_codes[on_route] * len(self.plants) + plant_codes[on_route])
+        n_cells = len(cells)
+
+        def sums(weights=None):
+            return np.bincount(cell_of_row, weights=weights, minlength=n_cells)
+
+        totals = {
+            'shipments': sums(),
+            'late': sums(status_flag(data).to_numpy()[on_route])
+        }
+        if 'Delay_Days' in data.columns:
+            delays = pd.to_numeric(data['Delay_Days'], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)[on_route]
+            present = ~np.isnan(delays)
+            totals['delay_sum'] = sums(np.where(present, delays, 0.0))
+            totals['delay_count'] = sums(present)
+        if 'Quantity' in data.columns:
+            self.integer_volume &= pd.api.types.is_integer_dtype(data['Quantity'])
+            quantities = pd.to_numeric(data['Quantity'], errors='coerce').to_numpy(dtype=np.float64, na_value=0.0)
+            totals['volume'] = sums(quantities[on_route])
+
+        # Only the cells of the routes in this data change
+        for name, values in totals.items():
+            self.arrays[name].reshape(-1)[cells] += values.astype(MEASURES[name])
+        logger.debug(f"Route matrix: added {len(data)} shipments to {n_cells} routes")
+        return self
+
+    def route_totals(self):
+        """Late_Rate (%), Avg_Delay and Total_Volume per route with shipments
+
+        Indexed by (Source, SLS_Plant) in sorted order, rounded to 2
+        decimals; a route without delay values has no Avg_Delay.
+        """
+        source_order, plant_order = self._orders()
+        shipments = self.arrays['shipments'][np.ix_(source_order, plant_order)]
+        rows, cols = np.nonzero(shipments)
+        sources, plants = source_order[rows], plant_order[cols]
+
+        counts = self.arrays['shipments'][sources, plants]
+        volume = self.arrays['volume'][sources, plants]
+        delay_counts = self.arrays['delay_count'][sources, plants]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            avg_delay = np.where(delay_counts > 0, self.arrays['delay_sum'][sources, plants] / delay_counts, np.nan)
+        index = pd.MultiIndex.from_arrays(
+            [pd.Index([self.sources[i] for i in sources], dtype=object),
+             pd.Index([self.plants[j] for j in plants], dtype=object)],
+            names=['Source', 'SLS_Plant']
+        )
+        return pd.DataFrame({
+            'Late_Rate': self.arrays['late'][sources, plants] / counts * 100,
+            'Avg_Delay': avg_delay,
+            'Total_Volume': volume.astype(np.int64) if self.integer_volume else volume
+        }, index=index).round(2)
+
+    def grid(self, values):
+        """A per-route Series as a Source x SLS_Plant frame, NaN where there is no route
+
+        ``values`` is indexed by (Source, SLS_Plant) like route_totals();
+        rows and columns are the sources and plants with shipments, sorted.
+        """
+        source_order, plant_order = self._orders()
+        dense = np.full((len(self.sources), len(self.plants)), np.nan)
+        sources = np.array([self._source_codes.get(source, -1) for source, _ in values.index], dtype=np.int64)
+        plants = np.array([self._plant_codes.get(plant, -1) for _, plant in values.index], dtype=np.int64)
+        known = (sources >= 0) & (plants >= 0)
+        dense[sources[known], plants[known]] = values.to_numpy(dtype=np.float64)[known]
+
+        shipments = self.arrays['shipments']
+        source_order = source_order[shipments[source_order].any(axis=1)]
+        plant_order = plant_order[shipments[:, plant_order].any(axis=0)]
+        return pd.DataFrame(
+            dense[np.ix_(source_order, plant_order)],
+            index=pd.Index([self.sources[i] for i in source_order], dtype=object, name='Source'),
+            columns=pd.Index([self.plants[j] for j in plant_order], dtype=object, name='SLS_Plant')
+        )
+
+    def _grow(self):
+        shape = (len(self.sources), len(self.plants))
+        for name, array in self.arrays.items():
+            if array.shape != shape:
+                grown = np.zeros(shape, dtype=array.dtype)
+                grown[:array.shape[0], :array.shape[1]] = array
+                self.arrays[name] = grown
+
+    def _orders(self):
+        # Sorted label order, the order a groupby lists the routes in
+        return (np.asarray(pd.Index(self.sources, dtype=object).argsort(), dtype=np.int64),
+                np.asarray(pd.Index(self.plants, dtype=object).argsort(), dtype=np.int64))
+
+
+def _codes(values, labels, lookup):
+    """Row codes of a column into ``labels`` (extended with its new values), -1 for missing"""
+    row_codes, uniques = pd.factorize(values)
+    mapped = np.empty(len(uniques) + 1, dtype=np.int64)
+    for i, label in enumerate(uniques):
+        if label not in lookup:
+            lookup[label] = len(labels)
+            labels.append(label)
+        mapped[i] = lookup[label]
+    # Missing values (-1) pick the trailing -1
+    mapped[-1] = -1
+    return mapped[row_codes]
+
+
+def cached_route_matrix(data, data_version):
+    """Route matrix of a dataset, built once per data version (see LatestVersionCache)
+
+    When the version only appended shipping rows to the cached one (see
+    dataset_service.appended_since), a copy of the cached matrix is
+    updated with the appended rows instead of being rebuilt; the cached
+    matrix itself never changes, as other callers may hold it.
+    """
+    def build(previous):
+        if previous is not None:
+            version, rows, matrix = previous
+            if appended_since(data_version) == (version, rows) and len(data) >= rows:
+                appended = data.iloc[rows:]
+                matrix = copy.deepcopy(matrix).update(appended)
+                logger.info(f"Updated route matrix to data version {data_version} "
+                            f"with {len(appended)} appended shipments")
+                return matrix
+        matrix = RouteMatrix.build(data)
+        if data_version is not None:
+            logger.info(f"Built route matrix for data version {data_version}: "
+                        f"{len(matrix.sources)} sources x {len(matrix.plants)} plants")
+        return matrix
+    return _cache.get(data_version, len(data), build)
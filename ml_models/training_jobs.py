@@ -0,0 +1,142 @@
+"""
+Training Jobs Module for P&G Supply Chain Analytics
+Background training of the ML models with progress reporting
+"""
+
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from ml_models.predictive import PredictiveModels
+
+logger = logging.getLogger(__name__)
+
+# Model name -> PredictiveModels training method
+MODEL_TRAINERS = {
+    'late_delivery': 'train_late_delivery_model',
+    'demand_forecast': 'train_demand_forecast',
+    'anomaly_detection': 'train_anomaly_detection'
+}
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+
+class TrainingJob:
+    """Train the ML models concurrently on background threads
+
+    Each model is trained on its own PredictiveModels instance (and its own
+    shallow copy of the data), so the trainings never touch shared state.
+    When all of them have finished, the successful models are combined
+    into one new PredictiveModels, which is published at once through
+    ``result``; until then callers keep using their current models. The
+    job never calls Streamlit, the page polls status() and progress().
+    """
+
+    def __init__(self, data, data_version=None, registry=None, models=None,
+                 late_delivery_mode=PredictiveModels.DEFAULT_LATE_DELIVERY_MODE):
+        self.data = data
+        self.data_version = data_version
+        self.registry = registry
+        self.models = list(models or MODEL_TRAINERS)
+        # 'warm_start' builds on the registry's warm start model for earlier data when there is one
+        self.late_delivery_mode = late_delivery_mode
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+        self._states = {name: QUEUED for name in self.models}
+        self._errors = {}
+        self._result = None
+        self._thread = None
+
+    def start(self):
+        """Start training in the background; returns the job"""
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name='ml-training', daemon=True)
+        self._thread.start()
+        return self
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def finished(self):
+        return self.finished_at is not None
+
+    @property
+    def result(self):
+        """Combined trained models, or None while the job is still running"""
+        with self._lock:
+            return self._result
+
+    def status(self):
+        """Model name -> queued / running / done / failed"""
+        with self._lock:
+            return dict(self._states)
+
+    def errors(self):
+        """Model name -> error message for the models that failed"""
+        with self._lock:
+            return dict(self._errors)
+
+    def progress(self):
+        """Share of the models that have finished (0.0 to 1.0)"""
+        states = self.status()
+        finished = sum(state in (DONE, FAILED) for state in states.values())
+        return finished / len(states) if states else 1.0
+
+    def elapsed(self):
+        """Seconds since the job started (until it finished)"""
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def wait(self, timeout=None):
+        """Block until the job has finished; returns True when it has"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.finished
+
+    def _run(self):
+        trained = {}
+        with ThreadPoolExecutor(max_workers=len(self.models)) as executor:
+            futures = {executor.submit(self._train, name): name for name in self.models}
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    trained[name] = future.result()
+                    self._set_state(name, DONE)
+                except Exception as e:
+                    logger.error(f"Training {name} model failed: {str(e)}", exc_info=True)
+                    with self._lock:
+                        self._errors[name] = str(e)
+                    self._set_state(name, FAILED)
+
+        combined = PredictiveModels(self.data.copy(deep=False), data_version=self.data_version)
+        for name in self.models:
+            if name in trained:
+                combined.adopt_model(trained[name], name)
+
+        if self.registry is not None:
+            combined.save_models(self.registry)
+
+        with self._lock:
+            self._result = combined
+        self.finished_at = time.time()
+        logger.info(f"Model training finished in {self.elapsed():.1f}s: {self.status()}")
+
+    def _train(self, name):
+        self._set_state(name, RUNNING)
+        models = PredictiveModels(self.data.copy(deep=False), data_version=self.data_version)
+        if name == 'late_delivery':
+            previous = None
+            if self.late_delivery_mode == 'warm_start' and self.registry is not None:
+                previous = self.registry.latest(name, PredictiveModels.registry_params(name, 'warm_start'))
+            models.train_late_delivery_model(mode=self.late_delivery_mode, previous=previous)
+        else:
+            getattr(models, MODEL_TRAINERS[name])()
+        return models
+
+    def _set_state(self, name, state):
+        with self._lock:
+            self._states[name] = state
@@ -0,0 +1,253 @@
+"""
+Model Tuning Module for P&G Supply Chain Analytics
+Time-ordered cross-validation and hyperparameter search for the late delivery model
+"""
+
+import os
+import json
+import time
+import random
+import hashlib
+import itertools
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import TimeSeriesSplit, train_test_split
+from ml_models.predictive import PredictiveModels
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'models', 'tuning'
+)
+
+# RandomForestClassifier settings searched by default
+DEFAULT_GRID = {
+    'n_estimators': [50, 100, 200],
+    'max_depth': [6, 10, 14],
+    'min_samples_leaf': [1, 5, 20]
+}
+
+
+def parameter_configs(grid=None, max_configs=None, seed=42):
+    """Configurations of a grid, a reproducible random subset when over max_configs"""
+    grid = grid or DEFAULT_GRID
+    names = sorted(grid)
+    configs = [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+    if max_configs is not None and len(configs) > max_configs:
+        configs = random.Random(seed).sample(configs, max_configs)
+    return configs
+
+
+def time_ordered_features(data):
+    """Late delivery features and target, ordered by ship date
+
+    Same features and encoding as PredictiveModels.train_late_delivery_model.
+    """
+    X, y, _ = PredictiveModels(data).prepare_features_for_late_prediction()
+    order = pd.to_datetime(data.loc[X.index, 'Actual_Ship_Date']).argsort(kind='stable')
+    return X.iloc[order], y.iloc[order]
+
+
+def tune_late_delivery_model(data, grid=None, max_configs=12, n_folds=4, workers=None,
+                             cache_dir=DEFAULT_CACHE_DIR, random_state=42):
+    """Cross-validate late delivery model configurations on time-ordered folds
+
+    Every fold trains on the shipments before its test period
+    (TimeSeriesSplit), so scores reflect predicting later shipments from
+    earlier ones. Each (configuration, fold) runs as one job on a process
+    pool; its result is cached on disk under a hash of the data, fold,
+    configuration and scikit-learn version, so a rerun only trains what
+    changed (``cache_dir=None`` disables the cache). Returns one row per
+    configuration, best mean AUC first, with its fit and scoring time
+    summed over the folds (time spent in the workers, not elapsed time) so
+    accuracy can be weighed against cost.
+    """
+    X, y = time_ordered_features(data)
+    configs = parameter_configs(grid, max_configs, seed=random_state)
+    folds = list(TimeSeriesSplit(n_splits=n_folds).split(X))
+    fingerprint = _data_fingerprint(X, y)
+
+    X_values = X.to_numpy(dtype=np.float32)
+    y_values = y.to_numpy()
+
+    results = {}
+    jobs = []
+    for c, config in enumerate(configs):
+        params = dict(config, random_state=random_state)
+        for f, (train_idx, test_idx) in enumerate(folds):
+            path = _cache_path(cache_dir, fingerprint, params, n_folds, f)
+            cached = _read_cache(path)
+            if cached is not None:
+                results[c, f] = dict(cached, cached=True)
+            else:
+                jobs.append((c, f, params, train_idx, test_idx, path))
+
+    logger.info(f"Tuning: {len(configs)} configurations x {n_folds} folds, "
+                f"{len(jobs)} to train, {len(results)} cached")
+
+    if jobs:
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(jobs)),
+            initializer=_init_worker, initargs=(X_values, y_values)
+        ) as pool:
+            futures = {
+                pool.submit(_fold_job, params, train_idx, test_idx): (c, f, path)
+                for c, f, params, train_idx, test_idx, path in jobs
+            }
+            for future in as_completed(futures):
+                c, f, path = futures[future]
+                result = future.result()
+                _write_cache(path, result)
+                results[c, f] = dict(result, cached=False)
+
+    rows = []
+    for c, config in enumerate(configs):
+        fold_results = [results[c, f] for f in range(len(folds))]
+        scored_rows = sum(r['test_rows'] for r in fold_results)
+        score_seconds = sum(r['score_seconds'] for r in fold_results)
+        rows.append(dict(
+            config,
+            accuracy=np.mean([r['accuracy'] for r in fold_results]),
+            auc=np.nanmean([r['auc'] for r in fold_results]),
+            auc_std=np.nanstd([r['auc'] for r in fold_results]),
+            fit_seconds=sum(r['fit_seconds'] for r in fold_results),
+            score_seconds=score_seconds,
+            score_ms_per_1k=score_seconds / max(scored_rows, 1) * 1000 * 1000,
+            fit_score_seconds=sum(r['fit_seconds'] + r['score_seconds'] for r in fold_results),
+            cached_folds=sum(r['cached'] for r in fold_results)
+        ))
+
+    return pd.DataFrame(rows).sort_values(['auc', 'score_ms_per_1k'], ascending=[False, True]).reset_index(drop=True)
+
+
+def compare_subsample(data, max_rows=None):
+    """Accuracy and AUC of the stratified sample fit against the full history fit
+
+    Both fits use the late delivery hyperparameters and are scored on the
+    same held-out shipments (the full fit's test split). The sample fit
+    trains on a stratified sample of the full fit's training rows, as many
+    as the 'sample' mode trains on with a budget of ``max_rows`` (default
+    SUBSAMPLE['max_rows']). Returns one row per fit with its training
+    rows, fit time, accuracy, AUC and their change from the full fit.
+    """
+    params = PredictiveModels.HYPERPARAMETERS['late_delivery']
+    models = PredictiveModels(data)
+    X, y, _ = models.prepare_features_for_late_prediction()
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=params['test_size'], random_state=params['random_state'], stratify=y
+    )
+    budget = int((max_rows or PredictiveModels.SUBSAMPLE['max_rows']) * (1 - params['test_size']))
+    X_sample, y_sample = models.stratified_subsample(X_train, y_train, max_rows=budget)
+
+    rows = []
+    for fit, X_fit, y_fit in (('Full history', X_train, y_train), ('Stratified sample', X_sample, y_sample)):
+        model = RandomForestClassifier(
+            n_estimators=params['n_estimators'],
+            max_depth=params['max_depth'],
+            random_state=params['random_state'],
+            n_jobs=-1
+        )
+        started = time.perf_counter()
+        model.fit(X_fit, y_fit)
+        fit_seconds = time.perf_counter() - started
+
+        proba = model.predict_proba(X_test)
+        positive = proba[:, 1] if proba.shape[1] > 1 else np.zeros(len(y_test))
+        predictions = model.classes_.take(np.argmax(proba, axis=1))
+        auc = roc_auc_score(y_test, positive) if y_test.nunique() > 1 else float('nan')
+        rows.append({
+            'fit': fit,
+            'train_rows': len(X_fit),
+            'fit_seconds': fit_seconds,
+            'accuracy': float(np.mean(predictions == y_test.to_numpy())),
+            'auc': float(auc)
+        })
+
+    results = pd.DataFrame(rows)
+    results['accuracy_change'] = results['accuracy'] - results['accuracy'].iloc[0]
+    results['auc_change'] = results['auc'] - results['auc'].iloc[0]
+    return results
+
+
+# Each grid worker holds the feature matrix and labels (set by _init_worker)
+# and fits and scores one candidate on one fold per _fold_job
+_worker_data = {}
+
+
+def _init_worker(X_values, y_values):
+    # Sent once per worker instead of with every job
+    _worker_data['X'] = X_values
+    _worker_data['y'] = y_values
+
+
+def _fold_job(params, train_idx, test_idx):
+    X, y = _worker_data['X'], _worker_data['y']
+    model = RandomForestClassifier(n_jobs=1, **params)
+
+    started = time.perf_counter()
+    model.fit(X[train_idx], y[train_idx])
+    fit_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    proba = model.predict_proba(X[test_idx])
+    score_seconds = time.perf_counter() - started
+
+    y_test = y[test_idx]
+    positive = proba[:, 1] if proba.shape[1] > 1 else np.zeros(len(y_test))
+    predictions = model.classes_.take(np.argmax(proba, axis=1))
+    auc = roc_auc_score(y_test, positive) if len(np.unique(y_test)) > 1 else float('nan')
+    return {
+        'accuracy': float(np.mean(predictions == y_test)),
+        'auc': float(auc),
+        'fit_seconds': fit_seconds,
+        'score_seconds': score_seconds,
+        'train_rows': int(len(train_idx)),
+        'test_rows': int(len(test_idx))
+    }
+
+
+def _data_fingerprint(X, y):
+    digest = hashlib.sha256()
+    digest.update(','.join(X.columns).encode())
+    digest.update(np.ascontiguousarray(X.to_numpy(dtype=np.float64)).tobytes())
+    digest.update(np.ascontiguousarray(y.to_numpy(dtype=np.int64)).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def _cache_path(cache_dir, fingerprint, params, n_folds, fold):
+    if cache_dir is None:
+        return None
+    spec = json.dumps({
+        'data': fingerprint, 'params': params, 'n_folds': n_folds, 'fold': fold,
+        'sklearn': sklearn.__version__
+    }, sort_keys=True)
+    return os.path.join(cache_dir, f'{hashlib.sha256(spec.encode()).hexdigest()[:20]}.json')
+
+
+def _read_cache(path):
+    if path is None or not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cache(path, result):
+    if path is None:
+        return
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(result, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Could not cache fold result: {str(e)}")
@@ -7,6 +7,7 @@ import shutil
 import pandas as pd
 from io import BytesIO
 import requests
+from utils.dataset_service import invalidate
 
 st.set_page_config(page_title="Fix Data", layout="wide")
 
@@ -21,6 +22,7 @@ if st.button("1. Clear All Cached Data", type="primary"):
         extracted_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'extracted')
         if os.path.exists(extracted_dir):
             shutil.rmtree(extracted_dir)
+            invalidate()
             st.success("✅ Cleared extracted data")
         
         # Clear session state
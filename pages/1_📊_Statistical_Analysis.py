@@ -15,8 +15,10 @@ try:
     from analytics.statistical import StatisticalAnalyzer
 except ImportError:
     from analytics.statistical_simple import StatisticalAnalyzer
-from utils.data_processor import DataProcessor
+from utils.dataset_service import get_processor
 from components.filters import create_multiselect_filters, apply_filters_to_data
+from utils.status_rates import status_rate
+from utils.chart_rendering import points_caption
 
 st.set_page_config(
     page_title="Statistical Analysis - P&G Analytics",
@@ -27,14 +29,8 @@ st.set_page_config(
 st.title("📊 Statistical Analysis")
 st.markdown("Advanced statistical analysis of supply chain performance")
 
-# Load data
-@st.cache_resource
-def load_data():
-    processor = DataProcessor()
-    processor.load_processed_data()
-    return processor
-
-processor = load_data()
+# Load data (shared by all pages and sessions)
+processor = get_processor()
 
 # Filters
 st.sidebar.markdown("### Filters")
@@ -443,6 +439,8 @@ with tab5:
             
             # Display plots
             st.plotly_chart(results['fig'], use_container_width=True)
+            if points_caption(results['fig']):
+                st.caption(points_caption(results['fig']))
             
             # Normality test results
             st.markdown("#### Normality Tests")
@@ -535,6 +533,8 @@ with tab5:
                                 
                                 # Display transformed results
                                 st.plotly_chart(fig, use_container_width=True)
+                                if points_caption(fig):
+                                    st.caption(points_caption(fig))
                                 
                                 # Show new normality test results
                                 st.markdown("##### Transformed Data Normality Tests")
@@ -590,6 +590,8 @@ with tab5:
                                 
                                 # Display transformed results
                                 st.plotly_chart(fig, use_container_width=True)
+                                if points_caption(fig):
+                                    st.caption(points_caption(fig))
                                 
                                 # Show new normality test results
                                 st.markdown("##### Transformed Data Normality Tests")
@@ -706,9 +708,7 @@ if late_rate > 35:
 
 # Check for significant plant differences
 if 'Source' in filtered_data.columns:
-    plant_variance = filtered_data.groupby('Source')['Delivery_Status'].apply(
-        lambda x: (x == 'Late').mean()
-    ).var()
+    plant_variance = status_rate(filtered_data, 'Source', percent=False).var()
     if plant_variance > 0.01:
         insights.append("📍 Significant variation in performance across plants/sources")
 
@@ -30,7 +30,15 @@ except ImportError:
         logger.error("No ML models available")
         PredictiveModels = None
 
-from utils.data_processor import DataProcessor
+try:
+    from ml_models.model_registry import ModelRegistry
+    from ml_models.training_jobs import TrainingJob, RUNNING, DONE, FAILED
+except ImportError:
+    ModelRegistry = None
+    TrainingJob = None
+
+from utils.dataset_service import get_processor
+from utils.chart_rendering import points_caption
 from components.filters import create_multiselect_filters, apply_filters_to_data
 
 # Configuration
@@ -57,19 +65,15 @@ if PredictiveModels is None:
     st.stop()
 
 # Load data with error handling
-@st.cache_resource
 def load_data():
-    """Load data with comprehensive error handling"""
+    """Load the shared dataset with comprehensive error handling"""
     try:
-        processor = DataProcessor()
-        data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'extracted')
-        processor.load_processed_data(data_dir=data_dir)
+        processor = get_processor()
         
         # Validate data
         if processor.shipping_data is None or processor.shipping_data.empty:
             raise ValueError("No shipping data available")
         
-        logger.info(f"Loaded {len(processor.shipping_data)} shipping records")
         return processor
     except Exception as e:
         logger.error(f"Error loading data: {str(e)}")
@@ -86,11 +90,80 @@ if len(processor.shipping_data) < Config.MIN_TRAINING_SAMPLES:
     st.error(f"Insufficient data for ML models. Need at least {Config.MIN_TRAINING_SAMPLES} records.")
     st.stop()
 
-# Initialize ML models
-if 'ml_models' not in st.session_state:
+def publish_training_results(ml_models):
+    """Expose the models' training results to the page"""
+    results = ml_models.results
+    if 'late_delivery' in results:
+        st.session_state.late_delivery_results = results['late_delivery']
+    if 'demand_forecast' in results:
+        st.session_state.demand_model, st.session_state.demand_forecast = results['demand_forecast']
+    if 'anomaly_detection' in results:
+        st.session_state.anomaly_stats = results['anomaly_detection']
+    st.session_state.models_trained = all(name in results for name in ml_models.HYPERPARAMETERS)
+
+def show_training_progress(job):
+    """Progress bar and per-model state of a running training job"""
+    st.progress(job.progress(), text=f"Training models... ({job.elapsed():.0f}s)")
+    icons = {RUNNING: '⏳', DONE: '✅', FAILED: '❌'}
+    for name, state in job.status().items():
+        st.caption(f"{icons.get(state, '🕒')} {MODEL_LABELS.get(name, name)}: {state}")
+
+def finish_training(job):
+    """Publish a finished training job's models to the page (once)"""
+    st.session_state.pop('training_job', None)
+    trained = job.result
+    if trained is None:
+        return
+    
+    st.session_state.ml_models = trained
+    st.session_state.ml_late_delivery_mode = job.late_delivery_mode
+    publish_training_results(trained)
+    
+    errors = job.errors()
+    for name, error in errors.items():
+        st.error(f"Error training {MODEL_LABELS.get(name, name)}: {error}")
+    if not errors:
+        st.success(f"✅ Model training completed in {job.elapsed():.0f}s!")
+
+MODEL_LABELS = {
+    'late_delivery': 'Late Delivery Model',
+    'demand_forecast': 'Demand Forecast Model',
+    'anomaly_detection': 'Anomaly Detection Model'
+}
+
+model_registry = ModelRegistry() if ModelRegistry is not None else None
+
+# Late delivery retraining modes (each keeps its own model in the registry)
+RETRAIN_MODES = {
+    'Full history': 'full',
+    f"Stratified sample ({PredictiveModels.SUBSAMPLE['max_rows']:,} shipments)": 'sample',
+    f"Last {PredictiveModels.INCREMENTAL['window_days']} days": 'window',
+    'Incremental (add trees for new data)': 'warm_start'
+}
+# Histories beyond the sample budget train on the sample by default, in bounded time
+large_history = len(processor.shipping_data) > PredictiveModels.SUBSAMPLE['max_rows']
+default_retrain_label = list(RETRAIN_MODES)[1 if large_history else 0]
+late_delivery_mode = RETRAIN_MODES[st.session_state.get('late_delivery_retrain_mode', default_retrain_label)]
+
+# Initialize ML models (again whenever the shared dataset is reloaded)
+if 'ml_models' not in st.session_state or st.session_state.get('ml_data_version') != processor.data_version:
     try:
-        st.session_state.ml_models = PredictiveModels(processor.shipping_data)
+        # Shallow copy: the models add columns, the shared frame stays untouched
+        st.session_state.ml_models = PredictiveModels(
+            processor.shipping_data.copy(deep=False), data_version=processor.data_version
+        )
+        st.session_state.ml_data_version = processor.data_version
         st.session_state.models_trained = False
+        # A job still training on the previous data is no longer wanted
+        st.session_state.pop('training_job', None)
+        
+        # Reuse the models already trained on this version of the data
+        st.session_state.ml_late_delivery_mode = late_delivery_mode
+        if model_registry is not None:
+            loaded = st.session_state.ml_models.load_models(model_registry, late_delivery_mode=late_delivery_mode)
+            if loaded:
+                publish_training_results(st.session_state.ml_models)
+                logger.info(f"Restored trained models from registry: {', '.join(loaded)}")
     except Exception as e:
         st.error(f"Failed to initialize ML models: {str(e)}")
         logger.error(f"ML model initialization error: {str(e)}")
@@ -98,44 +171,72 @@ if 'ml_models' not in st.session_state:
 
 ml_models = st.session_state.ml_models
 
+# Another retraining mode selected: show its model when the registry has one
+if st.session_state.get('ml_late_delivery_mode') != late_delivery_mode:
+    st.session_state.ml_late_delivery_mode = late_delivery_mode
+    if model_registry is not None and ml_models.load_models(
+            model_registry, names=['late_delivery'], late_delivery_mode=late_delivery_mode):
+        publish_training_results(ml_models)
+
 # Sidebar for model training
 with st.sidebar:
     st.markdown("### Model Training")
     
-    if st.button("🚀 Train All Models"):
-        with st.spinner("Training models..."):
-            try:
-                # Train late delivery model
-                st.session_state.late_delivery_results = ml_models.train_late_delivery_model()
-                
-                # Validate results
-                if not st.session_state.late_delivery_results:
-                    st.warning("Late delivery model training returned no results")
-                
-                # Train demand forecast
-                st.session_state.demand_model, st.session_state.demand_forecast = ml_models.train_demand_forecast()
-                
-                if st.session_state.demand_model is None:
-                    st.warning("Demand forecast model training failed")
-                
-                # Train anomaly detection
-                st.session_state.anomaly_stats = ml_models.train_anomaly_detection()
-                
-                if not st.session_state.anomaly_stats:
-                    st.warning("Anomaly detection training returned no results")
-                
-                st.session_state.models_trained = True
-                st.success("✅ Model training completed!")
-                
-            except Exception as e:
-                st.error(f"Error during model training: {str(e)}")
-                logger.error(f"Model training error: {str(e)}", exc_info=True)
-                st.session_state.models_trained = False
+    training_job = st.session_state.get('training_job')
+    training_running = training_job is not None and not training_job.finished
+    
+    retrain_mode = st.selectbox(
+        "Late delivery retraining",
+        options=list(RETRAIN_MODES),
+        index=list(RETRAIN_MODES).index(default_retrain_label),
+        key='late_delivery_retrain_mode',
+        help="Incremental builds on the previous incremental model, falling back to a "
+             "full retrain when that is not possible. The stratified sample keeps the "
+             "late rate and category/source mix of the full history; run tune_models.py "
+             "--compare-subsample to see its accuracy and AUC change"
+    )
+    
+    if st.button("🚀 Train All Models", disabled=training_running):
+        if TrainingJob is None:
+            st.error("Background training is not available. Please install scikit-learn.")
+        else:
+            # Train in the background; the dashboard stays usable meanwhile
+            training_job = TrainingJob(
+                processor.shipping_data, processor.data_version, model_registry,
+                late_delivery_mode=RETRAIN_MODES[retrain_mode]
+            ).start()
+            st.session_state.training_job = training_job
+            training_running = True
+    
+    if training_job is not None and training_job.finished:
+        finish_training(training_job)
+        ml_models = st.session_state.ml_models
+    elif training_running:
+        if hasattr(st, 'fragment'):
+            # Poll the job and rerun the page once it has finished
+            @st.fragment(run_every=2)
+            def training_progress():
+                job = st.session_state.get('training_job')
+                if job is None or job.finished:
+                    st.rerun()
+                show_training_progress(job)
+            
+            training_progress()
+        else:
+            show_training_progress(training_job)
+            st.button("🔄 Refresh Training Status")
     
     if st.session_state.get('models_trained', False):
         st.markdown("### Model Status")
         if st.session_state.get('late_delivery_results'):
             st.success("✅ Late Delivery Model")
+            lineage = st.session_state.late_delivery_results.get('lineage')
+            if lineage:
+                sampled = f" of {lineage['sampled_from']:,}" if 'sampled_from' in lineage else ''
+                st.caption(
+                    f"{lineage['mode']} · {lineage['rows_trained']:,}{sampled} shipments · "
+                    f"{len(lineage['data_versions'])} data version(s)"
+                )
         else:
             st.warning("⚠️ Late Delivery Model")
             
@@ -452,6 +553,50 @@ else:
                 logger.error(f"Demand forecast error: {str(e)}")
         else:
             st.warning("Demand forecast model not available")
+        
+        # Per-series forecasts, reconciled to the total
+        if hasattr(ml_models, 'train_hierarchical_forecast'):
+            st.markdown("### 🏭 Forecast by Category, Plant and Brand")
+            st.caption("One model per series; each level is scaled to add up to the total forecast")
+            
+            if st.button("Forecast All Series", key="hierarchical_forecast_btn"):
+                with st.spinner("Forecasting every category, plant and brand..."):
+                    try:
+                        ml_models.train_hierarchical_forecast(registry=model_registry)
+                    except Exception as e:
+                        st.error("Error in per-series forecasting")
+                        logger.error(f"Hierarchical forecast error: {str(e)}")
+            
+            hierarchical = ml_models.results.get('hierarchical_forecast')
+            if hierarchical is not None:
+                try:
+                    import plotly.express as px
+                    forecasts, fits = hierarchical
+                    level_labels = {'Category': 'Category', 'Source': 'Plant', 'Master_Brand': 'Brand'}
+                    levels = [level for level in level_labels if level in set(forecasts['level'])]
+                    level = st.selectbox("Forecast by", levels, format_func=level_labels.get,
+                                         key="hierarchical_level")
+                    level_forecast = forecasts[forecasts['level'] == level]
+                    
+                    fig = px.area(
+                        level_forecast, x='ds', y='yhat', color='series',
+                        labels={'ds': 'Date', 'yhat': 'Forecast Shipments', 'series': level_labels[level]},
+                        title=f"{Config.FORECAST_DAYS}-Day Forecast by {level_labels[level]}"
+                    )
+                    st.plotly_chart(fig, use_container_width=True)
+                    
+                    summary = level_forecast.groupby('series').agg(
+                        Forecast=('yhat', 'sum'), Lower=('yhat_lower', 'sum'), Upper=('yhat_upper', 'sum')
+                    ).sort_values('Forecast', ascending=False)
+                    summary.index.name = level_labels[level]
+                    st.dataframe(summary.style.format("{:,.0f}"))
+                    
+                    fitted = fits[~fits['cached']]
+                    st.caption(f"{len(fits)} series: {len(fitted)} fitted in {fitted['fit_seconds'].sum():.1f}s, "
+                               f"{len(fits) - len(fitted)} from the model cache")
+                except Exception as e:
+                    st.error("Could not display per-series forecasts")
+                    logger.error(f"Hierarchical forecast display error: {str(e)}")
     
     with tab3:
         st.markdown("## 🔍 Anomaly Detection")
@@ -475,11 +620,35 @@ else:
                 features_used = anomaly_stats.get('features_used', [])
                 st.metric("Features Used", len(features_used))
             
+            # Anomalies per day, from the precomputed daily index
+            anomaly_index = ml_models.anomaly_index
+            if anomaly_index is not None and not anomaly_index.empty:
+                try:
+                    fig = go.Figure(go.Bar(
+                        x=anomaly_index.index,
+                        y=anomaly_index['Anomalies'],
+                        customdata=anomaly_index['Anomaly_Rate'],
+                        hovertemplate="%{x|%Y-%m-%d}: %{y} anomalies (%{customdata:.1f}%)<extra></extra>",
+                        marker_color='indianred'
+                    ))
+                    fig.update_layout(
+                        title="Anomalies by Ship Date",
+                        xaxis_title="Date",
+                        yaxis_title="Anomalies",
+                        showlegend=False
+                    )
+                    st.plotly_chart(fig, use_container_width=True)
+                except Exception as e:
+                    st.error("Could not create daily anomaly chart")
+                    logger.error(f"Daily anomaly chart error: {str(e)}")
+            
             # Anomaly scatter plot
             try:
                 anomaly_fig = ml_models.create_anomaly_scatter()
                 if anomaly_fig:
                     st.plotly_chart(anomaly_fig, use_container_width=True)
+                    if points_caption(anomaly_fig):
+                        st.caption(points_caption(anomaly_fig))
             except Exception as e:
                 st.error("Could not create anomaly visualization")
                 logger.error(f"Anomaly scatter error: {str(e)}")
@@ -488,15 +657,13 @@ else:
             st.markdown("### Anomaly Details")
             
             try:
-                if 'Is_Anomaly' in processor.shipping_data.columns:
-                    anomaly_data = processor.shipping_data[
-                        processor.shipping_data['Is_Anomaly'] == 1
-                    ].copy()
-                    
+                anomaly_data = ml_models.anomaly_rows()
+                
+                if anomaly_data is not None:
                     if len(anomaly_data) > 0:
                         # Group anomalies by category
                         if 'Category' in anomaly_data.columns:
-                            anomaly_summary = anomaly_data.groupby('Category').agg({
+                            anomaly_summary = anomaly_data.groupby('Category', observed=True).agg({
                                 'Transaction_ID': 'count',
                                 'Delay_Days': lambda x: x.mean() if len(x) > 0 else 0,
                                 'Quantity': lambda x: x.mean() if len(x) > 0 else 0
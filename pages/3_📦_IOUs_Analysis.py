@@ -14,7 +14,7 @@ import os
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils.data_processor import DataProcessor
+from utils.dataset_service import get_processor
 
 st.set_page_config(
     page_title="IOUs Analysis - P&G Analytics",
@@ -25,14 +25,8 @@ st.set_page_config(
 st.title("📦 IOUs (Outstanding Orders) Analysis")
 st.markdown("Track and analyze outstanding orders across channels and categories")
 
-# Load data
-@st.cache_resource
-def load_data():
-    processor = DataProcessor()
-    processor.load_processed_data()
-    return processor
-
-processor = load_data()
+# Load data (shared by all pages and sessions)
+processor = get_processor()
 
 # Check if IOUs data is available
 if processor.sales_data is None or 'IOUs' not in processor.sales_data.columns:
@@ -123,7 +117,7 @@ with tab2:
     st.markdown("### Outstanding Orders by Category")
     
     # Category analysis
-    category_ious = processor.sales_data.groupby('Category').agg({
+    category_ious = processor.sales_data.groupby('Category', observed=True).agg({
         'IOUs': ['sum', 'count', 'mean'],
         'Sales': 'sum'
     }).round(0)
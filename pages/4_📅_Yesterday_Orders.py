@@ -16,7 +16,7 @@ from plotly.subplots import make_subplots
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils.data_processor import DataProcessor
+from utils.dataset_service import get_processor
 from components.filters import create_multiselect_filters, apply_filters_to_data
 
 st.set_page_config(
@@ -28,14 +28,8 @@ st.set_page_config(
 st.title("📅 Yesterday Orders Comparison")
 st.markdown("Compare daily order performance and identify trends")
 
-# Load data
-@st.cache_resource
-def load_data():
-    processor = DataProcessor()
-    processor.load_processed_data()
-    return processor
-
-processor = load_data()
+# Load data (shared by all pages and sessions)
+processor = get_processor()
 
 # Filters
 st.sidebar.markdown("### Filters")
@@ -162,12 +156,12 @@ if 'Actual_Ship_Date' in filtered_data.columns:
         st.markdown("### 📦 Category Performance Comparison")
         
         # Category comparison
-        today_category = today_data.groupby('Category').agg({
+        today_category = today_data.groupby('Category', observed=True).agg({
             'Transaction_ID': 'count',
             'Delivery_Status': lambda x: (x == 'Late').sum()
         }).rename(columns={'Transaction_ID': 'Total_Today', 'Delivery_Status': 'Late_Today'})
         
-        yesterday_category = yesterday_data.groupby('Category').agg({
+        yesterday_category = yesterday_data.groupby('Category', observed=True).agg({
             'Transaction_ID': 'count',
             'Delivery_Status': lambda x: (x == 'Late').sum()
         }).rename(columns={'Transaction_ID': 'Total_Yesterday', 'Delivery_Status': 'Late_Yesterday'})
@@ -245,12 +239,12 @@ if 'Actual_Ship_Date' in filtered_data.columns:
         st.markdown("### 🏭 Source/Warehouse Performance")
         
         # Source comparison
-        today_source = today_data.groupby('Source').agg({
+        today_source = today_data.groupby('Source', observed=True).agg({
             'Transaction_ID': 'count',
             'Delivery_Status': lambda x: (x == 'Late').sum()
         }).rename(columns={'Transaction_ID': 'Total', 'Delivery_Status': 'Late'})
         
-        yesterday_source = yesterday_data.groupby('Source').agg({
+        yesterday_source = yesterday_data.groupby('Source', observed=True).agg({
             'Transaction_ID': 'count',
             'Delivery_Status': lambda x: (x == 'Late').sum()
         }).rename(columns={'Transaction_ID': 'Total', 'Delivery_Status': 'Late'})
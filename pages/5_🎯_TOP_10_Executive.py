@@ -15,8 +15,8 @@ from plotly.subplots import make_subplots
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils.data_processor import DataProcessor
-from components.filters import create_multiselect_filters, apply_filters_to_data
+from utils.dataset_service import get_processor
+from components.filters import create_multiselect_filters
 
 st.set_page_config(
     page_title="TOP 10 Executive View - P&G Analytics",
@@ -27,24 +27,16 @@ st.set_page_config(
 st.title("🎯 TOP 10 Executive Dashboard")
 st.markdown("Quick insights into top performers and critical areas")
 
-# Load data
-@st.cache_resource
-def load_data():
-    processor = DataProcessor()
-    processor.load_processed_data()
-    return processor
-
-processor = load_data()
+# Load data (shared by all pages and sessions)
+processor = get_processor()
 
 # Filters
 st.sidebar.markdown("### Filters")
 filters = create_multiselect_filters(processor.shipping_data)
-filtered_data = apply_filters_to_data(processor.shipping_data, filters)
 
-# Create a temporary processor for filtered data
-filtered_processor = DataProcessor()
-filtered_processor.shipping_data = filtered_data
-filtered_processor.sales_data = processor.sales_data
+# Processor over the filtered rows (rows and aggregates restricted together)
+filtered_processor = processor.subset(filters)
+filtered_data = filtered_processor.shipping_data
 
 # Executive Summary Cards
 st.markdown("## 📊 Executive Summary")
@@ -92,7 +84,7 @@ with col4:
         )
 
 # Prepare category performance data for reuse across tabs
-category_perf = filtered_data.groupby('Category').agg({
+category_perf = filtered_data.groupby('Category', observed=True).agg({
     'Delivery_Status': [
         lambda x: (x == 'On Time').sum(),
         lambda x: (x == 'Late').sum(),
@@ -144,7 +136,7 @@ with tab1:
         st.markdown("### Top 10 Brands - Lowest Late Rate")
         
         if 'Master_Brand' in filtered_data.columns:
-            brand_perf = filtered_data.groupby('Master_Brand').agg({
+            brand_perf = filtered_data.groupby('Master_Brand', observed=True).agg({
                 'Delivery_Status': [
                     lambda x: (x == 'Late').sum(),
                     'count'
@@ -202,7 +194,7 @@ with tab2:
         # Top 10 Products with Most Late Shipments
         st.markdown("### Top 10 Products - Most Late Shipments")
         
-        product_late = filtered_data[filtered_data['Delivery_Status'] == 'Late'].groupby('Planning_Level').size()
+        product_late = filtered_data[filtered_data['Delivery_Status'] == 'Late'].groupby('Planning_Level', observed=True).size()
         top_late_products = product_late.nlargest(10)
         
         fig = px.bar(
@@ -227,7 +219,7 @@ with tab3:
         st.markdown("### Top 10 Products by Volume")
         
         if 'Quantity' in filtered_data.columns:
-            product_volume = filtered_data.groupby('Planning_Level')['Quantity'].sum().nlargest(10)
+            product_volume = filtered_data.groupby('Planning_Level', observed=True)['Quantity'].sum().nlargest(10)
             
             fig = px.pie(
                 values=product_volume.values,
@@ -240,7 +232,7 @@ with tab3:
     with col2:
         st.markdown("### Top 10 Products by Order Count")
         
-        product_orders = filtered_data.groupby('Planning_Level').size().nlargest(10)
+        product_orders = filtered_data.groupby('Planning_Level', observed=True).size().nlargest(10)
         
         fig = px.bar(
             x=product_orders.values,
@@ -256,7 +248,7 @@ with tab3:
     # Product Performance Table
     st.markdown("### Product Performance Metrics")
     
-    product_metrics = filtered_data.groupby('Planning_Level').agg({
+    product_metrics = filtered_data.groupby('Planning_Level', observed=True).agg({
         'Transaction_ID': 'count',
         'Delivery_Status': lambda x: (x == 'Late').sum(),
         'Quantity': 'sum' if 'Quantity' in filtered_data.columns else lambda x: 0,
@@ -286,7 +278,7 @@ with tab4:
     st.markdown("## 🏭 Plant/Source Rankings")
     
     # Plant performance metrics
-    plant_metrics = filtered_data.groupby('Source').agg({
+    plant_metrics = filtered_data.groupby('Source', observed=True).agg({
         'Transaction_ID': 'count',
         'Delivery_Status': [
             lambda x: (x == 'Late').sum(),
@@ -356,7 +348,7 @@ with tab5:
     
     if processor.sales_data is not None and not processor.sales_data.empty:
         # Top 10 by Sales Achievement
-        sales_by_category = processor.sales_data.groupby('Category').agg({
+        sales_by_category = processor.sales_data.groupby('Category', observed=True).agg({
             'Sales': 'sum',
             'Target': 'sum'
         })
@@ -444,7 +436,7 @@ with tab6:
         weekly_data = filtered_data[filtered_data['Category'].isin(top_5_categories)].copy()
         weekly_data['Week'] = weekly_data['Actual_Ship_Date'].dt.to_period('W')
         
-        weekly_trend = weekly_data.groupby(['Week', 'Category']).agg({
+        weekly_trend = weekly_data.groupby(['Week', 'Category'], observed=True).agg({
             'Delivery_Status': [
                 lambda x: (x == 'Late').sum(),
                 'count'
@@ -17,7 +17,7 @@ import plotly.graph_objects as go
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils.data_processor import DataProcessor
+from utils.dataset_service import get_processor
 from components.filters import create_multiselect_filters, apply_filters_to_data
 
 st.set_page_config(
@@ -29,14 +29,8 @@ st.set_page_config(
 st.title("📧 Automated Email Reports")
 st.markdown("Generate and schedule supply chain performance reports")
 
-# Load data
-@st.cache_resource
-def load_data():
-    processor = DataProcessor()
-    processor.load_processed_data()
-    return processor
-
-processor = load_data()
+# Load data (shared by all pages and sessions)
+processor = get_processor()
 
 # Filters
 st.sidebar.markdown("### Report Filters")
@@ -135,7 +129,7 @@ def generate_report_content(data, report_type):
             html_content += '<div class="success">✅ <strong>Good Performance:</strong> Late delivery rate within acceptable range</div>'
         
         # Top problem categories
-        category_perf = data.groupby('Category').agg({
+        category_perf = data.groupby('Category', observed=True).agg({
             'Delivery_Status': lambda x: (x == 'Late').sum() / len(x) * 100 if len(x) > 0 else 0
         }).round(1)
         category_perf.columns = ['Late_Rate']
@@ -160,7 +154,7 @@ def generate_report_content(data, report_type):
         html_content += '<div class="section"><h2>Performance by Category</h2><table>'
         html_content += '<tr><th>Category</th><th>Total</th><th>Late</th><th>Late Rate %</th></tr>'
         
-        cat_summary = data.groupby('Category').agg({
+        cat_summary = data.groupby('Category', observed=True).agg({
             'Transaction_ID': 'count',
             'Delivery_Status': lambda x: (x == 'Late').sum()
         })
@@ -247,7 +241,7 @@ def create_excel_attachment(data):
         pd.DataFrame(summary_data).to_excel(writer, sheet_name='Summary', index=False)
         
         # Category performance
-        cat_perf = data.groupby('Category').agg({
+        cat_perf = data.groupby('Category', observed=True).agg({
             'Transaction_ID': 'count',
             'Delivery_Status': lambda x: (x == 'Late').sum()
         })
@@ -255,7 +249,7 @@ def create_excel_attachment(data):
         cat_perf.to_excel(writer, sheet_name='Category Performance')
         
         # Plant performance
-        plant_perf = data.groupby('Source').agg({
+        plant_perf = data.groupby('Source', observed=True).agg({
             'Transaction_ID': 'count',
             'Delivery_Status': lambda x: (x == 'Late').sum()
         })
@@ -6,6 +6,7 @@ Information about the dashboard and developer
 import streamlit as st
 import pandas as pd
 from datetime import datetime
+from utils import lazy_imports
 
 st.set_page_config(
     page_title="About - P&G Analytics",
@@ -193,8 +194,21 @@ with st.expander("⚡ Performance Tips", expanded=False):
     - **Train ML models** once per session
     - Use **date ranges** to limit data scope
     - **Export** large reports during off-peak hours
+    - **Heavy libraries** (scikit-learn, SciPy, statsmodels) load on first use
     """)
 
+with st.expander("⏱️ Library Load Times", expanded=False):
+    import_costs = lazy_imports.import_costs()
+    if import_costs.empty:
+        st.info("No heavy libraries loaded yet in this session")
+    else:
+        st.dataframe(
+            import_costs.style.format({'Seconds': '{:.2f}'}),
+            hide_index=True,
+            use_container_width=True
+        )
+        st.caption(f"Total: {import_costs['Seconds'].sum():.2f}s, paid once per server process")
+
 st.markdown("---")
 
 # Footer
@@ -4,6 +4,7 @@ Force reload data from cloud
 import streamlit as st
 import os
 import shutil
+from utils.dataset_service import invalidate
 
 st.set_page_config(page_title="Force Reload", layout="wide")
 
@@ -24,6 +25,7 @@ if st.button("🗑️ Clear All Cached Data", type="primary"):
     try:
         if os.path.exists(extracted_dir):
             shutil.rmtree(extracted_dir)
+            invalidate()
             st.success("✅ Cleared all cached data")
         else:
             st.warning("No cached data to clear")
@@ -9,7 +9,8 @@ import subprocess
 # Add current directory to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from utils.data_extractor import DataExtractor
+from utils.data_extractor import DataExtractor, DEFAULT_WORKERS
+from utils.workbook_reader import DEFAULT_CHUNK_SIZE
 
 def setup_data():
     """Extract data from Excel files if not already done"""
@@ -25,7 +26,9 @@ def setup_data():
         try:
             extractor = DataExtractor(
                 file1_path="../2-JPG shipping tracking - July 2025.xlsx",
-                file2_path="../3-DSR-PG- 2025 July.xlsx"
+                file2_path="../3-DSR-PG- 2025 July.xlsx",
+                chunk_size=DEFAULT_CHUNK_SIZE,
+                workers=DEFAULT_WORKERS
             )
             extractor.save_extracted_data()
             print("✅ Data extraction completed successfully!")
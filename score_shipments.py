@@ -0,0 +1,155 @@
+"""
+Batch Scoring Script for P&G Supply Chain Analytics Dashboard
+Scores shipments for late delivery risk outside the Streamlit app
+"""
+
+import os
+import sys
+import time
+import argparse
+
+from utils.dataset_service import DEFAULT_DATA_DIR, get_processor
+from utils.columnar_store import ChunkedTableWriter, table_path
+from ml_models.forest_scoring import LateRiskScorer
+from ml_models.batch_scoring import DEFAULT_CHUNK_SIZE, score_late_risk
+
+# Late delivery training modes of PredictiveModels.train_late_delivery_model
+LATE_DELIVERY_MODES = ['full', 'sample', 'window', 'warm_start']
+
+
+def load_late_delivery_model(data_dir, registry, mode):
+    """Late delivery model for the current data: from the registry, else trained now in ``mode``"""
+    # Imported here so scoring with an exported scorer never loads scikit-learn
+    from ml_models.predictive import PredictiveModels
+
+    # The version is the one the loaded data belongs to, not read apart from it
+    processor = get_processor(data_dir)
+    if processor.shipping_data is None or processor.shipping_data.empty:
+        return None
+
+    models = PredictiveModels(processor.shipping_data, data_version=processor.data_version)
+    if 'late_delivery' in models.load_models(registry, names=['late_delivery'], late_delivery_mode=mode):
+        print(f"✓ Using the trained late delivery model ({mode}) from the model registry")
+    else:
+        # Warm start builds on the model trained for earlier data when there is one
+        previous = None
+        if mode == 'warm_start':
+            previous = registry.latest('late_delivery', PredictiveModels.registry_params('late_delivery', mode))
+        print(f"🔄 Training the late delivery model ({mode})...")
+        results = models.train_late_delivery_model(mode=mode, previous=previous)
+        models.save_models(registry)
+        lineage = results['lineage']
+        print(f"✓ Model trained ({lineage['mode']}, {models.models['late_delivery'].n_estimators} trees, "
+              f"{len(lineage['data_versions'])} data versions) and saved to the model registry")
+    return models
+
+
+def default_input(data_dir):
+    """The extracted shipping table (Parquet copy when present)"""
+    parquet_path = table_path(data_dir, 'shipping_main_data')
+    if os.path.exists(parquet_path):
+        return parquet_path
+    return os.path.join(data_dir, 'shipping_main_data.csv')
+
+
+def score_shipments(input_path, output_dir, name, data_dir, chunk_size, n_jobs,
+                    scorer_path=None, export_path=None, mode='warm_start'):
+    """Score all shipments of a file and write them as one table
+
+    With ``scorer_path`` the shipments are scored by that exported scorer
+    (no scikit-learn needed); ``export_path`` exports the model used.
+    Otherwise the registry's model for ``mode`` is used, trained when missing.
+    """
+    if scorer_path:
+        if not os.path.exists(scorer_path):
+            print(f"❌ Error: Scorer file not found: {scorer_path}")
+            return False
+        models = LateRiskScorer.load(scorer_path)
+        print(f"✓ Using the exported late delivery scorer {scorer_path}")
+    else:
+        from ml_models.model_registry import ModelRegistry
+        models = load_late_delivery_model(data_dir, ModelRegistry(), mode)
+        if models is None:
+            print(f"❌ Error: No shipping data in {data_dir} to train the model on")
+            return False
+
+    if export_path:
+        scorer = models if isinstance(models, LateRiskScorer) else models.export_late_risk_scorer()
+        scorer.save(export_path)
+        print(f"✓ Scorer exported to {os.path.abspath(export_path)} "
+              f"({scorer.forest.nbytes / 1024 / 1024:.1f} MB in memory)")
+
+    if not os.path.exists(input_path):
+        print(f"❌ Error: Input file not found: {input_path}")
+        return False
+
+    print(f"\n📊 Scoring {input_path} in chunks of {chunk_size} rows ({n_jobs} jobs)...")
+    started = time.time()
+    os.makedirs(output_dir, exist_ok=True)
+    writer = ChunkedTableWriter(output_dir, name)
+    late = 0
+    for scored in score_late_risk(models, input_path, chunk_size=chunk_size, n_jobs=n_jobs):
+        writer.write(scored)
+        late += int(scored['Late_Prediction'].sum())
+        print(f"  {writer.rows:,} shipments scored", end='\r')
+    rows = writer.close()
+
+    print(f"\n✓ Scored {rows:,} shipments in {time.time() - started:.1f}s, "
+          f"{late:,} predicted late")
+    print(f"✓ Written to {os.path.join(output_dir, name)}.csv")
+    return True
+
+
+def main():
+    """Main function with command line interface"""
+    parser = argparse.ArgumentParser(
+        description='Score shipments for late delivery risk',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python score_shipments.py
+  python score_shipments.py open_shipments.csv --output-dir scores
+  python score_shipments.py backlog.parquet --chunk-size 100000 --n-jobs 4
+  python score_shipments.py --export-scorer late_risk_scorer.npz
+  python score_shipments.py --mode sample
+  python score_shipments.py open_shipments.csv --scorer late_risk_scorer.npz
+        """
+    )
+
+    parser.add_argument('input', nargs='?', default=None,
+                        help='CSV or Parquet file of shipments (default: the extracted shipping data)')
+    parser.add_argument('--output-dir', default=os.path.join('data', 'scores'),
+                        help='Directory for the scored table (default: data/scores)')
+    parser.add_argument('--name', default='late_risk_scores',
+                        help='Name of the scored table (default: late_risk_scores)')
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR,
+                        help='Extracted data the model is trained on')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f'Shipments per chunk (default: {DEFAULT_CHUNK_SIZE})')
+    parser.add_argument('--n-jobs', type=int, default=os.cpu_count() or 1,
+                        help='Chunks scored in parallel (default: number of CPUs)')
+    parser.add_argument('--mode', default='warm_start', choices=LATE_DELIVERY_MODES,
+                        help='Late delivery training mode, each with its own registry model (default: warm_start)')
+    parser.add_argument('--scorer', default=None,
+                        help='Score with this exported scorer (.npz) instead of the trained model')
+    parser.add_argument('--export-scorer', default=None,
+                        help='Also export the model as a NumPy-only scorer (.npz) to this path')
+
+    args = parser.parse_args()
+
+    success = score_shipments(
+        args.input or default_input(args.data_dir),
+        args.output_dir,
+        args.name,
+        args.data_dir,
+        chunk_size=args.chunk_size,
+        n_jobs=args.n_jobs,
+        scorer_path=args.scorer,
+        export_path=args.export_scorer,
+        mode=args.mode
+    )
+
+    sys.exit(0 if success else 1)
+
+if __name__ == "__main__":
+    main()
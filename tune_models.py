@@ -0,0 +1,84 @@
+"""
+Model Tuning Script for P&G Supply Chain Analytics Dashboard
+Compares late delivery model settings on time-ordered cross-validation
+"""
+
+import os
+import sys
+import time
+import argparse
+import pandas as pd
+
+from utils.dataset_service import DEFAULT_DATA_DIR
+from utils.data_processor import DataProcessor
+from ml_models.predictive import PredictiveModels
+from ml_models.tuning import DEFAULT_CACHE_DIR, tune_late_delivery_model, compare_subsample
+
+
+def main():
+    """Main function with command line interface"""
+    parser = argparse.ArgumentParser(
+        description='Tune the late delivery model on time-ordered cross-validation',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python tune_models.py
+  python tune_models.py --max-configs 27 --folds 5 --workers 4
+  python tune_models.py --output tuning_results.csv
+  python tune_models.py --compare-subsample --max-rows 100000
+        """
+    )
+
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR,
+                        help='Extracted data to tune on')
+    parser.add_argument('--max-configs', type=int, default=12,
+                        help='Most configurations to try (default: 12)')
+    parser.add_argument('--folds', type=int, default=4,
+                        help='Time-ordered folds (default: 4)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Worker processes (default: number of CPUs)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Retrain every fold instead of reusing cached fold results')
+    parser.add_argument('--output', default=None,
+                        help='Also write the results to this CSV file')
+    parser.add_argument('--compare-subsample', action='store_true',
+                        help="Instead of tuning, compare the 'sample' training mode with a full history fit")
+    parser.add_argument('--max-rows', type=int, default=None,
+                        help=f"Row budget of the sample (default: {PredictiveModels.SUBSAMPLE['max_rows']:,})")
+
+    args = parser.parse_args()
+
+    processor = DataProcessor().load_processed_data(data_dir=args.data_dir)
+    if processor.shipping_data is None or processor.shipping_data.empty:
+        print(f"❌ Error: No shipping data in {args.data_dir}")
+        sys.exit(1)
+
+    if args.compare_subsample:
+        print(f"\n🔧 Comparing stratified sample and full history fits on {len(processor.shipping_data):,} shipments...")
+        started = time.time()
+        results = compare_subsample(processor.shipping_data, max_rows=args.max_rows)
+        print(f"✓ Done in {time.time() - started:.1f}s\n")
+    else:
+        print(f"\n🔧 Tuning the late delivery model on {len(processor.shipping_data):,} shipments...")
+        started = time.time()
+        results = tune_late_delivery_model(
+            processor.shipping_data,
+            max_configs=args.max_configs,
+            n_folds=args.folds,
+            workers=args.workers,
+            cache_dir=None if args.no_cache else DEFAULT_CACHE_DIR
+        )
+        print(f"✓ Done in {time.time() - started:.1f}s\n")
+
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(results.round(4).to_string(index=False))
+
+    current = PredictiveModels.HYPERPARAMETERS['late_delivery']
+    print(f"\nCurrent settings: n_estimators={current['n_estimators']}, max_depth={current['max_depth']}")
+
+    if args.output:
+        results.to_csv(args.output, index=False)
+        print(f"✓ Results written to {os.path.abspath(args.output)}")
+
+if __name__ == "__main__":
+    main()
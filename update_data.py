@@ -31,7 +31,7 @@ def backup_old_files(parent_dir):
     
     return backup_dir
 
-def update_data_files(new_shipping_file, new_sales_file, keep_names=False):
+def update_data_files(new_shipping_file, new_sales_file, keep_names=False, incremental=False, workers=None):
     """Update dashboard data files"""
     
     # Get paths
@@ -79,16 +79,37 @@ def update_data_files(new_shipping_file, new_sales_file, keep_names=False):
     print(f"✓ Copied sales file to: {dest_sales}")
     
     # Remove extracted data to force refresh
-    if os.path.exists(extracted_dir):
+    if not incremental and os.path.exists(extracted_dir):
         print("\n🗑️  Removing old extracted data...")
         shutil.rmtree(extracted_dir)
         print("✓ Cleared extracted data cache")
     
+    extracted_now = incremental or workers is not None
+    if extracted_now:
+        sys.path.append(script_dir)
+        from utils.data_extractor import DataExtractor, DEFAULT_WORKERS
+        from utils.workbook_reader import DEFAULT_CHUNK_SIZE
+        extractor = DataExtractor(file1_path=dest_shipping, file2_path=dest_sales,
+                                  chunk_size=DEFAULT_CHUNK_SIZE, workers=workers or DEFAULT_WORKERS)
+        if incremental:
+            # Re-extract only the sheets that changed and append new shipping rows
+            print("\n⚡ Running incremental extraction...")
+            summary = extractor.update_extracted_data(output_dir=extracted_dir)
+            print(f"✓ Extraction mode: {summary['mode']}")
+        else:
+            # Full extraction now, with the requested worker processes
+            print(f"\n⚡ Running full extraction with {extractor.workers} workers...")
+            extractor.save_extracted_data(output_dir=extracted_dir)
+            print("✓ Extraction mode: full")
+    
     print(f"\n{'='*50}")
     print("✅ Data update completed successfully!")
     print("\n📌 Next steps:")
     print("1. Restart the Streamlit application")
-    print("2. The app will automatically extract data from new files")
+    if extracted_now:
+        print("2. Extracted data is already up to date")
+    else:
+        print("2. The app will automatically extract data from new files")
     print("3. Verify data in the dashboard")
     
     if backup_dir and os.path.exists(backup_dir):
@@ -105,6 +126,9 @@ def main():
 Examples:
   python update_data.py shipping.xlsx sales.xlsx
   python update_data.py --keep-names new_shipping_2025.xlsx new_sales_2025.xlsx
+  python update_data.py --incremental shipping.xlsx sales.xlsx
+  python update_data.py --incremental --workers 4 shipping.xlsx sales.xlsx
+  python update_data.py --workers 4 shipping.xlsx sales.xlsx
   
 For more information, see DATA_UPDATE_GUIDE.md
         """
@@ -114,6 +138,11 @@ For more information, see DATA_UPDATE_GUIDE.md
     parser.add_argument('sales_file', help='Path to new sales Excel file')
     parser.add_argument('--keep-names', action='store_true', 
                        help='Keep original file names (requires updating Overview.py)')
+    parser.add_argument('--incremental', action='store_true',
+                       help='Re-extract only changed sheets and append new shipping rows')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='Worker processes for parsing sheets in parallel (default: one per CPU); '
+                            'without --incremental, extract now instead of on the next app start')
     
     args = parser.parse_args()
     
@@ -121,7 +150,9 @@ For more information, see DATA_UPDATE_GUIDE.md
     success = update_data_files(
         args.shipping_file, 
         args.sales_file,
-        keep_names=args.keep_names
+        keep_names=args.keep_names,
+        incremental=args.incremental,
+        workers=args.workers
     )
     
     sys.exit(0 if success else 1)
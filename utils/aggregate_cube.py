@@ -0,0 +1,170 @@
+"""
+Aggregate Cube Module for P&G Supply Chain Analytics
+Pre-aggregated shipment counts and sums behind the KPI and breakdown queries
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Shipping columns the cube is grouped by ('Date' is Actual_Ship_Date's day)
+DIMENSIONS = [
+    'Date', 'Category', 'Master_Brand', 'Brand', 'Source',
+    'SLS_Plant', 'Planning_Level', 'Delivery_Status'
+]
+
+# Cube measure -> (shipping column, aggregation)
+MEASURES = {
+    'Quantity_Sum': ('Quantity', 'sum'),
+    'Delay_Sum': ('Delay_Days', 'sum'),
+    'Delay_Count': ('Delay_Days', 'count')
+}
+
+
+class AggregateCube:
+    """Shipment counts plus quantity and delay sums per dimension combination
+
+    Built once from the shipping rows, after which the KPI and breakdown
+    queries only touch one row per distinct combination of dimensions.
+    Missing dimension values are kept as their own group, so every shipping
+    row is counted exactly once, like it is in the raw data.
+    """
+
+    def __init__(self, frame, dimensions, measures):
+        self.frame = frame
+        self.dimensions = dimensions
+        self.measures = measures
+        # Lazily built numpy views of the dimensions and measures
+        self._code_cache = {}
+        self._measure_cache = {}
+
+    @classmethod
+    def build(cls, data):
+        """Aggregate the shipping rows into a cube"""
+        keys = pd.DataFrame(index=data.index)
+        if 'Actual_Ship_Date' in data.columns and pd.api.types.is_datetime64_any_dtype(data['Actual_Ship_Date']):
+            keys['Date'] = data['Actual_Ship_Date'].dt.normalize()
+        for dim in DIMENSIONS[1:]:
+            if dim in data.columns:
+                keys[dim] = data[dim]
+        dimensions = list(keys.columns)
+
+        values = pd.DataFrame({'Count': 1}, index=data.index)
+        measures = ['Count']
+        for measure, (column, func) in MEASURES.items():
+            if column in data.columns and pd.api.types.is_numeric_dtype(data[column]):
+                values[measure] = data[column] if func == 'sum' else data[column].notna().astype('int64')
+                measures.append(measure)
+
+        if not dimensions:
+            frame = values.sum().to_frame().T
+        else:
+            frame = (
+                pd.concat([keys, values], axis=1)
+                .groupby(dimensions, observed=True, dropna=False, sort=False)[measures]
+                .sum()
+                .reset_index()
+            )
+        logger.info(f"Built aggregate cube: {len(data)} rows -> {len(frame)} cells")
+        return cls(frame, dimensions, measures)
+
+    def has(self, *columns):
+        """True when the cube can answer for these dimensions/measures"""
+        return all(col in self.dimensions or col in self.measures for col in columns)
+
+    def filter(self, filters=None, date_range=None):
+        """Cube restricted like components.filters.apply_filters_to_data"""
+        mask = pd.Series(True, index=self.frame.index)
+
+        if date_range and 'Date' in self.dimensions:
+            start_date, end_date = date_range
+            dates = self.frame['Date']
+            if dates.dt.tz is not None:
+                # Compare wall-clock days, as .dt.date does for timezone-aware dates
+                dates = dates.dt.tz_localize(None)
+            start = pd.Timestamp(start_date).normalize()
+            stop = pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1)
+            mask &= (dates >= start) & (dates < stop)
+
+        for column, values in (filters or {}).items():
+            if column in self.frame.columns and values:
+                mask &= self.frame[column].isin(values)
+
+        return AggregateCube(self.frame[mask].reset_index(drop=True), self.dimensions, self.measures)
+
+    def total(self, measure='Count', **conditions):
+        """Sum of a measure over the cells matching ``column=value`` conditions"""
+        mask = self._condition_mask(conditions)
+        return self._cast(self._measure(measure)[mask].sum(), measure)
+
+    def rollup(self, dims, measure='Count', **conditions):
+        """Sum of a measure by the given dimensions, missing values dropped
+
+        Matches groupby(dims, observed=True)[...].sum() on the raw rows: groups
+        are sorted, only groups with shipments are returned and rows with a
+        missing value in ``dims`` are left out. Computed with np.bincount on
+        the dimension codes, so the cost depends on the cube size only.
+        """
+        mask = self._condition_mask(conditions)
+        encoded = [self._dimension(dim) for dim in dims]
+        sizes = [max(len(values), 1) for _, values, _ in encoded]
+        for codes, _, _ in encoded:
+            mask &= codes >= 0
+
+        # One flat cell key per combination of dimension codes
+        key = np.ravel_multi_index([codes[mask] for codes, _, _ in encoded], sizes)
+        size = int(np.prod(sizes))
+        sums = np.bincount(key, weights=self._measure(measure)[mask], minlength=size)
+        observed = np.flatnonzero(np.bincount(key, minlength=size))
+        values = self._cast(sums[observed], measure)
+
+        observed_codes = np.unravel_index(observed, sizes)
+        if len(dims) == 1:
+            decode = encoded[0][2]
+            index = pd.Index(decode(observed_codes[0]), name=dims[0])
+        else:
+            levels, level_codes = [], []
+            for (_, _, decode), codes in zip(encoded, observed_codes):
+                uniques, positions = np.unique(codes, return_inverse=True)
+                levels.append(pd.Index(decode(uniques)))
+                level_codes.append(positions)
+            index = pd.MultiIndex(levels=levels, codes=level_codes, names=dims)
+        return pd.Series(values, index=index, name=measure)
+
+    def _condition_mask(self, conditions):
+        mask = np.ones(len(self.frame), dtype=bool)
+        for dim, value in conditions.items():
+            codes, values, _ = self._dimension(dim)
+            code = values.get_indexer([value])[0]
+            mask &= (codes == code) if code >= 0 else False
+        return mask
+
+    def _dimension(self, dim):
+        """Integer codes (-1 for missing), distinct values and decoder of a dimension"""
+        if dim not in self._code_cache:
+            series = self.frame[dim]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                dtype = series.dtype
+                codes = series.cat.codes.to_numpy(dtype=np.int64)
+                decode = lambda c, dtype=dtype: pd.Categorical.from_codes(c, dtype=dtype)
+                values = pd.Index(dtype.categories)
+            else:
+                codes, values = pd.factorize(series, sort=True)
+                codes = codes.astype(np.int64)
+                values = pd.Index(values)
+                decode = lambda c, values=values: values.take(c)
+            self._code_cache[dim] = (codes, values, decode)
+        return self._code_cache[dim]
+
+    def _measure(self, measure):
+        if measure not in self._measure_cache:
+            self._measure_cache[measure] = self.frame[measure].to_numpy(dtype=np.float64)
+        return self._measure_cache[measure]
+
+    def _cast(self, values, measure):
+        """Sums come back as float from bincount; restore integer measures"""
+        if pd.api.types.is_integer_dtype(self.frame[measure].dtype):
+            return np.asarray(values).astype(np.int64)
+        return values
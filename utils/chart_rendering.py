@@ -0,0 +1,131 @@
+"""
+Chart Rendering Module for P&G Supply Chain Analytics
+WebGL traces and server-side downsampling for charts with many points
+"""
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# Render modes: 'auto' switches to WebGL and downsamples above the limits
+# below, 'full' sends every point as SVG
+RENDER_MODES = ('auto', 'full')
+
+# Points in a trace above which it is drawn with WebGL (Scattergl)
+WEBGL_THRESHOLD = 2000
+
+# Most points sent per downsampled trace
+MAX_POINTS = 5000
+
+
+def scatter_trace(n_points, render_mode='auto'):
+    """go.Scattergl for a trace of more than WEBGL_THRESHOLD points in 'auto' mode, else go.Scatter"""
+    return go.Scattergl if render_mode == 'auto' and n_points > WEBGL_THRESHOLD else go.Scatter
+
+
+def lttb_indices(x, y, n_out):
+    """Positions of the points Largest-Triangle-Three-Buckets keeps of a series
+
+    The first and last points are kept; in between, the points are split
+    into n_out - 2 buckets and each keeps the point forming the largest
+    triangle with the point kept before it and the next bucket's mean, so
+    peaks and dips survive. ``x`` must be sorted (dates are fine).
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = _as_float(x)
+    y = np.nan_to_num(np.asarray(y, dtype=np.float64))
+    edges = np.floor(np.linspace(1, n - 1, n_out - 1)).astype(np.int64)
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x, next_y = x[end:edges[i + 2]].mean(), y[end:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        # Twice the triangle areas; the factor does not change the largest
+        area = np.abs((x[a] - next_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (next_y - y[a]))
+        a = start + int(np.argmax(area))
+        kept[i + 1] = a
+    return kept
+
+
+def quantile_bin_ranks(n, n_out):
+    """Ranks (in sorted order) of the order statistics a Q-Q plot keeps of n points
+
+    The sorted points are split into n_out quantile bins and each bin is
+    drawn as its edge order statistic, the minimum and maximum included,
+    so the plot keeps its shape and its tails.
+    """
+    if n_out >= n:
+        return np.arange(n)
+    return np.unique(np.round(np.linspace(0, n - 1, n_out)).astype(np.int64))
+
+
+def box_statistics(sorted_values):
+    """Quartiles, Tukey fences and mean of sorted values, as go.Box takes them precomputed
+
+    Quartiles are interpolated linearly like Plotly's default; each fence
+    is the furthest value within 1.5 IQR of its quartile. Returns the
+    statistics (one-item lists) and the values outside the fences.
+    """
+    q1, median, q3 = np.percentile(sorted_values, [25, 50, 75])
+    iqr = q3 - q1
+    low = np.searchsorted(sorted_values, q1 - 1.5 * iqr, side='left')
+    high = np.searchsorted(sorted_values, q3 + 1.5 * iqr, side='right')
+    statistics = {
+        'q1': [q1], 'median': [median], 'q3': [q3],
+        'lowerfence': [sorted_values[low]], 'upperfence': [sorted_values[high - 1]],
+        'mean': [sorted_values.mean()]
+    }
+    return statistics, np.concatenate([sorted_values[:low], sorted_values[high:]])
+
+
+def silverman_bandwidth(sorted_values):
+    """Kernel bandwidth Plotly's violin uses by default, from all the values"""
+    q1, q3 = np.percentile(sorted_values, [25, 75])
+    spread = min(sorted_values.std(ddof=1), (q3 - q1) / 1.349)
+    return 1.059 * spread * len(sorted_values) ** -0.2
+
+
+def figure_points(fig):
+    """Data points the figure sends to the browser, over all traces"""
+    points = 0
+    for trace in fig.data:
+        values = next((getattr(trace, axis, None) for axis in ('x', 'y')
+                       if getattr(trace, axis, None) is not None), None)
+        points += len(values) if values is not None else 0
+    return points
+
+
+def record_points(fig, points_total):
+    """Store the points sent, of ``points_total``, and whether WebGL is used in the figure's layout.meta"""
+    fig.update_layout(meta={
+        'points_sent': figure_points(fig),
+        'points_total': int(points_total),
+        'webgl': any(isinstance(trace, go.Scattergl) for trace in fig.data)
+    })
+    return fig
+
+
+def points_caption(fig):
+    """'Showing 5,000 of 120,000 points (WebGL)' for a downsampled figure, else None"""
+    meta = fig.layout.meta
+    if not isinstance(meta, dict) or meta.get('points_sent', 0) >= meta.get('points_total', 0):
+        return None
+    renderer = ' (WebGL)' if meta.get('webgl') else ''
+    return f"Showing {meta['points_sent']:,} of {meta['points_total']:,} points{renderer}"
+
+
+def _as_float(x):
+    if isinstance(x, (pd.DatetimeIndex, pd.Series)) and pd.api.types.is_datetime64_any_dtype(x):
+        return np.asarray(x, dtype='datetime64[ns]').view(np.int64).astype(np.float64)
+    values = np.asarray(x)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype('datetime64[ns]').view(np.int64).astype(np.float64)
+    return values.astype(np.float64)
@@ -0,0 +1,178 @@
+"""
+Columnar Storage Module for P&G Supply Chain Analytics
+Keeps typed Parquet copies of the extracted tables next to the CSV files
+so the dashboard can load them without re-parsing text and dates
+"""
+
+import os
+import shutil
+import logging
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+def table_path(data_dir, name):
+    """Path of the Parquet copy for an extracted table"""
+    return os.path.join(data_dir, f'{name}.parquet')
+
+
+def save_table(df, data_dir, name):
+    """Write a table as Parquet, keeping dtypes, datetimes and categoricals
+
+    Returns True when the Parquet copy was written. Tables pyarrow cannot
+    store (e.g. object columns mixing numbers and text) are skipped and
+    keep being served from their CSV file.
+    """
+    if not PARQUET_AVAILABLE:
+        return False
+
+    path = table_path(data_dir, name)
+    try:
+        df.to_parquet(path, index=False)
+        return True
+    except Exception as e:
+        logger.warning(f"Could not write columnar copy of {name}: {str(e)}")
+        if os.path.exists(path):
+            os.remove(path)
+        return False
+
+
+def load_table(data_dir, name):
+    """Load the Parquet copy of a table if it is present and up to date
+
+    Returns None when the CSV should be used instead: pyarrow missing, no
+    Parquet file, or the CSV was rewritten after the Parquet copy (e.g. by
+    the lightweight extractor or fix_dates.py).
+    """
+    if not PARQUET_AVAILABLE:
+        return None
+
+    path = table_path(data_dir, name)
+    if not os.path.exists(path):
+        return None
+
+    csv_path = os.path.join(data_dir, f'{name}.csv')
+    if os.path.exists(csv_path) and os.path.getmtime(csv_path) > os.path.getmtime(path):
+        logger.info(f"Columnar copy of {name} is older than its CSV, ignoring it")
+        return None
+
+    try:
+        return pd.read_parquet(path)
+    except Exception as e:
+        logger.warning(f"Could not read columnar copy of {name}: {str(e)}")
+        return None
+
+
+class ChunkedTableWriter:
+    """Write an extracted table batch by batch (CSV plus Parquet copy)
+
+    Used by the streaming extraction so a sheet never has to be held in
+    memory as a whole. Output goes to temporary files that replace the
+    previous table only on close(), so readers never see half a table.
+    The Parquet schema is fixed by the first batch, with integer columns
+    widened to float64 because a later batch may contain blanks; if a later
+    batch still cannot be stored under it the Parquet copy is dropped and
+    only the CSV is kept. A batch may add columns after the existing ones:
+    the CSV header is rewritten on close() (earlier rows just have fewer
+    fields) and the Parquet copy is dropped.
+    """
+
+    def __init__(self, data_dir, name):
+        self.data_dir = data_dir
+        self.name = name
+        self.rows = 0
+        self._csv_path = os.path.join(data_dir, f'{name}.csv')
+        self._csv_tmp = f'{self._csv_path}.tmp'
+        self._parquet_tmp = f'{table_path(data_dir, name)}.tmp'
+        self._columns = None
+        # Size of the CSV header written first, and whether columns were added since
+        self._header_bytes = 0
+        self._header_changed = False
+        self._schema = None
+        self._parquet_writer = None
+        self._parquet_ok = PARQUET_AVAILABLE
+
+    def write(self, df):
+        """Append one batch of rows"""
+        if self._columns is None:
+            self._columns = list(df.columns)
+            pd.DataFrame(columns=self._columns).to_csv(self._csv_tmp, index=False)
+            self._header_bytes = os.path.getsize(self._csv_tmp)
+        else:
+            added = [col for col in df.columns if col not in self._columns]
+            if added:
+                self._columns += added
+                self._header_changed = True
+                if self._parquet_ok:
+                    logger.warning(f"Dropping columnar copy of {self.name}: columns {added} added mid-table")
+                    self._abort_parquet()
+            df = df.reindex(columns=self._columns)
+        df.to_csv(self._csv_tmp, mode='a', header=False, index=False)
+        self.rows += len(df)
+
+        if self._parquet_ok:
+            try:
+                if self._parquet_writer is None:
+                    self._schema = self._widen_schema(pa.Schema.from_pandas(df, preserve_index=False))
+                    batch = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+                    self._parquet_writer = pq.ParquetWriter(self._parquet_tmp, self._schema)
+                else:
+                    batch = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+                self._parquet_writer.write_table(batch)
+            except Exception as e:
+                logger.warning(f"Dropping columnar copy of {self.name}: {str(e)}")
+                self._abort_parquet()
+
+    def close(self):
+        """Publish the written table, replacing any previous version"""
+        if self._columns is None:
+            # Nothing written: publish an empty table like DataFrame().to_csv
+            pd.DataFrame().to_csv(self._csv_tmp, index=False)
+
+        parquet_path = table_path(self.data_dir, self.name)
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+        elif os.path.exists(parquet_path):
+            # Never leave a Parquet copy from an older extraction behind
+            os.remove(parquet_path)
+
+        if self._header_changed:
+            self._rewrite_csv_header()
+        os.replace(self._csv_tmp, self._csv_path)
+        if self._parquet_ok and os.path.exists(self._parquet_tmp):
+            os.replace(self._parquet_tmp, parquet_path)
+        return self.rows
+
+    def _rewrite_csv_header(self):
+        """Put the final columns in the CSV header, copying the rows after it once"""
+        rewritten = f'{self._csv_tmp}.header'
+        pd.DataFrame(columns=self._columns).to_csv(rewritten, index=False)
+        with open(self._csv_tmp, 'rb') as old, open(rewritten, 'ab') as new:
+            old.seek(self._header_bytes)
+            shutil.copyfileobj(old, new)
+        os.replace(rewritten, self._csv_tmp)
+
+    @staticmethod
+    def _widen_schema(schema):
+        fields = [
+            field.with_type(pa.float64()) if pa.types.is_integer(field.type) else field
+            for field in schema
+        ]
+        return pa.schema(fields, metadata=schema.metadata)
+
+    def _abort_parquet(self):
+        self._parquet_ok = False
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+        if os.path.exists(self._parquet_tmp):
+            os.remove(self._parquet_tmp)
@@ -3,81 +3,94 @@ Data Extraction Module for P&G Supply Chain Analytics
 Extracts and cleans data from the two Excel files
 """
 
+import os
 import pandas as pd
 import numpy as np
 import json
+import uuid
 from datetime import datetime
 import warnings
+from concurrent.futures import ProcessPoolExecutor
+from utils.columnar_store import save_table, load_table, ChunkedTableWriter
+from utils.workbook_reader import read_sheet_sections, iter_sheet_chunks, sheet_names
+from utils.extraction_manifest import (
+    load_manifest, save_manifest, file_stat, file_hash, sheet_hashes, block_signatures
+)
 warnings.filterwarnings('ignore')
 
+# Worker processes used by the extraction entry points: one per CPU (a pool
+# never gets more workers than there are sheets to parse)
+DEFAULT_WORKERS = os.cpu_count() or 1
+
 class DataExtractor:
-    def __init__(self, file1_path, file2_path):
+    # Verified headers of the main data block (Sheet1, columns A-O)
+    MAIN_COLUMNS = [
+        'Date1', 'Date2', 'SLS_Plant', 'DLV_Shipping_Status',
+        'Category', 'Master_Brand', 'Brand', 'L_I', 'Planning_Level',
+        'Quantity', 'Source', 'Actual_Ship_Date', 'Month',
+        'Requested_Ship_Date', 'Delivery_Status'
+    ]
+    
+    # Blocks of File 1 / Sheet1, read together in one pass over the sheet.
+    # first_row is the 1-based header row of each block.
+    FILE1_SECTIONS = {
+        # Main data (A-O, headers on row 13, data from row 14)
+        'main_data': {'cols': 'A:O', 'first_row': 13},
+        # Pivot data (P-U, starting row 14)
+        'pivot_data': {'cols': 'P:U', 'first_row': 13},
+        # Calculations (Y-AF, starting row 14)
+        'calc_data': {'cols': 'Y:AF', 'first_row': 13},
+        # Reference data (AG-AM, starting row 1)
+        'ref_data': {'cols': 'AG:AM', 'first_row': 1, 'nrows': 100},
+        # Filter settings (rows 4-11)
+        'filter_settings': {
+            'cols': 'A:B', 'first_row': 4, 'nrows': 8,
+            'names': ['Filter_Name', 'Filter_Value']
+        }
+    }
+    
+    # Columns kept from the File 2 'Data' sheet
+    SALES_DATA_COLUMNS = 25
+    
+    def __init__(self, file1_path, file2_path, chunk_size=None, workers=None):
         self.file1_path = file1_path
         self.file2_path = file2_path
+        # When set, File 2 sheets are streamed to the output store in
+        # batches of this many rows instead of being loaded whole
+        self.chunk_size = chunk_size
+        # When above 1, File 1 and the File 2 sheets are parsed and cleaned
+        # in a pool of this many worker processes
+        self.workers = workers
+        # Raw row count, last raw row and next Transaction_ID of the main
+        # block, recorded so incremental refreshes can append new rows, and
+        # its generation, which only changes when the table is rewritten
+        self.main_block_state = None
         
     def extract_file1_data(self):
-        """Extract all data sections from File 1 (JPG Shipping)"""
+        """Extract all data sections from File 1 (JPG Shipping)
+        
+        Sheet1 is streamed once and split into its five blocks, instead of
+        parsing the whole workbook again for every block.
+        """
         print("Extracting data from File 1...")
         
-        # Extract main data (A-O, starting row 14)
-        main_data = pd.read_excel(
-            self.file1_path, 
-            sheet_name='Sheet1',
-            skiprows=12,
-            usecols='A:O'
-        )
+        sections = read_sheet_sections(self.file1_path, 'Sheet1', self.FILE1_SECTIONS)
+        main_data = sections['main_data']
         
         # Rename columns based on verified headers
-        main_data.columns = [
-            'Date1', 'Date2', 'SLS_Plant', 'DLV_Shipping_Status',
-            'Category', 'Master_Brand', 'Brand', 'L_I', 'Planning_Level',
-            'Quantity', 'Source', 'Actual_Ship_Date', 'Month',
-            'Requested_Ship_Date', 'Delivery_Status'
-        ]
-        
-        # Extract pivot data (P-U, starting row 14)
-        pivot_data = pd.read_excel(
-            self.file1_path,
-            sheet_name='Sheet1',
-            skiprows=12,
-            usecols='P:U'
-        )
-        
-        # Extract calculations (Y-AF, starting row 14)
-        calc_data = pd.read_excel(
-            self.file1_path,
-            sheet_name='Sheet1',
-            skiprows=12,
-            usecols='Y:AF'
-        )
-        
-        # Extract reference data (AG-AM, starting row 1)
-        ref_data = pd.read_excel(
-            self.file1_path,
-            sheet_name='Sheet1',
-            usecols='AG:AM',
-            nrows=100
-        )
-        
-        # Extract filter settings (rows 4-11)
-        filter_settings = pd.read_excel(
-            self.file1_path,
-            sheet_name='Sheet1',
-            skiprows=3,
-            nrows=8,
-            usecols='A:B',
-            names=['Filter_Name', 'Filter_Value']
-        )
+        main_data.columns = self.MAIN_COLUMNS
         
         # Clean and process main data
+        self.main_block_state = self._main_block_state(main_data)
         main_data = self._clean_main_data(main_data)
+        self.main_block_state['shipping_records'] = len(main_data)
         
         return {
             'main_data': main_data,
-            'pivot_data': pivot_data,
-            'calc_data': calc_data,
-            'ref_data': ref_data,
-            'filter_settings': filter_settings
+            'pivot_data': sections['pivot_data'],
+            'calc_data': sections['calc_data'],
+            'ref_data': sections['ref_data'],
+            'filter_settings': sections['filter_settings']
         }
     
     def extract_file2_data(self):
@@ -89,30 +102,33 @@ class DataExtractor:
         sheet_data = {}
         
         for sheet in xl_file.sheet_names:
-            if sheet == 'Data':
-                # Special handling for Data sheet - only first 25 columns
-                df = pd.read_excel(
-                    self.file2_path,
-                    sheet_name=sheet,
-                    usecols=range(25)
-                )
-            else:
-                df = pd.read_excel(self.file2_path, sheet_name=sheet)
-            
+            df = self._read_file2_sheet(sheet)
             sheet_data[sheet] = df
             print(f"  Loaded sheet: {sheet} - {df.shape}")
         
-        # Clean the main data sheet
-        if 'Data' in sheet_data:
-            sheet_data['Data'] = self._clean_sales_data(sheet_data['Data'])
-        
         return sheet_data
     
-    def _clean_main_data(self, df):
+    def _data_row_mask(self, df):
+        """Rows of the main block that hold shipments (not blanks or repeated headers)"""
+        return df['Delivery_Status'].notna() & ~df['Delivery_Status'].isin(['Status', 'Delivery Status'])
+    
+    def _main_block_state(self, raw_df, signature=None):
+        """Describe the raw main block so later refreshes can append to it
+        
+        The block signature covers every raw row, so a refresh can tell
+        whether all the rows read before are unchanged.
+        """
+        return {
+            'generation': uuid.uuid4().hex,
+            'raw_rows': len(raw_df),
+            'block_signature': signature or block_signatures(raw_df, [len(raw_df)])[len(raw_df)],
+            'next_transaction_id': 1 + int(self._data_row_mask(raw_df).sum())
+        }
+    
+    def _clean_main_data(self, df, id_start=1):
         """Clean the main shipping data"""
         # Remove header rows if any
-        df = df[df['Delivery_Status'].notna()]
-        df = df[~df['Delivery_Status'].isin(['Status', 'Delivery Status'])]
+        df = df[self._data_row_mask(df)]
         
         # Convert dates to datetime
         date_columns = ['Actual_Ship_Date', 'Requested_Ship_Date']
@@ -148,7 +164,7 @@ class DataExtractor:
         df['Quantity'] = pd.to_numeric(df['Quantity'], errors='coerce')
         
         # Create unique ID
-        df['Transaction_ID'] = range(1, len(df) + 1)
+        df['Transaction_ID'] = range(id_start, id_start + len(df))
         
         # Filter valid delivery statuses
         valid_statuses = ['Advanced', 'Late', 'On Time', 'Not Due']
@@ -201,23 +217,39 @@ class DataExtractor:
         return df
     
     def save_extracted_data(self, output_dir='data/extracted'):
-        """Save all extracted data to CSV files"""
-        import os
+        """Save all extracted data to CSV files
+        
+        With ``chunk_size`` set, File 2 is streamed to disk and the second
+        return value maps each sheet to its row count instead of a DataFrame.
+        """
         os.makedirs(output_dir, exist_ok=True)
         
-        # Extract File 1
-        file1_data = self.extract_file1_data()
-        file1_data['main_data'].to_csv(f'{output_dir}/shipping_main_data.csv', index=False)
-        file1_data['pivot_data'].to_csv(f'{output_dir}/shipping_pivot_data.csv', index=False)
-        file1_data['calc_data'].to_csv(f'{output_dir}/shipping_calc_data.csv', index=False)
-        file1_data['ref_data'].to_csv(f'{output_dir}/shipping_ref_data.csv', index=False)
-        file1_data['filter_settings'].to_csv(f'{output_dir}/shipping_filters.csv', index=False)
+        if self._parallel():
+            # File 1 and every File 2 sheet are parsed in separate processes
+            file1_data, file2_data = self._extract_parallel(output_dir)
+        else:
+            file1_data = self.extract_file1_data()
+            file2_data = None
+        
+        # Save File 1
+        self._save_table(file1_data['main_data'], output_dir, 'shipping_main_data')
+        self._save_table(file1_data['pivot_data'], output_dir, 'shipping_pivot_data')
+        self._save_table(file1_data['calc_data'], output_dir, 'shipping_calc_data')
+        self._save_table(file1_data['ref_data'], output_dir, 'shipping_ref_data')
+        self._save_table(file1_data['filter_settings'], output_dir, 'shipping_filters')
         
         # Extract File 2
-        file2_data = self.extract_file2_data()
-        for sheet_name, df in file2_data.items():
-            safe_name = sheet_name.replace(' ', '_').replace('-', '_')
-            df.to_csv(f'{output_dir}/sales_{safe_name}.csv', index=False)
+        if self.chunk_size:
+            # Streamed straight to disk; file2_data maps sheet -> row count
+            if file2_data is None:
+                file2_data = self.stream_file2_data(output_dir)
+            total_sales_records = file2_data.get('Data', 0)
+        else:
+            if file2_data is None:
+                file2_data = self.extract_file2_data()
+            for sheet_name, df in file2_data.items():
+                self._save_table(df, output_dir, self._sales_table_name(sheet_name))
+            total_sales_records = len(file2_data.get('Data', pd.DataFrame()))
         
         print(f"All data extracted and saved to {output_dir}")
         
@@ -227,13 +259,286 @@ class DataExtractor:
             'file1_sheets': list(file1_data.keys()),
             'file2_sheets': list(file2_data.keys()),  # Fixed: was .items() which included DataFrames
             'total_shipping_records': len(file1_data['main_data']),
-            'total_sales_records': len(file2_data.get('Data', pd.DataFrame()))
+            'total_sales_records': total_sales_records
         }
         
         with open(f'{output_dir}/extraction_metadata.json', 'w') as f:
             json.dump(metadata, f, indent=2)
         
+        # Record source fingerprints so the next refresh can be incremental
+        save_manifest(output_dir, {
+            'files': {
+                'file1': self._source_entry(self.file1_path),
+                'file2': self._source_entry(self.file2_path)
+            },
+            'main_block': self.main_block_state
+        })
+        
+        return file1_data, file2_data
+    
+    def update_extracted_data(self, output_dir='data/extracted'):
+        """Incrementally refresh the extracted data
+        
+        Workbooks whose size and modification time are unchanged are not
+        opened at all; touched but identical workbooks are recognised by
+        content hash. Within a changed workbook only sheets whose content
+        fingerprint changed are re-read, and new rows at the end of the
+        Sheet1 main block are appended to the store instead of rewriting it.
+        Falls back to a full extraction when there is no previous manifest.
+        
+        Returns a dict describing what was refreshed.
+        """
+        manifest = load_manifest(output_dir)
+        if (not manifest.get('files') or not manifest.get('main_block')
+                or not os.path.exists(f'{output_dir}/shipping_main_data.csv')):
+            print("No previous extraction found, running full extraction...")
+            self.save_extracted_data(output_dir)
+            return {'mode': 'full', 'sheets': 'all'}
+        
+        summary = {'mode': 'incremental', 'sheets': [], 'appended_rows': 0}
+        
+        # File 1: everything lives in Sheet1
+        changed, entry = self._check_source(self.file1_path, manifest['files'].get('file1'))
+        previous_sheets = (manifest['files'].get('file1') or {}).get('sheets', {})
+        if changed and entry['sheets'].get('Sheet1') != previous_sheets.get('Sheet1'):
+            appended = self._refresh_file1(output_dir, manifest)
+            summary['sheets'].append('Sheet1')
+            summary['appended_rows'] = appended
+        manifest['files']['file1'] = entry
+        
+        # File 2: one output table per sheet
+        changed, entry = self._check_source(self.file2_path, manifest['files'].get('file2'))
+        if changed:
+            previous_sheets = (manifest['files'].get('file2') or {}).get('sheets', {})
+            changed_sheets = [
+                sheet for sheet, sheet_hash in entry['sheets'].items()
+                if sheet_hash != previous_sheets.get(sheet)
+            ]
+            results = self._extract_file2_sheets(changed_sheets, output_dir)
+            for sheet in changed_sheets:
+                if self.chunk_size:
+                    rows = results[sheet]
+                else:
+                    self._save_table(results[sheet], output_dir, self._sales_table_name(sheet))
+                    rows = len(results[sheet])
+                summary['sheets'].append(sheet)
+                print(f"  Refreshed sheet: {sheet} - {rows} rows")
+        manifest['files']['file2'] = entry
+        
+        save_manifest(output_dir, manifest)
+        
+        if summary['sheets']:
+            self._update_metadata(output_dir, manifest)
+            print(f"Incremental refresh updated: {', '.join(summary['sheets'])}")
+        else:
+            print("Source workbooks unchanged, nothing to extract")
+        
+        return summary
+    
+    def _source_entry(self, path, sheets=None):
+        """Fingerprint entry for a source workbook"""
+        entry = {'path': os.path.abspath(path), **file_stat(path), 'sha256': file_hash(path)}
+        entry['sheets'] = sheets if sheets is not None else sheet_hashes(path)
+        return entry
+    
+    def _check_source(self, path, previous):
+        """Compare a workbook against its manifest entry
+        
+        Returns (changed, entry). The content hash is only computed when the
+        size or modification time differ from the recorded ones.
+        """
+        if previous and previous.get('path') == os.path.abspath(path):
+            stat = file_stat(path)
+            if stat['mtime'] == previous['mtime'] and stat['size'] == previous['size']:
+                return False, previous
+            content_hash = file_hash(path)
+            if content_hash == previous['sha256']:
+                return False, {**previous, **stat}
+            entry = {**previous, **stat, 'sha256': content_hash, 'sheets': sheet_hashes(path)}
+            return True, entry
+        return True, self._source_entry(path)
+    
+    def _refresh_file1(self, output_dir, manifest):
+        """Refresh Sheet1 outputs, appending main block rows where possible
+        
+        Returns the number of shipment rows appended, or -1 when the main
+        block had to be rewritten because rows read before changed (their
+        signature differs from the manifest's). Appending keeps the main
+        block's generation; a rewrite starts a new one.
+        """
+        state = manifest['main_block']
+        start_row = state['raw_rows']
+        
+        # Read all blocks in a single pass; the main block whole, so every
+        # row read before can be checked
+        sections = read_sheet_sections(self.file1_path, 'Sheet1', self.FILE1_SECTIONS)
+        main_data = sections['main_data']
+        main_data.columns = self.MAIN_COLUMNS
+        signatures = block_signatures(main_data, [start_row, len(main_data)])
+        
+        if state.get('block_signature') is not None and signatures[start_row] == state['block_signature']:
+            new_rows = main_data.iloc[start_row:]
+            id_start = state['next_transaction_id']
+            appended = 0
+            if len(new_rows) > 0:
+                new_data = self._clean_main_data(new_rows.copy(), id_start=id_start)
+                appended = len(new_data)
+                self._append_table(new_data, output_dir, 'shipping_main_data')
+                state.update(
+                    raw_rows=len(main_data),
+                    block_signature=signatures[len(main_data)],
+                    next_transaction_id=id_start + int(self._data_row_mask(new_rows).sum()),
+                    shipping_records=state['shipping_records'] + appended
+                )
+            print(f"  Appended {appended} new shipping rows")
+        else:
+            print("  Earlier shipping rows changed, rewriting main data")
+            state = self._main_block_state(main_data, signatures[len(main_data)])
+            main_data = self._clean_main_data(main_data)
+            state['shipping_records'] = len(main_data)
+            self._save_table(main_data, output_dir, 'shipping_main_data')
+            appended = -1
+        
+        self._save_table(sections['pivot_data'], output_dir, 'shipping_pivot_data')
+        self._save_table(sections['calc_data'], output_dir, 'shipping_calc_data')
+        self._save_table(sections['ref_data'], output_dir, 'shipping_ref_data')
+        self._save_table(sections['filter_settings'], output_dir, 'shipping_filters')
+        
+        manifest['main_block'] = state
+        return appended
+    
+    def stream_file2_data(self, output_dir='data/extracted'):
+        """Stream every sheet of File 2 to the output store in fixed-size batches
+        
+        Rows are read with openpyxl in read-only mode and written out
+        ``chunk_size`` rows at a time, so peak memory stays flat however
+        large the DSR workbook is. Returns a dict of sheet name -> rows written.
+        """
+        print("Streaming data from File 2...")
+        os.makedirs(output_dir, exist_ok=True)
+        
+        row_counts = {}
+        for sheet in sheet_names(self.file2_path):
+            row_counts[sheet] = self._stream_file2_sheet(sheet, output_dir)
+            print(f"  Streamed sheet: {sheet} - {row_counts[sheet]} rows")
+        return row_counts
+    
+    def _stream_file2_sheet(self, sheet, output_dir):
+        """Stream one sheet of File 2 to disk, cleaning the Data sheet batch by batch"""
+        writer = ChunkedTableWriter(output_dir, self._sales_table_name(sheet))
+        max_cols = self.SALES_DATA_COLUMNS if sheet == 'Data' else None
+        for chunk in iter_sheet_chunks(self.file2_path, sheet, self.chunk_size, max_cols=max_cols):
+            if sheet == 'Data':
+                chunk = self._clean_sales_data(chunk)
+            writer.write(chunk)
+        return writer.close()
+    
+    def _parallel(self):
+        return bool(self.workers) and self.workers > 1
+    
+    def _extract_parallel(self, output_dir):
+        """Extract File 1 and all File 2 sheets across a process pool
+        
+        Results are collected in workbook sheet order, not completion order,
+        so the extracted store is identical to a sequential run.
+        """
+        sheets = sheet_names(self.file2_path)
+        print(f"Extracting File 1 and {len(sheets)} File 2 sheets with {self.workers} workers...")
+        
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(sheets) + 1)) as pool:
+            file1_future = pool.submit(_extract_file1_job, self.file1_path)
+            file2_data = self._extract_file2_sheets(sheets, output_dir, pool)
+            file1_data, self.main_block_state = file1_future.result()
+        
         return file1_data, file2_data
+    
+    def _extract_file2_sheets(self, sheets, output_dir, pool=None):
+        """Read (or, with ``chunk_size``, stream to disk) the given File 2 sheets
+        
+        Uses ``pool`` if given, or a new pool when ``workers`` is above 1.
+        Returns {sheet: DataFrame} or, when streaming, {sheet: rows written},
+        ordered like ``sheets``.
+        """
+        if pool is None and self._parallel() and len(sheets) > 1:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(sheets))) as pool:
+                return self._extract_file2_sheets(sheets, output_dir, pool)
+        
+        if pool is None:
+            if self.chunk_size:
+                return {sheet: self._stream_file2_sheet(sheet, output_dir) for sheet in sheets}
+            return {sheet: self._read_file2_sheet(sheet) for sheet in sheets}
+        
+        if self.chunk_size:
+            futures = {
+                sheet: pool.submit(_stream_file2_sheet_job, self.file2_path, sheet, output_dir, self.chunk_size)
+                for sheet in sheets
+            }
+        else:
+            futures = {sheet: pool.submit(_read_file2_sheet_job, self.file2_path, sheet) for sheet in sheets}
+        
+        results = {}
+        for sheet in sheets:
+            results[sheet] = futures[sheet].result()
+            print(f"  Loaded sheet: {sheet}")
+        return results
+    
+    def _sales_table_name(self, sheet):
+        """Output table name for a File 2 sheet"""
+        safe_name = sheet.replace(' ', '_').replace('-', '_')
+        return f'sales_{safe_name}'
+    
+    def _read_file2_sheet(self, sheet):
+        """Read a single sheet of File 2, cleaning the main Data sheet"""
+        if sheet == 'Data':
+            # Special handling for Data sheet - only first 25 columns
+            df = pd.read_excel(self.file2_path, sheet_name=sheet, usecols=range(self.SALES_DATA_COLUMNS))
+            return self._clean_sales_data(df)
+        return pd.read_excel(self.file2_path, sheet_name=sheet)
+    
+    def _append_table(self, df, output_dir, name):
+        """Append rows to an extracted table (CSV and its Parquet copy)"""
+        csv_path = f'{output_dir}/{name}.csv'
+        columns = pd.read_csv(csv_path, nrows=0).columns
+        existing = load_table(output_dir, name)
+        df = df.reindex(columns=columns)
+        df.to_csv(csv_path, mode='a', header=False, index=False)
+        if existing is not None:
+            save_table(pd.concat([existing, df], ignore_index=True), output_dir, name)
+    
+    def _update_metadata(self, output_dir, manifest):
+        """Refresh extraction_metadata.json after an incremental update"""
+        metadata_path = f'{output_dir}/extraction_metadata.json'
+        metadata = {}
+        if os.path.exists(metadata_path):
+            with open(metadata_path) as f:
+                metadata = json.load(f)
+        
+        metadata.update({
+            'extraction_date': datetime.now().isoformat(),
+            'file2_sheets': list(manifest['files']['file2']['sheets'].keys()),
+            'total_shipping_records': manifest['main_block']['shipping_records'],
+            'incremental': True
+        })
+        with open(metadata_path, 'w') as f:
+            json.dump(metadata, f, indent=2)
+
+    def _save_table(self, df, output_dir, name):
+        """Save a table as CSV plus a typed Parquet copy for fast loading"""
+        df.to_csv(f'{output_dir}/{name}.csv', index=False)
+        save_table(df, output_dir, name)
+
+# Worker-side halves of _extract_parallel(): each builds its own extractor
+# for one workbook and returns the parsed blocks, or the sheet's row count
+# when it streamed the sheet to disk itself
+def _extract_file1_job(file1_path):
+    extractor = DataExtractor(file1_path, None)
+    return extractor.extract_file1_data(), extractor.main_block_state
+
+def _read_file2_sheet_job(file2_path, sheet):
+    return DataExtractor(None, file2_path)._read_file2_sheet(sheet)
+
+def _stream_file2_sheet_job(file2_path, sheet, output_dir, chunk_size):
+    return DataExtractor(None, file2_path, chunk_size=chunk_size)._stream_file2_sheet(sheet, output_dir)
 
 # Usage example
 if __name__ == "__main__":
@@ -8,6 +8,11 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import logging
+from utils.columnar_store import load_table
+from utils.schema import build_category_dtypes, apply_categoricals
+from utils.aggregate_cube import AggregateCube
+from utils.filter_index import filter_frame, DATE_COLUMN
+from utils.status_rates import status_count, status_rate
 
 logger = logging.getLogger(__name__)
 
@@ -21,28 +26,38 @@ class DataProcessor:
         self.shipping_filters = None
         self.sales_top10 = None
         self.sales_pivot = None
+        self.category_dtypes = {}
+        self.data_version = None
+        # Aggregates of shipping_data; None means queries scan the raw rows
+        self.cube = None
         
     def load_processed_data(self, data_dir='data/extracted'):
         """Load all extracted data files with error handling"""
         try:
             # Load shipping data
-            self.shipping_data = self._safe_read_csv(f'{data_dir}/shipping_main_data.csv')
-            self.shipping_pivot = self._safe_read_csv(f'{data_dir}/shipping_pivot_data.csv')
-            self.shipping_calc = self._safe_read_csv(f'{data_dir}/shipping_calc_data.csv')
-            self.shipping_ref = self._safe_read_csv(f'{data_dir}/shipping_ref_data.csv')
-            self.shipping_filters = self._safe_read_csv(f'{data_dir}/shipping_filters.csv')
+            self.shipping_data = self._safe_read_table(data_dir, 'shipping_main_data')
+            self.shipping_pivot = self._safe_read_table(data_dir, 'shipping_pivot_data')
+            self.shipping_calc = self._safe_read_table(data_dir, 'shipping_calc_data')
+            self.shipping_ref = self._safe_read_table(data_dir, 'shipping_ref_data')
+            self.shipping_filters = self._safe_read_table(data_dir, 'shipping_filters')
             
             # Load sales data
-            self.sales_data = self._safe_read_csv(f'{data_dir}/sales_Data.csv')
-            self.sales_top10 = self._safe_read_csv(f'{data_dir}/sales_TOP_10.csv')
-            self.sales_pivot = self._safe_read_csv(f'{data_dir}/sales_Pivot.csv')
+            self.sales_data = self._safe_read_table(data_dir, 'sales_Data')
+            self.sales_top10 = self._safe_read_table(data_dir, 'sales_TOP_10')
+            self.sales_pivot = self._safe_read_table(data_dir, 'sales_Pivot')
             
             # Convert date columns
             self._process_dates()
             
+            # Encode low-cardinality text columns as shared categoricals
+            self._apply_schema()
+            
             # Validate data
             self._validate_data()
             
+            # Pre-aggregate the shipping rows for the KPI and breakdown queries
+            self.cube = self._build_cube()
+            
             logger.info(f"Loaded {len(self.shipping_data)} shipping records and {len(self.sales_data)} sales records")
             
             return self
@@ -50,6 +65,13 @@ class DataProcessor:
             logger.error(f"Error loading data: {str(e)}")
             raise
     
+    def _safe_read_table(self, data_dir, name):
+        """Read a table from its Parquet copy when available, else from CSV"""
+        df = load_table(data_dir, name)
+        if df is not None:
+            return df
+        return self._safe_read_csv(f'{data_dir}/{name}.csv')
+    
     def _safe_read_csv(self, filepath):
         """Safely read CSV with error handling"""
         try:
@@ -71,6 +93,9 @@ class DataProcessor:
         date_cols = ['Actual_Ship_Date', 'Requested_Ship_Date', 'Date1', 'Date2']
         for col in date_cols:
             if col in self.shipping_data.columns:
+                # Columns loaded from the Parquet store are already typed
+                if pd.api.types.is_datetime64_any_dtype(self.shipping_data[col]):
+                    continue
                 try:
                     self.shipping_data[col] = pd.to_datetime(self.shipping_data[col], errors='coerce')
                 except Exception as e:
@@ -86,6 +111,54 @@ class DataProcessor:
                 logger.warning(f"Could not calculate delay days: {str(e)}")
                 self.shipping_data['Delay_Days'] = 0
     
+    def _apply_schema(self):
+        """Store the low-cardinality columns as categoricals with shared categories"""
+        self.category_dtypes = build_category_dtypes(self.shipping_data, self.sales_data)
+        apply_categoricals(self.shipping_data, self.category_dtypes)
+        apply_categoricals(self.sales_data, self.category_dtypes)
+    
+    def _build_cube(self):
+        """Build the aggregate cube, or None when there is nothing to aggregate"""
+        if self.shipping_data is None or self.shipping_data.empty:
+            return None
+        try:
+            return AggregateCube.build(self.shipping_data)
+        except Exception as e:
+            logger.warning(f"Could not build aggregate cube: {str(e)}")
+            return None
+    
+    def subset(self, filters=None, date_range=None):
+        """Processor over the shipping rows matching the dashboard filters
+        
+        The rows and the cube are both restricted here, from the same
+        ``filters`` and ``date_range``, so the KPIs always describe the
+        processor's shipping_data. When a filter falls on a column the cube
+        does not hold, the subset has no cube and queries scan its rows.
+        """
+        filters = filters or {}
+        processor = DataProcessor()
+        processor.shipping_data = filter_frame(self.shipping_data, filters, date_range)
+        processor.sales_data = self.sales_data
+        processor.category_dtypes = self.category_dtypes
+        processor.data_version = self.data_version
+        
+        filtered = [col for col, values in filters.items() if values and col in self.shipping_data.columns]
+        if date_range and DATE_COLUMN in self.shipping_data.columns:
+            filtered.append('Date')
+        if self.cube is not None and self.cube.has(*filtered):
+            processor.cube = self.cube.filter(filters, date_range)
+        return processor
+    
+    def _use_cube(self, *columns):
+        """True when the cube can answer a query over these columns"""
+        return self.cube is not None and self.cube.has(*columns)
+    
+    def _status_counts_by(self, column):
+        """Shipments per value of ``column`` (rows) and delivery status (columns)"""
+        if self._use_cube(column, 'Delivery_Status'):
+            return self.cube.rollup([column, 'Delivery_Status']).unstack(fill_value=0)
+        return self.shipping_data.groupby([column, 'Delivery_Status'], observed=True).size().unstack(fill_value=0)
+    
     def _validate_data(self):
         """Validate loaded data"""
         # Check for required columns
@@ -126,7 +199,10 @@ class DataProcessor:
         try:
             # Delivery performance KPIs
             if 'Delivery_Status' in self.shipping_data.columns:
-                status_counts = self.shipping_data['Delivery_Status'].value_counts()
+                if self._use_cube('Delivery_Status'):
+                    status_counts = self.cube.rollup(['Delivery_Status'])
+                else:
+                    status_counts = self.shipping_data['Delivery_Status'].value_counts()
                 total_shipments = status_counts.sum()
                 
                 if total_shipments > 0:
@@ -138,10 +214,17 @@ class DataProcessor:
             
             # Average delay for late shipments
             if 'Delivery_Status' in self.shipping_data.columns and 'Delay_Days' in self.shipping_data.columns:
-                late_shipments = self.shipping_data[self.shipping_data['Delivery_Status'] == 'Late']
-                if len(late_shipments) > 0:
-                    avg_delay = late_shipments['Delay_Days'].mean()
-                    kpis['avg_delay_days'] = round(avg_delay, 1) if not pd.isna(avg_delay) else 0
+                if self._use_cube('Delivery_Status', 'Delay_Sum'):
+                    if self.cube.total(Delivery_Status='Late') > 0:
+                        delay_count = self.cube.total('Delay_Count', Delivery_Status='Late')
+                        delay_sum = self.cube.total('Delay_Sum', Delivery_Status='Late')
+                        avg_delay = delay_sum / delay_count if delay_count > 0 else np.nan
+                        kpis['avg_delay_days'] = round(avg_delay, 1) if not pd.isna(avg_delay) else 0
+                else:
+                    late_shipments = self.shipping_data[self.shipping_data['Delivery_Status'] == 'Late']
+                    if len(late_shipments) > 0:
+                        avg_delay = late_shipments['Delay_Days'].mean()
+                        kpis['avg_delay_days'] = round(avg_delay, 1) if not pd.isna(avg_delay) else 0
             
             # Sales KPIs
             if self.sales_data is not None and not self.sales_data.empty:
@@ -157,10 +240,15 @@ class DataProcessor:
             
             # Category performance
             if 'Category' in self.shipping_data.columns and 'Delivery_Status' in self.shipping_data.columns:
-                category_groups = self.shipping_data.groupby('Category')['Delivery_Status']
-                category_late = category_groups.apply(
-                    lambda x: (x == 'Late').sum() / len(x) * 100 if len(x) > 0 else 0
-                ).round(1)
+                if self._use_cube('Category', 'Delivery_Status'):
+                    category_totals = self.cube.rollup(['Category'])
+                    category_late = (
+                        self.cube.rollup(['Category'], Delivery_Status='Late')
+                        .reindex(category_totals.index, fill_value=0)
+                        .div(category_totals) * 100
+                    ).round(1)
+                else:
+                    category_late = status_rate(self.shipping_data, 'Category').round(1)
                 
                 if len(category_late) > 0:
                     kpis['worst_category'] = category_late.idxmax()
@@ -190,7 +278,7 @@ class DataProcessor:
             daily_late = valid_data.groupby([
                 pd.Grouper(key='Actual_Ship_Date', freq='D'),
                 'Delivery_Status'
-            ]).size().unstack(fill_value=0)
+            ], observed=True).size().unstack(fill_value=0)
             
             # Calculate daily late rate safely
             if 'Late' in daily_late.columns:
@@ -214,7 +302,7 @@ class DataProcessor:
             if 'Category' not in self.shipping_data.columns or 'Delivery_Status' not in self.shipping_data.columns:
                 return pd.DataFrame()
             
-            category_analysis = self.shipping_data.groupby(['Category', 'Delivery_Status']).size().unstack(fill_value=0)
+            category_analysis = self._status_counts_by('Category')
             category_analysis['Total'] = category_analysis.sum(axis=1)
             
             # Safe division - handle case where 'Late' column doesn't exist
@@ -240,7 +328,7 @@ class DataProcessor:
             if 'Source' not in self.shipping_data.columns or 'Delivery_Status' not in self.shipping_data.columns:
                 return pd.DataFrame()
             
-            plant_perf = self.shipping_data.groupby(['Source', 'Delivery_Status']).size().unstack(fill_value=0)
+            plant_perf = self._status_counts_by('Source')
             plant_perf['Total'] = plant_perf.sum(axis=1)
             
             # Safe division - handle case where 'Late' column doesn't exist
@@ -266,7 +354,7 @@ class DataProcessor:
             if 'Master_Brand' not in self.shipping_data.columns or 'Delivery_Status' not in self.shipping_data.columns:
                 return pd.DataFrame()
             
-            brand_analysis = self.shipping_data.groupby(['Master_Brand', 'Delivery_Status']).size().unstack(fill_value=0)
+            brand_analysis = self._status_counts_by('Master_Brand')
             brand_analysis['Total'] = brand_analysis.sum(axis=1)
             
             # Safe division - handle case where 'Late' column doesn't exist
@@ -341,7 +429,8 @@ class DataProcessor:
                 columns=column_col,
                 values=value_col,
                 aggfunc=aggfunc,
-                fill_value=0
+                fill_value=0,
+                observed=True
             )
             
         except Exception as e:
@@ -357,23 +446,36 @@ class DataProcessor:
             if 'Planning_Level' not in self.shipping_data.columns:
                 return pd.DataFrame()
             
-            # Aggregate by product
-            product_groups = self.shipping_data.groupby('Planning_Level')
-            
             # Calculate metrics
             product_metrics = pd.DataFrame()
             
-            if 'Delivery_Status' in self.shipping_data.columns:
-                product_metrics['Late_Count'] = product_groups['Delivery_Status'].apply(
-                    lambda x: (x == 'Late').sum()
-                )
-                product_metrics['Total_Count'] = product_groups.size()
+            if self._use_cube('Planning_Level', 'Delivery_Status') and (
+                'Quantity' not in self.shipping_data.columns or self.cube.has('Quantity_Sum')
+            ):
+                # Answer from the cube
+                total_count = self.cube.rollup(['Planning_Level'])
+                product_metrics['Late_Count'] = self.cube.rollup(
+                    ['Planning_Level'], Delivery_Status='Late'
+                ).reindex(total_count.index, fill_value=0)
+                product_metrics['Total_Count'] = total_count
                 product_metrics['Late_Rate'] = (
                     product_metrics['Late_Count'].div(product_metrics['Total_Count'].replace(0, 1)) * 100
                 ).round(1)
-            
-            if 'Quantity' in self.shipping_data.columns:
-                product_metrics['Total_Quantity'] = product_groups['Quantity'].sum()
+                if 'Quantity' in self.shipping_data.columns:
+                    product_metrics['Total_Quantity'] = self.cube.rollup(['Planning_Level'], 'Quantity_Sum')
+            else:
+                # Aggregate by product
+                product_groups = self.shipping_data.groupby('Planning_Level', observed=True)
+                
+                if 'Delivery_Status' in self.shipping_data.columns:
+                    product_metrics['Late_Count'] = status_count(self.shipping_data, 'Planning_Level')
+                    product_metrics['Total_Count'] = product_groups.size()
+                    product_metrics['Late_Rate'] = (
+                        product_metrics['Late_Count'].div(product_metrics['Total_Count'].replace(0, 1)) * 100
+                    ).round(1)
+                
+                if 'Quantity' in self.shipping_data.columns:
+                    product_metrics['Total_Quantity'] = product_groups['Quantity'].sum()
             
             # Return top N based on metric
             if metric == 'Late' and 'Late_Count' in product_metrics.columns:
@@ -420,7 +522,7 @@ class DataProcessor:
             valid_data['Accuracy'] = valid_data['Accuracy'].clip(0, 100)
             
             # Group by category
-            return valid_data.groupby('Category')['Accuracy'].mean().round(1)
+            return valid_data.groupby('Category', observed=True)['Accuracy'].mean().round(1)
             
         except Exception as e:
             logger.error(f"Error in calculate_forecast_accuracy: {str(e)}")
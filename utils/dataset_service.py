@@ -0,0 +1,168 @@
+"""
+Dataset Service Module for P&G Supply Chain Analytics
+One shared, read-only copy of the processed data per server process
+"""
+
+import os
+import hashlib
+import logging
+import threading
+from utils.data_processor import DataProcessor
+from utils.extraction_manifest import load_manifest
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATA_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'extracted'
+)
+
+# Extracted tables DataProcessor loads; their files define the data version
+TABLE_NAMES = [
+    'shipping_main_data', 'shipping_pivot_data', 'shipping_calc_data',
+    'shipping_ref_data', 'shipping_filters',
+    'sales_Data', 'sales_TOP_10', 'sales_Pivot'
+]
+
+_lock = threading.Lock()
+# Absolute data directory -> (version, DataProcessor, main table generation,
+# appended_since() of the version)
+_datasets = {}
+
+
+def dataset_version(data_dir=DEFAULT_DATA_DIR):
+    """Version of the extracted data: a hash of each table file's size and mtime
+
+    Any re-extraction (full, incremental or by the lightweight extractor)
+    rewrites at least one table file, which changes the version.
+    """
+    parts = []
+    for name in TABLE_NAMES:
+        for ext in ('csv', 'parquet'):
+            path = os.path.join(data_dir, f'{name}.{ext}')
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            parts.append(f'{name}.{ext}:{stat.st_size}:{stat.st_mtime_ns}')
+    return hashlib.sha256('|'.join(parts).encode()).hexdigest()[:16]
+
+
+def get_processor(data_dir=DEFAULT_DATA_DIR):
+    """Shared DataProcessor for the current version of the extracted data
+
+    Every page and session gets the same instance, so the data is held once
+    per server process. Only a stat() per table is done on each call; the
+    data is reloaded when the version changes. The frames are shared:
+    callers must treat them as read-only and copy before adding or
+    changing columns.
+    """
+    data_dir = os.path.abspath(data_dir)
+    version = dataset_version(data_dir)
+
+    with _lock:
+        entry = _datasets.get(data_dir)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+
+        processor = DataProcessor()
+        processor.load_processed_data(data_dir=data_dir)
+        # A refresh during the load: load again, so the version is the one
+        # of the data read
+        while dataset_version(data_dir) != version:
+            version = dataset_version(data_dir)
+            processor = DataProcessor()
+            processor.load_processed_data(data_dir=data_dir)
+        processor.data_version = version
+        generation = load_manifest(data_dir).get('main_block', {}).get('generation')
+        base = _append_base(entry, generation, processor.shipping_data)
+        _datasets[data_dir] = (version, processor, generation, base)
+        logger.info(f"Loaded dataset version {version} from {data_dir}"
+                    + (f" ({len(processor.shipping_data) - base[1]} shipping rows appended)" if base else ""))
+        return processor
+
+
+def appended_since(data_version):
+    """(previous version, its shipping row count) when a loaded version only appended shipping rows
+
+    The shipping rows of ``data_version`` are then those of the previous
+    version followed by new rows, as left by an incremental extraction
+    that appended to the main block. None when the version is not loaded
+    or its shipping rows may differ in any other way.
+    """
+    entry = _loaded(data_version)
+    return entry[3] if entry is not None else None
+
+
+def shipping_generation(data_version):
+    """Generation of the main shipping table of a loaded version, or None
+
+    The extraction keeps a generation while it only appends shipping rows
+    and starts a new one when it rewrites them, so within a generation
+    Transaction_IDs identify the same shipments and only grow.
+    """
+    entry = _loaded(data_version)
+    return entry[2] if entry is not None else None
+
+
+class LatestVersionCache:
+    """A value derived from the data, kept for the latest data version only
+
+    get() returns the cached value while the data version and ``key``
+    (e.g. the row count) match, and otherwise builds it once for every
+    caller, under a lock. Without a data version nothing is cached.
+    """
+
+    def __init__(self):
+        # (data_version, key, value)
+        self._entry = None
+        self._lock = threading.Lock()
+
+    def get(self, data_version, key, build):
+        """The value for ``data_version`` and ``key``, built with build(previous) when not cached
+
+        ``previous`` is the (data_version, key, value) entry being replaced,
+        or None, so a build can derive the new value from the old one.
+        """
+        if data_version is None:
+            return build(None)
+        with self._lock:
+            if self._entry is not None and self._entry[:2] == (data_version, key):
+                return self._entry[2]
+            value = build(self._entry)
+            self._entry = (data_version, key, value)
+            return value
+
+
+def _loaded(data_version):
+    with _lock:
+        for entry in _datasets.values():
+            if entry[0] == data_version:
+                return entry
+    return None
+
+
+def _append_base(previous, generation, shipping_data):
+    # The main table kept its generation (only appends) and the previous
+    # version's last shipment is still in its place
+    if previous is None or generation is None or previous[2] != generation:
+        return None
+    previous_data = previous[1].shipping_data
+    rows = len(previous_data)
+    if rows > len(shipping_data):
+        return None
+    if rows and 'Transaction_ID' in shipping_data.columns and 'Transaction_ID' in previous_data.columns:
+        if previous_data['Transaction_ID'].iloc[-1] != shipping_data['Transaction_ID'].iloc[rows - 1]:
+            return None
+    return previous[0], rows
+
+
+def invalidate(data_dir=None):
+    """Forget the loaded dataset so the next get_processor() reloads it
+
+    With no ``data_dir`` every loaded dataset is dropped.
+    """
+    with _lock:
+        if data_dir is None:
+            _datasets.clear()
+        else:
+            _datasets.pop(os.path.abspath(data_dir), None)
@@ -0,0 +1,147 @@
+"""
+Extraction Manifest Module for P&G Supply Chain Analytics
+Fingerprints the source workbooks so refreshes only re-extract what changed
+"""
+
+import os
+import json
+import hashlib
+import numbers
+import zipfile
+import xml.etree.ElementTree as ET
+from datetime import datetime
+import pandas as pd
+
+MANIFEST_FILE = 'extraction_manifest.json'
+
+# Namespaces used inside .xlsx packages
+_MAIN_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_PKG_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+# Parts every sheet depends on: cell text lives in sharedStrings and
+# whether a number is a date is decided by styles
+_SHARED_PARTS = ['xl/sharedStrings.xml', 'xl/styles.xml']
+
+
+def load_manifest(output_dir):
+    """Load the manifest of the last extraction, or an empty one"""
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(output_dir, manifest):
+    """Write the manifest atomically so a crash never leaves half a file"""
+    manifest['updated'] = datetime.now().isoformat()
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def file_stat(path):
+    """Cheap change check: modification time and size"""
+    stat = os.stat(path)
+    return {'mtime': stat.st_mtime, 'size': stat.st_size}
+
+
+def file_hash(path, chunk_size=1024 * 1024):
+    """SHA-256 of the file content, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def sheet_hashes(path):
+    """Content fingerprint of every sheet in a workbook
+
+    For .xlsx files each sheet is fingerprinted from the CRC and size of its
+    XML part (plus the shared strings and styles it depends on), which the zip
+    directory already stores, so no sheet has to be decompressed. Other
+    formats fall back to the whole-file hash for every sheet.
+    """
+    if zipfile.is_zipfile(path):
+        try:
+            return _xlsx_sheet_hashes(path)
+        except (KeyError, ET.ParseError):
+            pass
+
+    content_hash = file_hash(path)
+    return {sheet: content_hash for sheet in pd.ExcelFile(path).sheet_names}
+
+
+def _xlsx_sheet_hashes(path):
+    with zipfile.ZipFile(path) as zf:
+        workbook = ET.fromstring(zf.read('xl/workbook.xml'))
+        rels = ET.fromstring(zf.read('xl/_rels/workbook.xml.rels'))
+        targets = {
+            rel.get('Id'): rel.get('Target')
+            for rel in rels.iter(f'{_PKG_REL_NS}Relationship')
+        }
+
+        members = {info.filename: info for info in zf.infolist()}
+        shared = ''.join(
+            f'{part}:{members[part].CRC}:{members[part].file_size};'
+            for part in _SHARED_PARTS if part in members
+        )
+
+        hashes = {}
+        for sheet in workbook.iter(f'{_MAIN_NS}sheet'):
+            target = targets[sheet.get(f'{_REL_NS}id')]
+            part = target.lstrip('/') if target.startswith('/') else f'xl/{target}'
+            info = members[part]
+            hashes[sheet.get('name')] = hashlib.sha256(
+                f'{info.CRC}:{info.file_size};{shared}'.encode()
+            ).hexdigest()
+        return hashes
+
+
+def row_signature(values):
+    """Stable signature of one raw row, independent of int/float parsing"""
+    return hashlib.sha256(_normalized_row(values).encode()).hexdigest()
+
+
+def block_signatures(df, lengths):
+    """Signatures of the first n rows of a raw block, for each n in ``lengths``
+
+    Rows are normalized like row_signature, so a signature does not depend
+    on the types inferred for the block's columns. All lengths are covered
+    in one pass; a length beyond the block's rows gets None.
+    """
+    pending = sorted(set(lengths))
+    signatures = {n: None for n in pending if n > len(df)}
+    pending = [n for n in pending if n <= len(df)]
+    digest = hashlib.sha256()
+    for position, row in enumerate(df.itertuples(index=False, name=None)):
+        while pending and pending[0] == position:
+            signatures[pending.pop(0)] = digest.hexdigest()
+        if not pending:
+            break
+        digest.update(_normalized_row(row).encode())
+        digest.update(b'\n')
+    for n in pending:
+        signatures[n] = digest.hexdigest()
+    return signatures
+
+
+def _normalized_row(values):
+    normalized = []
+    for value in values:
+        if value is None or (not isinstance(value, str) and pd.isna(value)):
+            normalized.append(None)
+        elif isinstance(value, numbers.Number) and not isinstance(value, bool) and float(value).is_integer():
+            normalized.append(int(value))
+        elif hasattr(value, 'isoformat'):
+            normalized.append(value.isoformat())
+        else:
+            normalized.append(str(value))
+    return json.dumps(normalized)
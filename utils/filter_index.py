@@ -0,0 +1,188 @@
+"""
+Filter Index Module for P&G Supply Chain Analytics
+Inverted bitmap indexes and a sorted date index for the dashboard filters
+"""
+
+import threading
+import weakref
+import numpy as np
+import pandas as pd
+
+DATE_COLUMN = 'Actual_Ship_Date'
+
+_lock = threading.Lock()
+# id(frame) -> (weak reference to the frame, FilterIndex)
+_indexes = {}
+
+
+class FilterIndex:
+    """Row-id bitmaps per column value plus a sorted date index for one frame
+
+    A filter combination resolves to one row selection by OR-ing the bitmaps
+    of the selected values within a column and AND-ing across columns and
+    the date range, all on packed bits (one byte per 8 rows). Column indexes
+    are built on first use and kept for the life of the frame, which must
+    therefore not be modified (the shared dataset is read-only).
+    """
+
+    def __init__(self, data, date_column=DATE_COLUMN):
+        # Weak, so the module-level cache never keeps a frame alive
+        self._data = weakref.ref(data)
+        self.rows = len(data)
+        self.date_column = date_column
+        self._columns = {}
+        self._dates = None
+
+    @property
+    def data(self):
+        return self._data()
+
+    @classmethod
+    def for_frame(cls, data):
+        """Index of a frame, built once and reused while the frame is alive"""
+        key = id(data)
+        with _lock:
+            entry = _indexes.get(key)
+            if entry is not None and entry[0]() is data and entry[1].rows == len(data):
+                return entry[1]
+
+            index = cls(data)
+            ref = weakref.ref(data, lambda _, key=key: _indexes.pop(key, None))
+            _indexes[key] = (ref, index)
+            return index
+
+    def values(self, column):
+        """Sorted distinct non-null values of a column"""
+        return list(self._column(column)[0])
+
+    def date_bounds(self):
+        """Earliest and latest date (NaT when the column has no dates)"""
+        dates, _ = self._date_index()
+        if len(dates) == 0:
+            return pd.NaT, pd.NaT
+        return pd.Timestamp(dates[0]), pd.Timestamp(dates[-1])
+
+    def supports_dates(self):
+        """True when the date column exists and holds (timezone-naive) datetimes"""
+        return (
+            self.date_column in self.data.columns
+            and pd.api.types.is_datetime64_dtype(self.data[self.date_column])
+        )
+
+    def select(self, filters, date_range=None):
+        """Row positions matching all filters, or None when nothing is filtered
+
+        ``filters`` maps a column to the values to keep (columns missing from
+        the frame and empty value lists are ignored) and ``date_range`` is an
+        inclusive (start_date, end_date) pair on the date column's day.
+        """
+        selection = None
+
+        if date_range and self.supports_dates():
+            selection = self._date_bitmap(*date_range)
+
+        for column, values in filters.items():
+            if column not in self.data.columns or not values:
+                continue
+            bitmap = self._value_bitmap(column, values)
+            selection = bitmap if selection is None else np.bitwise_and(selection, bitmap)
+
+        if selection is None:
+            return None
+        return np.flatnonzero(np.unpackbits(selection, count=self.rows))
+
+    def materialize(self, positions):
+        """Frame of the selected rows (a new frame, the index is left intact)
+
+        With nothing filtered the result only shares the frame's data when
+        pandas copy-on-write is on; otherwise it is a deep copy, so writing
+        into it never reaches the shared frame.
+        """
+        if positions is None or len(positions) == self.rows:
+            return self.data.copy(deep=not _copy_on_write())
+        return self.data.take(positions)
+
+    def _value_bitmap(self, column, values):
+        uniques, bitmaps = self._column(column)
+        codes = uniques.get_indexer(pd.Index(values).unique())
+        codes = codes[codes >= 0]
+        if len(codes) == 0:
+            return np.zeros((self.rows + 7) // 8, dtype=np.uint8)
+        return np.bitwise_or.reduce(bitmaps[codes], axis=0)
+
+    def _column(self, column):
+        """Distinct values of a column and one packed row bitmap per value"""
+        if column not in self._columns:
+            series = self.data[column]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                # Keep only the categories that occur in this frame
+                series = series.cat.remove_unused_categories()
+                codes = series.cat.codes.to_numpy()
+                uniques = pd.Index(series.cat.categories)
+            else:
+                try:
+                    codes, uniques = pd.factorize(series, sort=True)
+                except TypeError:
+                    # Mixed types that cannot be ordered
+                    codes, uniques = pd.factorize(series)
+                uniques = pd.Index(uniques)
+
+            # Group row ids by value, then set each value's rows in its bitmap
+            valid = np.flatnonzero(codes >= 0)
+            order = valid[np.argsort(codes[valid], kind='stable')]
+            bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            bitmaps = np.zeros((len(uniques), (self.rows + 7) // 8), dtype=np.uint8)
+            for code in range(len(uniques)):
+                bits = np.zeros(self.rows, dtype=bool)
+                bits[order[bounds[code]:bounds[code + 1]]] = True
+                bitmaps[code] = np.packbits(bits)
+            self._columns[column] = (uniques, bitmaps)
+        return self._columns[column]
+
+    def _date_index(self):
+        """Sorted non-null values of the date column and their row ids"""
+        if self._dates is None:
+            values = self.data[self.date_column].to_numpy(dtype='datetime64[ns]')
+            valid = np.flatnonzero(~np.isnat(values))
+            order = valid[np.argsort(values[valid], kind='stable')]
+            self._dates = (values[order], order)
+        return self._dates
+
+    def _date_bitmap(self, start_date, end_date):
+        dates, order = self._date_index()
+        # Same days as comparing .dt.date with the (inclusive) range
+        start = np.datetime64(pd.Timestamp(start_date).normalize(), 'ns')
+        stop = np.datetime64(pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1), 'ns')
+        lo = np.searchsorted(dates, start, side='left')
+        hi = max(np.searchsorted(dates, stop, side='left'), lo)
+        bits = np.zeros(self.rows, dtype=bool)
+        bits[order[lo:hi]] = True
+        return np.packbits(bits)
+
+
+def _copy_on_write():
+    """True when pandas copies shared data on write (always from pandas 3)"""
+    if int(pd.__version__.split('.')[0]) >= 3:
+        return True
+    return pd.get_option('mode.copy_on_write') is True
+
+
+def filter_frame(data, filters, date_range=None):
+    """Rows of a frame matching the dashboard filters and inclusive date range
+
+    Filters resolve on the frame's FilterIndex to one row selection (bitmap
+    intersection); only the selected rows are copied into the result.
+    """
+    index = FilterIndex.for_frame(data)
+
+    if date_range and DATE_COLUMN in data.columns and not index.supports_dates():
+        # Dates the index cannot handle (e.g. timezone-aware): filter directly
+        start_date, end_date = date_range
+        data = data[
+            (data[DATE_COLUMN].dt.date >= start_date) &
+            (data[DATE_COLUMN].dt.date <= end_date)
+        ]
+        index = FilterIndex(data)
+        date_range = None
+
+    return index.materialize(index.select(filters, date_range))
@@ -0,0 +1,111 @@
+"""
+Lazy Imports Module for P&G Supply Chain Analytics
+Heavy optional libraries (scikit-learn, SciPy, statsmodels, Prophet) loaded on first use
+"""
+
+import time
+import logging
+import importlib
+import importlib.util
+import threading
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Module name -> {'seconds': load time, 'needed_for': first name used}
+_import_costs = {}
+_lock = threading.RLock()
+
+
+def module_available(name):
+    """Whether a module is installed, checked without importing it"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        # A missing parent package raises instead of returning None
+        return False
+
+
+def require(*names):
+    """Raise ImportError unless all modules are installed
+
+    Lets a module that defers its heavy imports still fail at import time,
+    so callers' ``except ImportError`` fallbacks keep working.
+    """
+    missing = [name for name in names if not module_available(name)]
+    if missing:
+        raise ImportError(f"Missing required modules: {', '.join(missing)}")
+
+
+def _load(name, needed_for):
+    with _lock:
+        if name not in _import_costs:
+            started = time.perf_counter()
+            importlib.import_module(name)
+            seconds = time.perf_counter() - started
+            _import_costs[name] = {'seconds': seconds, 'needed_for': needed_for}
+            logger.info(f"Loaded {name} in {seconds:.2f}s (first needed for {needed_for})")
+    return importlib.import_module(name)
+
+
+class LazyModule:
+    """Stand-in for a module, imported on first attribute access"""
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attr):
+        if attr.startswith('__'):
+            raise AttributeError(attr)
+        return getattr(_load(self._name, f'{self._name}.{attr}'), attr)
+
+    def __repr__(self):
+        return f"<lazy module '{self._name}'>"
+
+
+class LazyAttribute:
+    """Stand-in for a function or class of a module, imported on first use"""
+
+    def __init__(self, module, name):
+        self._module = module
+        self._name = name
+
+    def _resolve(self):
+        return getattr(_load(self._module, f'{self._module}.{self._name}'), self._name)
+
+    def __call__(self, *args, **kwargs):
+        return self._resolve()(*args, **kwargs)
+
+    def __getattr__(self, attr):
+        if attr.startswith('__'):
+            raise AttributeError(attr)
+        return getattr(self._resolve(), attr)
+
+    def __repr__(self):
+        return f"<lazy {self._module}.{self._name}>"
+
+
+def lazy_import(name):
+    """``import name``, deferred until the module is first used"""
+    return LazyModule(name)
+
+
+def lazy_from(module, *names):
+    """``from module import names``, each deferred until first used"""
+    attributes = tuple(LazyAttribute(module, name) for name in names)
+    return attributes[0] if len(attributes) == 1 else attributes
+
+
+def import_costs():
+    """Heavy modules loaded so far in this process, slowest first
+
+    Seconds are the wall time of the first import, including any
+    dependencies it pulled in that were not loaded yet.
+    """
+    with _lock:
+        rows = [
+            {'Module': name, 'Seconds': cost['seconds'], 'First Needed For': cost['needed_for']}
+            for name, cost in _import_costs.items()
+        ]
+    costs = pd.DataFrame(rows, columns=['Module', 'Seconds', 'First Needed For'])
+    return costs.sort_values('Seconds', ascending=False).reset_index(drop=True)
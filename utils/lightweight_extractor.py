@@ -8,6 +8,8 @@ import os
 import json
 from datetime import datetime
 import streamlit as st
+from utils.columnar_store import ChunkedTableWriter
+from utils.workbook_reader import iter_sheet_chunks, sheet_names, DEFAULT_CHUNK_SIZE
 
 class LightweightExtractor:
     def __init__(self, shipping_file, sales_file):
@@ -147,24 +149,22 @@ class LightweightExtractor:
     def _extract_sales(self, output_dir):
         """Extract sales data with minimal memory"""
         try:
-            # Get sheet names
-            xl_file = pd.ExcelFile(self.sales_file)
-            
-            # Process each sheet
-            for sheet in xl_file.sheet_names:
+            # Process each sheet, streaming rows to disk in fixed-size batches
+            # so memory stays flat regardless of workbook size
+            for sheet in sheet_names(self.sales_file):
                 if sheet in ['Data', 'TOP 10', 'Pivot']:
                     # Read with limited columns for memory efficiency
-                    if sheet == 'Data':
-                        df = pd.read_excel(self.sales_file, sheet_name=sheet, usecols=range(25))
-                    else:
-                        df = pd.read_excel(self.sales_file, sheet_name=sheet)
+                    max_cols = 25 if sheet == 'Data' else None
                     
                     # Clean sheet name for filename
                     safe_name = sheet.replace(' ', '_').replace('-', '_')
                     
                     # Save
-                    df.to_csv(f'{output_dir}/sales_{safe_name}.csv', index=False)
-                    st.success(f"✅ Saved sales_{safe_name}: {len(df)} rows")
+                    writer = ChunkedTableWriter(output_dir, f'sales_{safe_name}')
+                    for chunk in iter_sheet_chunks(self.sales_file, sheet, DEFAULT_CHUNK_SIZE, max_cols=max_cols):
+                        writer.write(chunk)
+                    rows = writer.close()
+                    st.success(f"✅ Saved sales_{safe_name}: {rows} rows")
             
         except Exception as e:
             st.error(f"Sales extraction error: {str(e)}")
@@ -0,0 +1,81 @@
+"""
+Schema Module for P&G Supply Chain Analytics
+Categorical encoding of the low-cardinality shipping and sales columns
+"""
+
+import logging
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Low-cardinality text columns stored as pandas 'category'
+CATEGORICAL_COLUMNS = [
+    'Category', 'Master_Brand', 'Brand', 'Source', 'SLS_Plant',
+    'Delivery_Status', 'Planning_Level', 'L_I', 'Month'
+]
+
+# Statuses always present in the Delivery_Status categories, even when the
+# loaded data has none of one kind, so status codes never change meaning
+DELIVERY_STATUSES = ['Advanced', 'Late', 'Not Due', 'On Time']
+
+
+def build_category_dtypes(*frames):
+    """Build one shared CategoricalDtype per column across all frames
+
+    Categories are the sorted union of the values found in every frame, so
+    the shipping and sales tables use the same codes for the same value and
+    the category order matches the order a groupby on plain strings gives.
+    """
+    dtypes = {}
+    for col in CATEGORICAL_COLUMNS:
+        values = set()
+        for df in frames:
+            if df is not None and col in df.columns:
+                values.update(_column_values(df[col]))
+        if col == 'Delivery_Status':
+            values.update(DELIVERY_STATUSES)
+        if values:
+            dtypes[col] = pd.CategoricalDtype(sorted(values), ordered=False)
+    return dtypes
+
+
+def apply_categoricals(df, dtypes):
+    """Convert the schema's text columns of a frame to their shared dtypes
+
+    Columns holding anything but text (e.g. a numeric Month) are left as
+    they are, since converting them would change how they compare.
+    """
+    if df is None or df.empty:
+        return df
+
+    for col, dtype in dtypes.items():
+        if col not in df.columns:
+            continue
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # Already categorical, but maybe with its own category list
+            series = series.astype(object)
+        elif not _is_text(series):
+            continue
+        try:
+            df[col] = series.astype(dtype)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Could not convert {col} to category: {str(e)}")
+    return df
+
+
+def _column_values(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype(object)
+    if not _is_text(series):
+        return []
+    return series.dropna().unique().tolist()
+
+
+def _is_text(series):
+    """True when every non-null value of the column is a string"""
+    if pd.api.types.is_string_dtype(series.dtype) and not pd.api.types.is_object_dtype(series.dtype):
+        return True
+    if not pd.api.types.is_object_dtype(series.dtype):
+        return False
+    return series.dropna().map(type).eq(str).all()
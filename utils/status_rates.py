@@ -0,0 +1,54 @@
+"""
+Status Rates Module for P&G Supply Chain Analytics
+Vectorized per-group delivery status counts and rates (e.g. late rate)
+"""
+
+import pandas as pd
+
+STATUS_COLUMN = 'Delivery_Status'
+
+# Name of the 0/1 status column added to the grouping frame
+FLAG_COLUMN = '_status_flag'
+
+
+def status_flag(data, status='Late', column=STATUS_COLUMN):
+    """Boolean Series, True where a row has the given status (missing is False)"""
+    return data[column].eq(status).fillna(False).astype(bool)
+
+
+def status_count(data, by, status='Late', column=STATUS_COLUMN):
+    """Rows with the given status per group
+
+    Same result as groupby(by)[column].apply(lambda x: (x == status).sum()),
+    computed as a grouped sum of a precomputed boolean column.
+    """
+    return _grouped_flag(data, by, status, column).sum().rename(column)
+
+
+def status_rate(data, by, status='Late', column=STATUS_COLUMN, percent=True):
+    """Share of rows per group with the given status (in % unless percent=False)
+
+    Same result as groupby(by)[column].apply(lambda x: (x == status).mean());
+    rows with a missing status count in the group size but never as the
+    status. ``by`` is a column name, a pd.Grouper or a list of them.
+    """
+    rate = _grouped_flag(data, by, status, column).mean().rename(column)
+    return rate * 100 if percent else rate
+
+
+def status_rate_table(data, index, columns, status='Late', column=STATUS_COLUMN, percent=True):
+    """Status rate with ``index`` groups as rows and ``columns`` groups as columns
+
+    Same layout as pivot_table(index=..., columns=..., values=column) with a
+    rate aggfunc: combinations without rows are NaN.
+    """
+    return status_rate(data, [index, columns], status, column, percent).unstack(columns)
+
+
+def _grouped_flag(data, by, status, column):
+    keys = by if isinstance(by, list) else [by]
+    names = [key.key if isinstance(key, pd.Grouper) else key for key in keys]
+    # Only the grouping columns and the flag are grouped, never the whole frame
+    frame = data[names].copy(deep=False)
+    frame[FLAG_COLUMN] = status_flag(data, status, column)
+    return frame.groupby(by, observed=True)[FLAG_COLUMN]
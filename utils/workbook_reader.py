@@ -0,0 +1,208 @@
+"""
+Single-Pass Workbook Reader for P&G Supply Chain Analytics
+Streams worksheets once, either split into column/row blocks or in row chunks
+"""
+
+import numpy as np
+import pandas as pd
+from pandas.errors import EmptyDataError
+from pandas.io.parsers import TextParser
+from openpyxl import load_workbook
+from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+from openpyxl.utils import range_boundaries
+
+# Rows per batch when streaming large sheets
+DEFAULT_CHUNK_SIZE = 10000
+
+
+def convert_cell(cell):
+    """Convert an openpyxl cell the same way pandas.read_excel does"""
+    if cell.value is None:
+        return ""
+    elif cell.data_type == TYPE_ERROR:
+        return np.nan
+    elif cell.data_type == TYPE_NUMERIC:
+        val = int(cell.value)
+        if val == cell.value:
+            return val
+        return float(cell.value)
+    return cell.value
+
+
+def read_sheet_sections(path, sheet_name, sections):
+    """Read several blocks of one sheet in a single streaming pass
+
+    ``sections`` maps a block name to a dict with:
+        cols       - Excel column range, e.g. 'A:O'
+        first_row  - 1-based row of the block's header (or first data row
+                     when ``header`` is None)
+        nrows      - optional number of data rows to read
+        header     - 0 (default) or None, as in pandas.read_excel
+        names      - optional column names, as in pandas.read_excel
+
+    The sheet is opened in openpyxl read-only mode and iterated once; each
+    row is routed into the blocks it belongs to. Every block is then parsed
+    with the same TextParser settings pandas.read_excel uses, so the result
+    matches calling read_excel once per block with the equivalent
+    ``skiprows``/``usecols``/``nrows`` arguments.
+
+    Returns a dict of DataFrames keyed like ``sections``.
+    """
+    specs = {}
+    for name, section in sections.items():
+        min_col, _, max_col, _ = range_boundaries(section['cols'])
+        header = section.get('header', 0)
+        nrows = section.get('nrows')
+        last_row = None
+        if nrows is not None:
+            last_row = section['first_row'] + nrows - (1 if header is None else 0)
+        specs[name] = {
+            'start': min_col - 1,
+            'stop': max_col,
+            'first_row': section['first_row'],
+            'last_row': last_row,
+            'rows': [],
+            # Last row (within reach of this block) holding any data at all;
+            # read_excel trims everything after it
+            'last_data_row': 0
+        }
+
+    workbook = load_workbook(path, read_only=True, data_only=True, keep_links=False)
+    try:
+        sheet = workbook[sheet_name]
+        sheet.reset_dimensions()
+
+        for row_number, row in enumerate(sheet.rows, start=1):
+            has_data = any(cell.value is not None and cell.value != "" for cell in row)
+            active = False
+            for spec in specs.values():
+                if spec['last_row'] is not None and row_number > spec['last_row']:
+                    continue
+                active = True
+                if has_data:
+                    spec['last_data_row'] = row_number
+                if row_number >= spec['first_row']:
+                    cells = [convert_cell(cell) for cell in row[spec['start']:spec['stop']]]
+                    cells.extend([""] * (spec['stop'] - spec['start'] - len(cells)))
+                    spec['rows'].append(cells)
+            if not active:
+                break
+    finally:
+        workbook.close()
+
+    frames = {}
+    for name, spec in specs.items():
+        section = sections[name]
+        # Drop the trailing rows read_excel would have trimmed
+        keep = max(spec['last_data_row'] - spec['first_row'] + 1, 0)
+        rows = spec['rows'][:keep]
+        frames[name] = _parse_rows(
+            rows,
+            header=section.get('header', 0),
+            names=section.get('names'),
+            nrows=section.get('nrows')
+        )
+    return frames
+
+
+def _parse_rows(rows, header=0, names=None, nrows=None):
+    """Turn raw rows into a DataFrame with read_excel's type inference"""
+    if not rows:
+        return pd.DataFrame()
+    try:
+        parser = TextParser(
+            rows,
+            names=names,
+            header=header,
+            nrows=nrows,
+            skip_blank_lines=False
+        )
+        return parser.read(nrows=nrows)
+    except EmptyDataError:
+        return pd.DataFrame()
+
+
+def sheet_names(path):
+    """Sheet names of a workbook without loading any cell data"""
+    workbook = load_workbook(path, read_only=True, data_only=True, keep_links=False)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+
+
+def iter_sheet_chunks(path, sheet_name, chunk_size=DEFAULT_CHUNK_SIZE, max_cols=None):
+    """Stream a sheet as DataFrames of at most ``chunk_size`` rows
+
+    The first row is the header, as with pandas.read_excel(header=0), and
+    ``max_cols`` keeps only the first N columns (like ``usecols=range(N)``).
+    Only one chunk of rows is held in memory at a time, so peak memory does
+    not grow with the size of the sheet. Types are inferred per chunk, so a
+    column can come back as int in one chunk and float in the next.
+
+    Without ``max_cols`` a row reaching past the last header adds columns
+    named like read_excel's ('Unnamed: 5'), from that row's chunk on; new
+    columns only ever come after the existing ones.
+    """
+    workbook = load_workbook(path, read_only=True, data_only=True, keep_links=False)
+    try:
+        sheet = workbook[sheet_name]
+        sheet.reset_dimensions()
+
+        header = None
+        columns = None
+        width = 0
+        rows = []
+        # Blank rows are only emitted once a later row holds data, so the
+        # trailing blank rows read_excel trims are never yielded
+        pending_blank = 0
+
+        for row in sheet.rows:
+            cells = [convert_cell(cell) for cell in row[:max_cols]]
+            while cells and cells[-1] == "":
+                cells.pop()
+
+            if columns is None:
+                if not cells:
+                    continue
+                header = cells
+                width = max_cols or len(cells)
+                header.extend([""] * (width - len(header)))
+                columns = _parse_rows([header], header=0).columns
+                continue
+
+            if not cells:
+                pending_blank += 1
+                continue
+
+            for _ in range(pending_blank):
+                rows.append([""] * width)
+                if len(rows) >= chunk_size:
+                    yield _parse_chunk(rows, columns)
+                    rows = []
+            pending_blank = 0
+
+            if len(cells) > width:
+                # Widen like read_excel: the extra columns get unnamed headers
+                width = len(cells)
+                header.extend([""] * (width - len(header)))
+                columns = _parse_rows([header], header=0).columns
+                for previous in rows:
+                    previous.extend([""] * (width - len(previous)))
+            cells.extend([""] * (width - len(cells)))
+            rows.append(cells)
+            if len(rows) >= chunk_size:
+                yield _parse_chunk(rows, columns)
+                rows = []
+
+        if rows:
+            yield _parse_chunk(rows, columns)
+    finally:
+        workbook.close()
+
+
+def _parse_chunk(rows, columns):
+    """Parse headerless chunk rows under the sheet's parsed header"""
+    df = _parse_rows(rows, header=None)
+    df.columns = columns
+    return df
@@ -0,0 +1,74 @@
+"""
+Verify the exponential smoothing demand forecast
+Interval coverage on held-out days of synthetic series, and predict() on history and future dates
+"""
+
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from ml_models.exponential_smoothing import forecast_exponential_smoothing
+
+print("=== EXPONENTIAL SMOOTHING VERIFICATION ===\n")
+
+failures = []
+
+
+def check(condition, message):
+    print(f"  {'OK  ' if condition else 'FAIL'} {message}")
+    if not condition:
+        failures.append(message)
+
+
+# Synthetic daily demand: level, slight trend, weekly season, a random
+# walk and noise; the last 30 days of each series are held out
+rng = np.random.default_rng(1)
+n_series, n_days, horizon = 200, 400, 30
+days = pd.date_range('2024-01-01', periods=n_days, freq='D')
+t = np.arange(n_days)
+histories, actuals = [], []
+for _ in range(n_series):
+    y = (100 + rng.normal(0, 0.05) * t + 10 * np.sin(2 * np.pi * t / 7 + rng.random() * 6)
+         + np.cumsum(rng.normal(0, 0.5, n_days)) + rng.normal(0, 4, n_days))
+    histories.append(pd.DataFrame({'ds': days[:-horizon], 'y': y[:-horizon]}))
+    actuals.append(y[-horizon:])
+
+print(f"1. INTERVAL COVERAGE ({n_series} series, {horizon} held-out days)")
+print("-" * 60)
+for interval_width in [0.8, 0.9]:
+    results = forecast_exponential_smoothing(histories, periods=horizon, interval_width=interval_width)
+    inside = np.array([
+        (actual >= forecast['yhat_lower'].to_numpy()[-horizon:]) & (actual <= forecast['yhat_upper'].to_numpy()[-horizon:])
+        for (_, forecast), actual in zip(results, actuals)
+    ])
+    target = interval_width * 100
+    check(abs(inside.mean() * 100 - target) <= 5,
+          f"{target:.0f}% interval covers {inside.mean() * 100:.1f}% of held-out days")
+    check(abs(inside[:, :7].mean() * 100 - target) <= 5 and abs(inside[:, -7:].mean() * 100 - target) <= 5,
+          f"first week {inside[:, :7].mean() * 100:.1f}%, last week {inside[:, -7:].mean() * 100:.1f}%")
+
+print("\n2. PREDICT ON HISTORY AND FUTURE DATES")
+print("-" * 60)
+model, forecast = forecast_exponential_smoothing(histories[:1], periods=horizon)[0]
+history = histories[0]
+dates = pd.DataFrame({'ds': pd.concat([history['ds'].iloc[[0, 100, -1]], forecast['ds'].iloc[-3:]])})
+predicted = model.predict(dates)
+expected = forecast.set_index('ds').loc[dates['ds'], 'yhat'].to_numpy()
+check(np.allclose(predicted['yhat'].to_numpy(), expected),
+      "predict() gives the fitted values on history days and the forecast after")
+check(np.allclose(predicted['trend'] + predicted['weekly'], predicted['yhat']), "yhat = trend + weekly")
+try:
+    model.predict(pd.DataFrame({'ds': [history['ds'].min() - pd.Timedelta(days=1)]}))
+    check(False, "predict() raises for a date before the history")
+except ValueError:
+    check(True, "predict() raises for a date before the history")
+
+print("\n=== RESULT ===")
+if failures:
+    print(f"FAIL: {len(failures)} check(s) failed")
+    sys.exit(1)
+print("PASS: forecast intervals and predict() hold")
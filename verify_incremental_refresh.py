@@ -0,0 +1,134 @@
+"""
+Verify the incremental refresh of the extracted shipping data
+Appended rows are appended, and an edited earlier row rewrites the main data, matching a full extraction
+"""
+
+import pandas as pd
+import numpy as np
+import sys
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from openpyxl import Workbook, load_workbook
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.data_extractor import DataExtractor
+from utils.columnar_store import load_table
+
+print("=== INCREMENTAL REFRESH VERIFICATION ===\n")
+
+failures = []
+
+
+def check(condition, message):
+    print(f"  {'OK  ' if condition else 'FAIL'} {message}")
+    if not condition:
+        failures.append(message)
+
+
+def shipping_row(rng, i):
+    ship = datetime(2025, 7, 1) + timedelta(days=int(rng.integers(0, 31)))
+    requested = ship - timedelta(days=int(rng.integers(-3, 5)))
+    return [ship, ship, rng.choice(['P1', 'P2', 'P3']), 'x', rng.choice(['Hair', 'Oral', 'Baby']),
+            rng.choice(['Pantene', 'Oral-B', 'Pampers']), f'B{i % 7}', 'LI', f'SKU{i % 40}',
+            float(rng.integers(1, 500)), rng.choice(['Jeddah', 'Dubai', 'Riyadh']), ship, 'Jul', requested,
+            rng.choice(['Late', 'On Time', 'Advanced', 'Not Due'])]
+
+
+def write_workbooks(folder, rows):
+    """Sheet1 laid out like the JPG shipping workbook, and a one-sheet DSR workbook"""
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = 'Sheet1'
+    for i in range(8):
+        sheet.cell(row=4 + i, column=1, value=f'Filter{i}')
+        sheet.cell(row=4 + i, column=2, value=f'Value{i}')
+    for j, name in enumerate(DataExtractor.MAIN_COLUMNS):
+        sheet.cell(row=13, column=1 + j, value=name)
+    for j in range(6):
+        sheet.cell(row=13, column=16 + j, value=f'Pivot{j}')
+    for j in range(8):
+        sheet.cell(row=13, column=25 + j, value=f'Calc{j}')
+    for j in range(7):
+        sheet.cell(row=1, column=33 + j, value=f'Ref{j}')
+    for i, row in enumerate(rows):
+        for j, value in enumerate(row):
+            sheet.cell(row=14 + i, column=1 + j, value=value)
+    workbook.save(os.path.join(folder, 'shipping.xlsx'))
+
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = 'Data'
+    sheet.append(['Category', 'Target', 'Sales'] + [f'X{j}' for j in range(DataExtractor.SALES_DATA_COLUMNS - 3)])
+    for i in range(20):
+        sheet.append([f'Cat{i % 3}', 100.0 + i, 90.0 + i] + [1.0] * (DataExtractor.SALES_DATA_COLUMNS - 3))
+    workbook.save(os.path.join(folder, 'sales.xlsx'))
+
+
+def extractor(folder):
+    return DataExtractor(os.path.join(folder, 'shipping.xlsx'), os.path.join(folder, 'sales.xlsx'))
+
+
+def matches_full_extraction(folder, output_dir):
+    """The refreshed main data equals a full extraction of the same workbooks"""
+    full_dir = os.path.join(folder, 'full')
+    shutil.rmtree(full_dir, ignore_errors=True)
+    extractor(folder).save_extracted_data(full_dir)
+    refreshed = load_table(output_dir, 'shipping_main_data')
+    full = load_table(full_dir, 'shipping_main_data')
+    try:
+        pd.testing.assert_frame_equal(refreshed.reset_index(drop=True), full.reset_index(drop=True), check_dtype=False)
+        return True
+    except AssertionError as e:
+        print(e)
+        return False
+
+
+rng = np.random.default_rng(5)
+rows = [shipping_row(rng, i) for i in range(200)]
+folder = tempfile.mkdtemp()
+output_dir = os.path.join(folder, 'extracted')
+try:
+    write_workbooks(folder, rows)
+    extractor(folder).save_extracted_data(output_dir)
+
+    print("\n1. ROWS APPENDED AT THE END")
+    print("-" * 60)
+    rows += [shipping_row(rng, i) for i in range(200, 230)]
+    write_workbooks(folder, rows)
+    summary = extractor(folder).update_extracted_data(output_dir)
+    check(summary.get('appended_rows') == 30, f"{summary.get('appended_rows')} rows appended (30 added)")
+    check(matches_full_extraction(folder, output_dir), "main data equals a full extraction")
+
+    print("\n2. AN EARLIER ROW EDITED")
+    print("-" * 60)
+    before = load_table(output_dir, 'shipping_main_data')
+    workbook = load_workbook(os.path.join(folder, 'shipping.xlsx'))
+    status = DataExtractor.MAIN_COLUMNS.index('Delivery_Status') + 1
+    quantity = DataExtractor.MAIN_COLUMNS.index('Quantity') + 1
+    edited = workbook['Sheet1'].cell(row=14 + 100, column=status)
+    edited.value = 'On Time' if edited.value == 'Late' else 'Late'
+    workbook['Sheet1'].cell(row=14 + 100, column=quantity).value = 12345.0
+    workbook.save(os.path.join(folder, 'shipping.xlsx'))
+    summary = extractor(folder).update_extracted_data(output_dir)
+    after = load_table(output_dir, 'shipping_main_data')
+    check(summary.get('appended_rows') == -1, "main data rewritten")
+    check(after['Quantity'].iloc[100] == 12345 and before['Quantity'].iloc[100] != 12345,
+          "the edited row changed in the output")
+    check(matches_full_extraction(folder, output_dir), "main data equals a full extraction")
+
+    print("\n3. NOTHING CHANGED")
+    print("-" * 60)
+    summary = extractor(folder).update_extracted_data(output_dir)
+    check(summary.get('sheets') == [], "no sheet re-extracted")
+finally:
+    shutil.rmtree(folder, ignore_errors=True)
+
+print("\n=== RESULT ===")
+if failures:
+    print(f"FAIL: {len(failures)} check(s) failed")
+    sys.exit(1)
+print("PASS: incremental refresh keeps the main data equal to a full extraction")
@@ -0,0 +1,64 @@
+"""
+Verify the Largest-Triangle-Three-Buckets downsampling of long chart series
+Endpoints kept, point count, sorted positions, and peaks and dips preserved
+"""
+
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.chart_rendering import lttb_indices, MAX_POINTS
+
+print("=== LTTB DOWNSAMPLING VERIFICATION ===\n")
+
+failures = []
+
+
+def check(condition, message):
+    print(f"  {'OK  ' if condition else 'FAIL'} {message}")
+    if not condition:
+        failures.append(message)
+
+
+# A noisy daily series with isolated spikes and dips
+rng = np.random.default_rng(3)
+n = 200000
+x = pd.date_range('2020-01-01', periods=n, freq='min')
+y = np.cumsum(rng.normal(0, 1, n)) + 5 * np.sin(np.arange(n) / 5000)
+spikes = rng.choice(np.arange(1, n - 1), 20, replace=False)
+y[spikes[:10]] += 500
+y[spikes[10:]] -= 500
+
+for n_out in [MAX_POINTS, 1000, 100]:
+    print(f"\n{n:,} points -> {n_out:,}")
+    print("-" * 60)
+    kept = lttb_indices(x, y, n_out)
+    check(len(kept) == n_out, f"{len(kept):,} points kept")
+    check(kept[0] == 0 and kept[-1] == n - 1, "first and last points kept")
+    check(bool((np.diff(kept) > 0).all()), "positions sorted and unique")
+    # A bucket keeps one point, and a spike right after a kept one can be
+    # passed over: all are kept when at least two buckets apart
+    bucket_width = (n - 2) / (n_out - 2)
+    if np.diff(np.sort(spikes)).min() > 2 * bucket_width:
+        check(set(spikes) <= set(kept), f"all {len(spikes)} spikes and dips kept")
+    check(y[kept].max() == y.max() and y[kept].min() == y.min(), "overall maximum and minimum kept")
+
+print("\nShort series and numeric x")
+print("-" * 60)
+check(np.array_equal(lttb_indices(np.arange(50), np.arange(50.0), 100), np.arange(50)),
+      "fewer points than requested are all kept")
+check(np.array_equal(lttb_indices(np.arange(50), np.arange(50.0), 2), np.arange(50)),
+      "fewer than 3 buckets keeps every point")
+numeric = lttb_indices(np.arange(n, dtype=float), y, 1000)
+dates = lttb_indices(x, y, 1000)
+check(np.array_equal(numeric, dates), "evenly spaced dates pick the same points as numeric x")
+
+print("\n=== RESULT ===")
+if failures:
+    print(f"FAIL: {len(failures)} check(s) failed")
+    sys.exit(1)
+print("PASS: LTTB downsampling keeps endpoints and extremes")
@@ -0,0 +1,87 @@
+"""
+Verify the route matrix against the Source x SLS_Plant groupby it replaces
+Built at once and in appended batches, on the extracted data and on synthetic shipments
+"""
+
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from ml_models.route_matrix import RouteMatrix
+from utils.status_rates import status_rate
+
+print("=== ROUTE MATRIX VERIFICATION ===\n")
+
+
+def groupby_route_totals(df):
+    """The per-route table route_optimization_score used to compute"""
+    route_groups = df.groupby(['Source', 'SLS_Plant'], observed=True)
+    return pd.DataFrame({
+        'Late_Rate': status_rate(df, ['Source', 'SLS_Plant']),
+        'Avg_Delay': route_groups['Delay_Days'].mean(),
+        'Total_Volume': route_groups['Quantity'].sum()
+    }).round(2)
+
+
+def check(name, df, batches=4):
+    expected = groupby_route_totals(df)
+    # Compare route labels, not the categorical dtype of the loaded columns
+    expected.index = pd.MultiIndex.from_tuples(expected.index.tolist(), names=expected.index.names)
+    built = RouteMatrix.build(df)
+    updated = RouteMatrix()
+    for batch in np.array_split(np.arange(len(df)), batches):
+        updated.update(df.iloc[batch])
+
+    ok = True
+    for label, matrix in [('build', built), (f'{batches} updates', updated)]:
+        try:
+            pd.testing.assert_frame_equal(matrix.route_totals(), expected, check_dtype=False, check_index_type=False)
+            print(f"  {name} ({label}): {len(expected)} routes match the groupby")
+        except AssertionError as e:
+            ok = False
+            print(f"  {name} ({label}): MISMATCH\n{e}")
+        if matrix.rows != len(df):
+            ok = False
+            print(f"  {name} ({label}): counted {matrix.rows} shipments, expected {len(df)}")
+    return ok
+
+
+results = []
+
+# Synthetic shipments: new sources and plants in later batches, missing
+# routes, delays and quantities
+rng = np.random.default_rng(0)
+n = 20000
+synthetic = pd.DataFrame({
+    'Source': rng.choice(['S1', 'S2', 'S3', 'S4', None], n, p=[0.4, 0.3, 0.2, 0.05, 0.05]),
+    'SLS_Plant': rng.choice(['P1', 'P2', 'P3', None], n, p=[0.5, 0.3, 0.15, 0.05]),
+    'Delivery_Status': rng.choice(['Late', 'On Time', 'Advanced', 'Not Due'], n),
+    'Delay_Days': np.where(rng.random(n) < 0.1, np.nan, rng.integers(-5, 20, n)),
+    'Quantity': rng.integers(1, 500, n)
+})
+synthetic.loc[n // 2:, 'Source'] = synthetic.loc[n // 2:, 'Source'].replace('S1', 'S5')
+print("1. SYNTHETIC SHIPMENTS")
+print("-" * 60)
+results.append(check('synthetic', synthetic))
+
+# The extracted shipping data, as the app loads it
+data_path = 'data/extracted'
+if os.path.exists(f'{data_path}/shipping_main_data.csv'):
+    from utils.data_processor import DataProcessor
+    processor = DataProcessor().load_processed_data(data_dir=data_path)
+    print("\n2. EXTRACTED SHIPPING DATA")
+    print("-" * 60)
+    results.append(check('extracted', processor.shipping_data))
+else:
+    print(f"\n{data_path} not found, skipping the extracted data")
+
+print("\n=== RESULT ===")
+if all(results):
+    print("PASS: route matrix totals equal the groupby")
+else:
+    print("FAIL: route matrix totals differ from the groupby")
+    sys.exit(1)
@@ -0,0 +1,84 @@
+"""
+Verify the stratified sample of the late delivery training rows
+Every stratum keeps its proportional quota, and at least one row
+"""
+
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from ml_models.late_features import stratified_sample
+
+print("=== STRATIFIED SAMPLE VERIFICATION ===\n")
+
+failures = []
+
+
+def check(condition, message):
+    print(f"  {'OK  ' if condition else 'FAIL'} {message}")
+    if not condition:
+        failures.append(message)
+
+
+def stratum_counts(strata, positions=None):
+    frame = pd.DataFrame(strata if positions is None else strata[positions])
+    return frame.value_counts()
+
+
+# Skewed strata: late flag x category x source, with rare combinations
+rng = np.random.default_rng(7)
+n = 200000
+strata = np.column_stack([
+    rng.random(n) < 0.35,
+    rng.choice(8, n, p=[0.3, 0.2, 0.15, 0.15, 0.1, 0.05, 0.04, 0.01]),
+    rng.choice(5, n, p=[0.5, 0.3, 0.15, 0.049, 0.001])
+]).astype(np.int64)
+
+for n_rows in [50000, 5000, 200]:
+    print(f"\n{n_rows:,} of {n:,} rows")
+    print("-" * 60)
+    positions, n_strata = stratified_sample(strata, n_rows)
+    population = stratum_counts(strata)
+    sample = stratum_counts(strata, positions).reindex(population.index, fill_value=0)
+    shares = population * (n_rows / n)
+
+    check(n_strata == len(population), f"{n_strata} strata found, {len(population)} in the data")
+    check(bool((np.diff(positions) > 0).all()), "positions sorted and unique")
+    check((sample >= 1).all(), "every stratum keeps at least one row")
+    check(bool(((sample >= np.floor(shares)) & (sample <= np.maximum(np.ceil(shares), 1))).all()),
+          "every stratum keeps its share, rounded down or up")
+    check(n_rows <= len(positions) <= n_rows + n_strata,
+          f"{len(positions):,} rows sampled (at most {n_rows + n_strata:,})")
+    # Rounding moves each stratum by less than one row
+    late_share = strata[positions, 0].mean() * 100
+    tolerance = 100 * n_strata / len(positions)
+    check(abs(late_share - strata[:, 0].mean() * 100) <= tolerance,
+          f"late share {late_share:.1f}% (population {strata[:, 0].mean() * 100:.1f}%, within {tolerance:.1f} points)")
+
+print("\nRepeatability and small inputs")
+print("-" * 60)
+check(np.array_equal(stratified_sample(strata, 5000)[0], stratified_sample(strata, 5000)[0]),
+      "same random_state gives the same sample")
+check(not np.array_equal(stratified_sample(strata, 5000)[0], stratified_sample(strata, 5000, random_state=1)[0]),
+      "another random_state gives another sample")
+check(np.array_equal(stratified_sample(strata[:100], 500)[0], np.arange(100)),
+      "fewer rows than requested keeps them all")
+
+print("\nMissing values")
+print("-" * 60)
+mixed = np.array([[0, 'a'], [1, None], [0, 'b'], [1, 'a']], dtype=object)
+check(stratified_sample(mixed, 100)[1] == 4, "a missing value is a stratum of its own")
+repeated = np.tile(np.array([[0, 'a'], [1, None], [0, 'b'], [1, 'a'], [0, None]], dtype=object), (100, 1))
+positions, n_strata = stratified_sample(repeated, 10)
+check(n_strata == 5 and len(pd.DataFrame(repeated[positions]).drop_duplicates()) == 5,
+      "every combination with a missing value keeps its rows")
+
+print("\n=== RESULT ===")
+if failures:
+    print(f"FAIL: {len(failures)} check(s) failed")
+    sys.exit(1)
+print("PASS: stratified sample quotas hold")